@@ -0,0 +1,134 @@
+"""Асинхронный опрос API и отправка сообщений с ограничением конкурентности.
+
+Запросы к API и Telegram по-прежнему выполняются синхронными клиентами,
+но в пуле потоков: цикл событий не блокируется, а число одновременных
+запросов ограничено отдельными семафорами для API и для Telegram.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import logging
+import os
+
+import bot_api
+import homework
+import tenants
+
+API_CONCURRENCY = int(os.getenv('API_CONCURRENCY', 20))
+SEND_CONCURRENCY = int(os.getenv('SEND_CONCURRENCY', 8))
+
+ASYNC_CYCLE_DONE = ('Асинхронный опрос {count} пользователей '
+                    'занял {elapsed:.2f} с')
+
+logger = logging.getLogger(__name__)
+
+_semaphores = {}
+
+
+def _semaphore(name, limit):
+    """Семафор цикла событий; создаётся при первом обращении."""
+    loop = asyncio.get_running_loop()
+    key = (id(loop), name)
+    if key not in _semaphores:
+        _semaphores[key] = asyncio.Semaphore(limit)
+    return _semaphores[key]
+
+
+async def _run_limited(name, limit, func, *args):
+    """Выполнение синхронного вызова в пуле под семафором."""
+    async with _semaphore(name, limit):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(func, *args))
+
+
+async def get_api_answer(timestamp, headers=homework.HEADERS, cache=None,
+                         tenant=homework.DEFAULT_TENANT):
+    """Асинхронный запрос к API-сервису."""
+    return await _run_limited(
+        'api', API_CONCURRENCY,
+        homework.request_homeworks, timestamp, headers,
+        homework.get_session(), cache, tenant)
+
+
+async def send_message(bot, chat_id, message):
+    """Асинхронная отправка сообщения в заданный чат."""
+    return await _run_limited(
+        'send', SEND_CONCURRENCY,
+        homework.send_message_to, bot, chat_id, message)
+
+
+async def send_letters(bot, tenant, letters):
+    """Одновременная отправка сообщений по чатам; True, если доставлены все.
+
+    Доставленные сообщения запоминаются в tenant.sent до фиксации ответа.
+    Без аренды пользователя ничего не отправляется.
+    """
+    if not tenants.lease_valid(tenant):
+        return False
+    pending = tenants.pending_letters(letters, tenant.sent)
+    results = await asyncio.gather(*(
+        send_message(bot, chat_id, text) for chat_id, text in pending))
+    for (chat_id, text), delivered in zip(pending, results):
+        if delivered:
+            tenant.sent.add((chat_id, text))
+    return all(results)
+
+
+async def poll_tenant(bot, tenant):
+    """Асинхронный цикл опроса API для пользователя."""
+    if not tenants.lease_valid(tenant):
+        return
+    letters = None
+    try:
+        update = await _run_limited(
+            'api', API_CONCURRENCY, tenants.fetch_update, tenant)
+        if update is not None:
+            letters, response = update
+            if await send_letters(bot, tenant, letters):
+                tenants.commit_update(tenant, response)
+    except Exception as error:
+        tenants.policy.failure(tenant.poll, error)
+        message = tenants.error_message(tenant, error)
+        if message and await send_letters(
+                bot, tenant, [(tenant.chat_id, message)]):
+            tenants.mark_error_sent(tenant, error)
+    else:
+        tenants.schedule_success(tenant, changed=bool(letters))
+
+
+async def poll_due(bot, registry):
+    """Одновременный опрос пользователей, которым пора.
+
+    Возвращает момент следующего пробуждения по часам цикла событий.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    due = tenants.due_tenants(registry, started)
+    await asyncio.gather(*(poll_tenant(bot, tenant) for tenant in due))
+    await loop.run_in_executor(None, tenants.flush_cycle_checkpoints)
+    elapsed = loop.time() - started
+    logger.debug(ASYNC_CYCLE_DONE.format(count=len(due), elapsed=elapsed))
+    return tenants.next_wakeup(registry, started + elapsed)
+
+
+async def main():
+    """Асинхронная логика работы бота для всех пользователей."""
+    tenants.stop_on_sigterm()
+    registry = tenants.load_registry()
+    tenants.start_sharding(registry)
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(
+        ThreadPoolExecutor(max_workers=API_CONCURRENCY + SEND_CONCURRENCY))
+    bot = bot_api.make_bot(homework.TELEGRAM_TOKEN, SEND_CONCURRENCY + 1)
+    await asyncio.gather(*(
+        send_message(bot, chat_id, text)
+        for tenant in registry if tenants.greeting_due(tenant)
+        for chat_id, text in tenants.greetings(tenant)
+    ))
+    try:
+        while True:
+            wakeup = await poll_due(bot, registry)
+            await asyncio.sleep(max(0, wakeup - loop.time()))
+    finally:
+        tenants.shutdown()
@@ -0,0 +1,130 @@
+"""Догрузка пропущенных изменений статусов за прошедший период.
+
+Запуск: python homework.py backfill --since 2024-01-01
+
+API умеет ограничивать ответ только снизу (from_date), поэтому
+делить период на отрезки бессмысленно: запрос с начала периода уже
+содержит всю историю. Параллельно догружаются пользователи - по
+одному потоковому запросу с --since на каждого в пуле потоков.
+Изменения проходят через тот же поиск изменений и отправку
+сообщений, что и обычный опрос, от старых к новым.
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+import logging
+import os
+
+import bot_api
+import homework
+from outbox import batches
+import schema
+import tenants
+
+BACKFILL_WORKERS = int(os.getenv('BACKFILL_WORKERS', 4))
+
+BACKFILL_DONE = 'Догрузка для {name}: работ {count}, изменений {changes}'
+BACKFILL_FAILED = 'Догрузка для {name} не удалась: {error}'
+BACKFILL_SEND_FAILED = 'Сообщение для {name} не отправлено'
+DATE_ERROR = 'Дата должна быть в формате ГГГГ-ММ-ДД: {value}'
+
+logger = logging.getLogger(__name__)
+
+
+def parse_date(value):
+    """Начало дня ГГГГ-ММ-ДД по UTC в секундах."""
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(DATE_ERROR.format(value=value))
+    return int(datetime(day.year, day.month, day.day,
+                        tzinfo=timezone.utc).timestamp())
+
+
+def fetch_changes(tenant, since):
+    """Изменения статусов с since, число работ и current_date ответа.
+
+    API умеет ограничивать ответ только снизу, поэтому вся история
+    пользователя приходит одним потоковым ответом: в памяти остаются
+    только изменившиеся работы.
+    """
+    stream = homework.stream_homeworks(
+        since, tenant.headers, homework.get_session(), tenant.name)
+    changes = tenant.statuses.diff(schema.iter_valid(stream, tenant.name))
+    return changes, stream.count, stream.fields.get('current_date', since)
+
+
+def notify(bot, tenant, changes, count, current_date):
+    """Отправка изменений от старых к новым; число изменений.
+
+    Состояние пользователя фиксируется только после отправки всех
+    сообщений, как и при обычном опросе.
+    """
+    for subscription in tenant.subscriptions:
+        lines = (
+            homework.render_status(item, subscription.locale or tenant.locale)
+            for item in changes if subscription.accepts(item)
+        )
+        letters = [(subscription.chat_id, text) for text in batches(lines)]
+        if not tenants.send_letters(bot, tenant, letters):
+            raise ConnectionError(BACKFILL_SEND_FAILED.format(
+                name=tenant.name))
+    tenants.commit_update(tenant, {
+        'homeworks': count, 'current_date': current_date})
+    return len(changes)
+
+
+def backfill(bot, registry, since, workers=BACKFILL_WORKERS):
+    """Догрузка изменений с since для всех пользователей реестра.
+
+    Истории пользователей запрашиваются параллельно, сообщения
+    отправляются по мере их получения. Возвращает словарь {имя
+    пользователя: число изменений}; для пользователей, догрузка
+    которых не удалась, в нём None.
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = [
+            (tenant, pool.submit(fetch_changes, tenant, since))
+            for tenant in registry
+        ]
+        for tenant, future in pending:
+            try:
+                changes, count, current_date = future.result()
+                results[tenant.name] = notify(
+                    bot, tenant, changes, count, current_date)
+            except Exception as error:
+                results[tenant.name] = None
+                logger.error(BACKFILL_FAILED.format(
+                    name=tenant.name, error=error))
+            else:
+                logger.info(BACKFILL_DONE.format(
+                    name=tenant.name, count=count,
+                    changes=results[tenant.name]))
+    tenants.flush_checkpoints()
+    return results
+
+
+def parse_args(argv=None):
+    """Параметры догрузки из командной строки."""
+    parser = argparse.ArgumentParser(
+        prog='homework.py backfill', description=__doc__.split('\n')[0])
+    parser.add_argument('--since', type=parse_date, required=True,
+                        help='дата начала, ГГГГ-ММ-ДД')
+    parser.add_argument('--workers', type=int, default=BACKFILL_WORKERS)
+    parser.add_argument('--dry-run', action='store_true',
+                        help='не отправлять сообщения, а писать в журнал')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Догрузка для пользователей из TENANTS_FILE или окружения."""
+    args = parse_args(argv)
+    registry = tenants.load_registry()
+    if args.dry_run:
+        from webhook import StubSender
+        bot = StubSender()
+        tenants.checkpoints = None
+    else:
+        bot = bot_api.make_bot(homework.TELEGRAM_TOKEN, args.workers)
+    return backfill(bot, registry, args.since, workers=args.workers)
@@ -0,0 +1,205 @@
+"""Замер цикла опроса на локальных подделках API и Telegram.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_poll --tenants 200 --duration 20
+
+Для каждого из N пользователей поддельный API время от времени меняет
+статус работы, бот опрашивает его через реестр пользователей и
+отправляет уведомления в поддельный Bot API. В конце печатаются
+опросы в секунду, задержка уведомлений p50/p99 и потребление памяти.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import resource
+import sys
+import threading
+import time
+
+import async_bot
+import bot_api
+import homework
+import outbox
+import polling
+import tenants
+from benchmarks.fakes import FakePracticum, FakeTelegram
+
+
+def percentile(values, share):
+    """Перцентиль share (0..1) списка значений."""
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(share * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def rss_mb():
+    """Текущий RSS процесса в мегабайтах, если его можно узнать."""
+    try:
+        with open('/proc/self/statm') as file:
+            pages = int(file.read().split()[1])
+        return pages * resource.getpagesize() / 2 ** 20
+    except OSError:
+        return float('nan')
+
+
+def peak_rss_mb():
+    """Пиковый RSS процесса в мегабайтах."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def make_bot(fake_telegram, pool_size):
+    """Бот, отправляющий сообщения в поддельный Bot API.
+
+    Отправитель выбирается так же, как у бота, в TELEGRAM_SENDER.
+    """
+    return bot_api.make_bot('1234:bench', pool_size, fake_telegram.base_url)
+
+
+def configure(args, practicum):
+    """Настройка модулей бота на подделки и частый опрос."""
+    homework.ENDPOINT = practicum.endpoint
+    homework.HTTP_POOL_SIZE = max(homework.HTTP_POOL_SIZE, args.concurrency)
+    homework._session = None
+    tenants.policy = polling.PollPolicy(
+        base=args.period, fast=args.period, limit=args.period * 4,
+        jitter=0.1, per_hour=10 ** 6, burst=10 ** 6,
+    )
+    tenants.checkpoints = None
+    async_bot.API_CONCURRENCY = args.concurrency
+    async_bot.SEND_CONCURRENCY = args.concurrency
+
+
+def make_registry(count):
+    """Реестр из count пользователей с токенами 0..count-1."""
+    return tenants.TenantRegistry(
+        tenants.Tenant(token=str(index), chat_id=index)
+        for index in range(count)
+    )
+
+
+def drive_changes(practicum, count, stop, rate, seed):
+    """Изменение статусов случайных пользователей с частотой rate в секунду."""
+    rng = random.Random(seed)
+    sequence = 0
+    while not stop.wait(rng.expovariate(rate)):
+        sequence += 1
+        practicum.change(rng.randrange(count), sequence)
+
+
+def run_sync(bot, registry, deadline):
+    """Синхронный цикл опроса до deadline."""
+    while time.monotonic() < deadline:
+        wakeup = tenants.poll_due(bot, registry)
+        time.sleep(max(0, min(wakeup, deadline) - time.monotonic()))
+    if tenants.outbox is not None:
+        tenants.outbox.join(timeout=5)
+
+
+async def run_async(bot, registry, deadline):
+    """Асинхронный цикл опроса до deadline."""
+    loop = asyncio.get_running_loop()
+    offset = time.monotonic() - loop.time()
+    while loop.time() + offset < deadline:
+        wakeup = await async_bot.poll_due(bot, registry)
+        await asyncio.sleep(
+            max(0, min(wakeup, deadline - offset) - loop.time()))
+
+
+def run(args):
+    """Прогон замера; словарь с результатами."""
+    practicum = FakePracticum(
+        latency=args.api_latency, error_rate=args.error_rate,
+        payload_homeworks=args.payload_homeworks, seed=args.seed,
+    ).start()
+    fake_telegram = FakeTelegram(
+        practicum, latency=args.telegram_latency).start()
+    configure(args, practicum)
+    bot = make_bot(fake_telegram, args.concurrency + 1)
+    registry = make_registry(args.tenants)
+    tenants.outbox = None
+    if args.mode == 'outbox':
+        tenants.outbox = outbox.Outbox(
+            bot, workers=args.concurrency, window=0,
+            chat_rate=10 ** 6, global_rate=10 ** 6,
+        ).start()
+    stop = threading.Event()
+    changer = threading.Thread(
+        target=drive_changes, daemon=True,
+        args=(practicum, args.tenants, stop, args.change_rate, args.seed),
+    )
+    rss_before = rss_mb()
+    started = time.monotonic()
+    changer.start()
+    deadline = started + args.duration
+    try:
+        if args.mode == 'async':
+            asyncio.run(run_async(bot, registry, deadline))
+        else:
+            run_sync(bot, registry, deadline)
+    finally:
+        stop.set()
+        elapsed = time.monotonic() - started
+        if tenants.outbox is not None:
+            tenants.outbox.stop(timeout=5)
+            tenants.outbox = None
+        practicum.stop()
+        fake_telegram.stop()
+    latencies = fake_telegram.latencies
+    return {
+        'mode': args.mode,
+        'tenants': args.tenants,
+        'duration_s': round(elapsed, 2),
+        'polls': practicum.requests,
+        'polls_per_s': round(practicum.requests / elapsed, 1),
+        'api_errors': practicum.errors,
+        'short_circuited': tenants.response_cache.short_circuited,
+        'messages': fake_telegram.messages,
+        'notifications': len(latencies),
+        'latency_p50_s': round(percentile(latencies, 0.5), 3),
+        'latency_p99_s': round(percentile(latencies, 0.99), 3),
+        'rss_mb': round(rss_mb(), 1),
+        'rss_growth_mb': round(rss_mb() - rss_before, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def parse_args(argv=None):
+    """Параметры замера из командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--tenants', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--period', type=float, default=1,
+                        help='интервал опроса пользователя, с')
+    parser.add_argument('--mode', choices=('sync', 'outbox', 'async'),
+                        default='sync')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--api-latency', type=float, default=0.005)
+    parser.add_argument('--telegram-latency', type=float, default=0.005)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--payload-homeworks', type=int, default=0)
+    parser.add_argument('--change-rate', type=float, default=5,
+                        help='изменений статусов в секунду')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--verbose', action='store_true',
+                        help='не отключать журнал бота')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Запуск замера и печать результата в JSON."""
+    args = parse_args(argv)
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+    result = run(args)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return result
+
+
+if __name__ == '__main__':
+    main()
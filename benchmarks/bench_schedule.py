@@ -0,0 +1,125 @@
+"""Замер расписания опросов на большом реестре пользователей.
+
+Реестр из N пользователей живёт по виртуальным часам: каждый шаг
+берёт пользователей, которым пора, через tenants.due_tenants и ставит
+их на следующий срок, как после опроса. Для сравнения на каждом шаге
+замеряется прежний способ - обход всего реестра. Печатаются время
+шага с кучей и с обходом, стоимость постановки в расписание
+и потребление памяти.
+
+    python -m benchmarks.bench_schedule --tenants 100000 --cycles 120
+"""
+import argparse
+import json
+import random
+import time
+
+import tenants
+from benchmarks.bench_poll import percentile, peak_rss_mb, rss_mb
+from polling import REVIEWING
+
+
+def make_registry(count, reviewing, period, rng):
+    """Реестр с разбросанными сроками; доля reviewing - на проверке."""
+    started = rss_mb()
+
+    def generate():
+        for index in range(count):
+            tenant = tenants.Tenant(token=str(index), chat_id=index)
+            if rng.random() < reviewing:
+                tenant.statuses.load({index: REVIEWING})
+            tenant.poll.next_due = rng.uniform(0, period)
+            yield tenant
+
+    registry = tenants.TenantRegistry(generate())
+    return registry, rss_mb() - started
+
+
+def scan(registry, now):
+    """Прежний выбор пользователей: обход всего реестра."""
+    due = [
+        tenant for tenant in registry
+        if tenant.poll.next_due <= now and tenant.owned
+        and not tenant.delivering
+    ]
+    wakeup = min(
+        (tenant.poll.next_due for tenant in registry if tenant.owned),
+        default=None,
+    )
+    return due, wakeup
+
+
+def urgent_first(due):
+    """Идут ли пользователи с работой на проверке раньше остальных."""
+    flags = [tenant.statuses.has_status(REVIEWING) for tenant in due]
+    return flags == sorted(flags, reverse=True)
+
+
+def run(args):
+    """Прогон виртуальных шагов; словарь с результатами."""
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    registry, registry_mb = make_registry(
+        args.tenants, args.reviewing, args.period, rng)
+    build = time.perf_counter() - started
+    heap, linear, dispatched = [], [], 0
+    reschedule = 0.0
+    ordered = True
+    now = 0.0
+    for _ in range(args.cycles):
+        now += args.step
+        started = time.perf_counter()
+        due = tenants.due_tenants(registry, now)
+        tenants.next_wakeup(registry, now)
+        heap.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        scan(registry, now)
+        linear.append(time.perf_counter() - started)
+        ordered = ordered and urgent_first(due)
+        started = time.perf_counter()
+        for tenant in due:
+            fast = tenant.statuses.has_status(REVIEWING)
+            period = args.period / 5 if fast else args.period
+            tenant.poll.next_due = now + period * rng.uniform(0.9, 1.1)
+        reschedule += time.perf_counter() - started
+        dispatched += len(due)
+    return {
+        'tenants': len(registry),
+        'build_s': round(build, 2),
+        'registry_mb': round(registry_mb, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'cycles': args.cycles,
+        'dispatched_per_cycle': round(dispatched / args.cycles, 1),
+        'heap_cycle_p50_ms': round(percentile(heap, 0.5) * 1000, 3),
+        'heap_cycle_p99_ms': round(percentile(heap, 0.99) * 1000, 3),
+        'scan_cycle_p50_ms': round(percentile(linear, 0.5) * 1000, 3),
+        'scan_cycle_p99_ms': round(percentile(linear, 0.99) * 1000, 3),
+        'reschedule_us': round(reschedule / max(dispatched, 1) * 1e6, 2),
+        'urgent_first': ordered,
+    }
+
+
+def parse_args(argv=None):
+    """Параметры замера из командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--tenants', type=int, default=100000)
+    parser.add_argument('--cycles', type=int, default=120)
+    parser.add_argument('--step', type=float, default=1.0,
+                        help='шаг виртуальных часов, с')
+    parser.add_argument('--period', type=float, default=600.0,
+                        help='интервал опроса без работ на проверке, с')
+    parser.add_argument('--reviewing', type=float, default=0.1,
+                        help='доля пользователей с работой на проверке')
+    parser.add_argument('--seed', type=int, default=None)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Запуск замера и печать результата в JSON."""
+    result = run(parse_args(argv))
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return result
+
+
+if __name__ == '__main__':
+    main()
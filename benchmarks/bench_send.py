@@ -0,0 +1,96 @@
+"""Замер отправки сообщений через telegram.Bot и через DirectBot.
+
+Оба отправителя шлют одинаковые сообщения в локальный поддельный
+Bot API из нескольких потоков. Для каждого печатаются сообщения в
+секунду, задержка вызова send_message и процессорное время бота
+на одно сообщение.
+
+    python -m benchmarks.bench_send --messages 2000 --threads 4
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import time
+
+import bot_api
+from benchmarks.bench_poll import percentile
+from benchmarks.fakes import FakeTelegram
+
+SENDERS = (bot_api.PTB, bot_api.DIRECT)
+TOKEN = '1234:bench'
+
+
+def make_sender(sender, fake_telegram, pool_size):
+    """Отправитель sender, подключённый к поддельному Bot API."""
+    if sender == bot_api.DIRECT:
+        return bot_api.DirectBot(
+            TOKEN, fake_telegram.base_url, pool_size=pool_size)
+    import telegram
+    from telegram.utils.request import Request
+    return telegram.Bot(
+        token=TOKEN, base_url=fake_telegram.base_url,
+        request=Request(con_pool_size=pool_size),
+    )
+
+
+def measure(sender, fake_telegram, messages, threads):
+    """Отправка messages сообщений; словарь с результатами."""
+    bot = make_sender(sender, fake_telegram, threads)
+    bot.send_message(0, 'warm-up')
+    latencies = []
+
+    def send(index):
+        started = time.perf_counter()
+        bot.send_message(index, f'message {index}')
+        latencies.append(time.perf_counter() - started)
+
+    received = fake_telegram.messages
+    cpu = time.process_time()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(send, range(messages)))
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu
+    return {
+        'sender': sender,
+        'messages': fake_telegram.messages - received,
+        'messages_per_s': round(messages / elapsed, 1),
+        'latency_p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+        'latency_p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'cpu_per_message_ms': round(cpu / messages * 1000, 3),
+    }
+
+
+def run(args):
+    """Замер всех отправителей; список результатов."""
+    fake_telegram = FakeTelegram(None, latency=args.latency).start()
+    try:
+        return [
+            measure(sender, fake_telegram, args.messages, args.threads)
+            for sender in args.senders
+        ]
+    finally:
+        fake_telegram.stop()
+
+
+def parse_args(argv=None):
+    """Параметры замера из командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='задержка ответа Bot API, с')
+    parser.add_argument('--senders', nargs='+', choices=SENDERS,
+                        default=list(SENDERS))
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Запуск замера и печать результата в JSON."""
+    result = run(parse_args(argv))
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return result
+
+
+if __name__ == '__main__':
+    main()
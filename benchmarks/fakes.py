@@ -0,0 +1,193 @@
+"""Локальные подделки API Практикума и Bot API Telegram для замеров.
+
+Поддельный API отдаёт работы по токену, с заданными задержкой,
+долей ошибок и размером ответа. Изменение статуса запускается
+методом change(); поддельный Bot API находит в тексте сообщения
+метку работы и записывает время от изменения до доставки.
+"""
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import re
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+MARK = re.compile(r'bench-(\d+)-(\d+)')
+STATUSES = ('reviewing', 'rejected', 'approved')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    fake = None
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Запросы к подделкам не журналируются."""
+
+
+class _Server:
+    """Поддельный сервер в фоновом потоке."""
+
+    handler = _Handler
+
+    def __init__(self, latency=0.0):
+        """Сервер на свободном порту локального адреса."""
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        handler = type('Handler', (self.handler,), {'fake': self})
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        """Базовый адрес сервера."""
+        host, port = self.server.server_address
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """Запуск сервера."""
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Остановка сервера."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class _PracticumHandler(_Handler):
+
+    def do_GET(self):
+        self.fake._count()
+        token = self.headers.get('Authorization', '').replace('OAuth ', '')
+        query = parse_qs(urlsplit(self.path).query)
+        from_date = int(query.get('from_date', ['0'])[0])
+        status, payload = self.fake.answer(token, from_date)
+        self._reply(status, payload)
+
+
+class FakePracticum(_Server):
+    """Поддельный эндпоинт homework_statuses."""
+
+    handler = _PracticumHandler
+
+    def __init__(self, latency=0.0, error_rate=0.0, payload_homeworks=0,
+                 seed=None):
+        """API с задержкой, долей ошибок 500 и лишними работами в ответе."""
+        super().__init__(latency)
+        self.error_rate = error_rate
+        self.payload_homeworks = payload_homeworks
+        self.errors = 0
+        self.changed_at = {}
+        self._random = random.Random(seed)
+        self._homeworks = {}
+
+    @property
+    def endpoint(self):
+        """Адрес для homework.ENDPOINT."""
+        return self.url + '/api/user_api/homework_statuses/'
+
+    def change(self, tenant, sequence):
+        """Изменение статуса работы пользователя с номером tenant."""
+        now = time.time()
+        homework = {
+            'id': sequence,
+            'homework_name': f'bench-{tenant}-{sequence}',
+            'status': STATUSES[sequence % len(STATUSES)],
+            'date_updated': int(now),
+        }
+        with self._lock:
+            self._homeworks.setdefault(str(tenant), []).insert(0, homework)
+            self.changed_at[(tenant, sequence)] = now
+
+    def filler(self):
+        """Старые работы, которыми ответ дополняется до нужного размера."""
+        return [
+            {'id': -index, 'homework_name': f'filler-{index}',
+             'status': 'approved', 'date_updated': 0}
+            for index in range(1, self.payload_homeworks + 1)
+        ]
+
+    def answer(self, token, from_date):
+        """Код и тело ответа для пользователя."""
+        with self._lock:
+            if self._random.random() < self.error_rate:
+                self.errors += 1
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {}
+            homeworks = [
+                homework for homework in self._homeworks.get(token, [])
+                if homework['date_updated'] >= from_date
+            ]
+        return HTTPStatus.OK, {
+            'homeworks': homeworks + self.filler(),
+            'current_date': int(time.time()),
+        }
+
+
+class _TelegramHandler(_Handler):
+
+    def do_POST(self):
+        self.fake._count()
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode()
+        if 'json' in self.headers.get('Content-Type', ''):
+            data = json.loads(body)
+        else:
+            data = {
+                key: values[0] for key, values in parse_qs(body).items()
+            }
+        self.fake.deliver(data.get('chat_id'), data.get('text', ''))
+        self._reply(HTTPStatus.OK, {'ok': True, 'result': {
+            'message_id': self.fake.requests,
+            'date': int(time.time()),
+            'chat': {'id': int(data.get('chat_id', 0)), 'type': 'private'},
+            'text': data.get('text', ''),
+        }})
+
+
+class FakeTelegram(_Server):
+    """Поддельный Bot API, записывающий задержку уведомлений."""
+
+    handler = _TelegramHandler
+
+    def __init__(self, practicum, latency=0.0):
+        """Bot API, связанный с поддельным API Практикума."""
+        super().__init__(latency)
+        self.practicum = practicum
+        self.messages = 0
+        self.latencies = []
+
+    @property
+    def base_url(self):
+        """Адрес для telegram.Bot(base_url=...)."""
+        return self.url + '/bot'
+
+    def deliver(self, chat_id, text):
+        """Учёт сообщения и задержки для каждой метки в нём."""
+        now = time.time()
+        with self._lock:
+            self.messages += 1
+            for tenant, sequence in MARK.findall(text):
+                changed = self.practicum.changed_at.pop(
+                    (int(tenant), int(sequence)), None)
+                if changed is not None:
+                    self.latencies.append(now - changed)
@@ -0,0 +1,116 @@
+"""Отправка сообщений напрямую в Bot API, без telegram.Bot.
+
+Боту нужен только метод sendMessage. DirectBot отправляет его одним
+POST-запросом через пул соединений urllib3 и не строит объектов
+python-telegram-bot. requests.Session здесь не подходит: при каждом
+запросе она перебирает переменные окружения в поисках прокси, и на
+это уходит больше времени, чем на сам запрос. Ошибки Bot API
+переводятся в те же исключения telegram.error, что выбрасывает
+telegram.Bot, поэтому send_message, очередь сообщений и выключатели
+работают с обоими отправителями одинаково. Отправитель выбирается
+в TELEGRAM_SENDER: ptb (по умолчанию) или direct.
+"""
+from http import HTTPStatus
+import json
+import os
+
+from lazy import lazy_import
+
+telegram = lazy_import('telegram')
+
+PTB = 'ptb'
+DIRECT = 'direct'
+TELEGRAM_SENDER = os.getenv('TELEGRAM_SENDER', PTB)
+BOT_API_URL = os.getenv('BOT_API_URL', 'https://api.telegram.org/bot')
+BOT_API_TIMEOUT = float(os.getenv('BOT_API_TIMEOUT', 5))
+
+SENDER_ERROR = 'Неизвестный отправитель сообщений {sender}'
+API_ERROR = '{description} ({code})'
+
+
+def api_error(code, data):
+    """Исключение telegram.error для неудачного ответа Bot API.
+
+    Соответствие кодов и исключений то же, что в python-telegram-bot 13.
+    """
+    errors = telegram.error
+    parameters = data.get('parameters') or {}
+    if 'migrate_to_chat_id' in parameters:
+        return errors.ChatMigrated(parameters['migrate_to_chat_id'])
+    if 'retry_after' in parameters:
+        return errors.RetryAfter(parameters['retry_after'])
+    description = data.get('description') or 'Unknown HTTPError'
+    if code in (HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN):
+        return errors.Unauthorized(description)
+    if code == HTTPStatus.BAD_REQUEST:
+        return errors.BadRequest(description)
+    if code == HTTPStatus.NOT_FOUND:
+        return errors.InvalidToken()
+    if code == HTTPStatus.CONFLICT:
+        return errors.Conflict(description)
+    return errors.NetworkError(
+        API_ERROR.format(description=description, code=code))
+
+
+class DirectBot:
+    """Отправитель sendMessage поверх пула HTTP-соединений."""
+
+    def __init__(self, token, base_url=None, pool_size=1,
+                 timeout=BOT_API_TIMEOUT):
+        """Отправитель для бота с токеном token.
+
+        Прокси, как и в python-telegram-bot, берётся из HTTPS_PROXY
+        один раз при создании.
+        """
+        import certifi
+        import urllib3
+        if not token or ':' not in token:
+            raise telegram.error.InvalidToken()
+        self.url = f'{base_url or BOT_API_URL}{token}/sendMessage'
+        self._errors = urllib3.exceptions
+        options = dict(
+            num_pools=1, maxsize=pool_size, block=False, retries=False,
+            timeout=urllib3.Timeout(connect=timeout, read=timeout),
+            cert_reqs='CERT_REQUIRED', ca_certs=certifi.where(),
+            headers={'Content-Type': 'application/json'},
+        )
+        proxy = os.getenv('HTTPS_PROXY') or os.getenv('https_proxy')
+        if proxy:
+            self.pool = urllib3.ProxyManager(proxy, **options)
+        else:
+            self.pool = urllib3.PoolManager(**options)
+
+    def send_message(self, chat_id, text, **kwargs):
+        """Отправка сообщения; словарь отправленного сообщения из Bot API.
+
+        Дополнительные параметры sendMessage (parse_mode и другие)
+        передаются как есть.
+        """
+        body = json.dumps(dict(kwargs, chat_id=chat_id, text=text))
+        try:
+            response = self.pool.request(
+                'POST', self.url, body=body.encode())
+        except self._errors.TimeoutError as error:
+            raise telegram.error.TimedOut() from error
+        except self._errors.HTTPError as error:
+            raise telegram.error.NetworkError(str(error)) from error
+        try:
+            data = json.loads(response.data)
+        except ValueError:
+            data = {}
+        if response.status == HTTPStatus.OK and data.get('ok'):
+            return data['result']
+        raise api_error(response.status, data)
+
+
+def make_bot(token, pool_size=1, base_url=None):
+    """Отправитель сообщений по настройке TELEGRAM_SENDER."""
+    if TELEGRAM_SENDER == DIRECT:
+        return DirectBot(token, base_url, pool_size)
+    if TELEGRAM_SENDER != PTB:
+        raise ValueError(SENDER_ERROR.format(sender=TELEGRAM_SENDER))
+    from telegram.utils.request import Request
+    return telegram.Bot(
+        token=token, base_url=base_url,
+        request=Request(con_pool_size=pool_size),
+    )
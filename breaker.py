@@ -0,0 +1,115 @@
+"""Автоматический выключатель для внешних сервисов.
+
+Пока сервис отвечает, выключатель замкнут (closed). После
+threshold сбоев подряд он размыкается (open): вызовы отклоняются
+сразу, без сетевых запросов и записи исключений в журнал. Через
+probe_interval секунд выключатель пропускает один пробный вызов
+(half-open): удачный замыкает его, неудачный снова размыкает.
+"""
+import logging
+import os
+import threading
+import time
+
+import metrics
+
+BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', 5))
+BREAKER_PROBE_INTERVAL = float(os.getenv('BREAKER_PROBE_INTERVAL', 60))
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_OPEN = ('Сервис {name} недоступен, вызов отклонён, '
+                'проверка через {delay:.0f} с')
+CIRCUIT_CHANGED = 'Выключатель {name}: {old} -> {new}'
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_STATE = metrics.gauge(
+    'homework_circuit_state',
+    'Состояние выключателя: 0 - замкнут, 1 - проба, 2 - разомкнут.',
+    ['endpoint'])
+CIRCUIT_REJECTED = metrics.counter(
+    'homework_circuit_rejected_calls_total',
+    'Вызовы, отклонённые разомкнутым выключателем.', ['endpoint'])
+
+
+class CircuitOpenError(ConnectionError):
+    """Вызов отклонён разомкнутым выключателем."""
+
+    def __init__(self, message, retry_after):
+        """Ошибка со временем до пробного вызова."""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Выключатель одного внешнего сервиса."""
+
+    def __init__(self, name, threshold=BREAKER_THRESHOLD,
+                 probe_interval=BREAKER_PROBE_INTERVAL, clock=time.monotonic):
+        """Замкнутый выключатель."""
+        self.name = name
+        self.threshold = threshold
+        self.probe_interval = probe_interval
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set(STATE_VALUES[CLOSED], endpoint=name)
+
+    def remaining(self):
+        """Секунды до пробного вызова; 0, если вызывать можно."""
+        if self.state == CLOSED:
+            return 0.0
+        return max(0.0, self._opened_at + self.probe_interval - self.clock())
+
+    def allow(self):
+        """Можно ли выполнить вызов.
+
+        Пробный вызов разрешается раз в probe_interval секунд: если его
+        результат так и не учтён, через probe_interval пробуется
+        следующий.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.remaining() == 0:
+                self._opened_at = self.clock()
+                if self.state == OPEN:
+                    self._change(HALF_OPEN)
+                return True
+        CIRCUIT_REJECTED.inc(endpoint=self.name)
+        return False
+
+    def check(self):
+        """Исключение CircuitOpenError, если вызов не разрешён."""
+        if not self.allow():
+            delay = self.remaining() or self.probe_interval
+            raise CircuitOpenError(
+                CIRCUIT_OPEN.format(name=self.name, delay=delay), delay)
+
+    def success(self):
+        """Учёт удачного вызова."""
+        with self._lock:
+            self.failures = 0
+            if self.state != CLOSED:
+                self._change(CLOSED)
+
+    def failure(self):
+        """Учёт сбоя сервиса."""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (
+                    self.state == CLOSED and self.failures >= self.threshold):
+                self._opened_at = self.clock()
+                self._change(OPEN)
+
+    def _change(self, state):
+        logger.warning(CIRCUIT_CHANGED.format(
+            name=self.name, old=self.state, new=state))
+        self.state = state
+        CIRCUIT_STATE.set(STATE_VALUES[state], endpoint=self.name)
@@ -0,0 +1,76 @@
+"""Подавление повторных уведомлений об одной и той же ошибке.
+
+Ошибки сравниваются не как объекты, а по отпечатку: тип и текст,
+в котором числа и шестнадцатеричные адреса заменены заглушкой.
+Об ошибке с новым отпечатком сообщается сразу, о повторах - не чаще
+раза в ERROR_COOLDOWN секунд, сводкой с числом повторов. Успешный
+опрос не отменяет паузу: сбой, который то пропадает, то возвращается,
+не приводит к уведомлению на каждую ошибку.
+"""
+from collections import OrderedDict
+import os
+import re
+import time
+
+ERROR_COOLDOWN = int(os.getenv('ERROR_COOLDOWN', 3600))
+FINGERPRINTS_LIMIT = 32
+
+VOLATILE = re.compile(r'0x[0-9a-fA-F]+|\d+')
+
+
+def fingerprint(error):
+    """Отпечаток ошибки: тип и нормализованный текст."""
+    return f'{type(error).__name__}:{VOLATILE.sub("#", str(error))}'
+
+
+class ErrorFilter:
+    """Учёт ошибок одного получателя уведомлений."""
+
+    def __init__(self, cooldown=ERROR_COOLDOWN, clock=time.time):
+        """Фильтр без известных ошибок."""
+        self.cooldown = cooldown
+        self.clock = clock
+        self._seen = OrderedDict()
+
+    def report(self, error):
+        """Число повторов, о которых пора сообщить, или None.
+
+        1 - об ошибке ещё не сообщалось, больше 1 - сводка
+        о продолжающемся сбое после отправленного уведомления.
+        """
+        key = fingerprint(error)
+        count, sent_at = self._seen.pop(key, (0, None))
+        count += 1
+        self._seen[key] = (count, sent_at)
+        if len(self._seen) > FINGERPRINTS_LIMIT:
+            self._seen.popitem(last=False)
+        if sent_at is None:
+            return 1
+        if self.clock() - sent_at >= self.cooldown:
+            return count
+        return None
+
+    def mark_sent(self, error):
+        """Запоминание отправленного уведомления; счётчик обнуляется."""
+        self._seen[fingerprint(error)] = (0, self.clock())
+
+    def reset(self):
+        """Сброс после успешного цикла.
+
+        Ошибки без отправленного уведомления и ошибки, пауза после
+        уведомления о которых прошла, забываются; об остальных
+        по-прежнему не сообщается до конца паузы.
+        """
+        now = self.clock()
+        for key, (count, sent_at) in list(self._seen.items()):
+            if sent_at is None or now - sent_at >= self.cooldown:
+                del self._seen[key]
+
+    def dump(self):
+        """Состояние для сохранения в контрольной точке."""
+        return {key: list(value) for key, value in self._seen.items()}
+
+    def load(self, state):
+        """Восстановление состояния из контрольной точки."""
+        for key, (count, sent_at) in state.items():
+            self._seen[key] = (count, sent_at)
@@ -1,12 +1,26 @@
 from http import HTTPStatus
 import logging
 import os
+import sys
 import time
 
 from dotenv import load_dotenv
-from telegram import TelegramError
-import requests
-import telegram
+
+import bot_api
+from breaker import CircuitBreaker
+from error_filter import ErrorFilter
+from json_stream import HomeworkStream
+from lazy import lazy_import
+import log_setup
+import metrics
+import schema
+from singleflight import SingleFlight
+from status_diff import StatusTracker
+import verdicts
+
+requests = lazy_import('requests')
+outbox = lazy_import('outbox')
+telegram = lazy_import('telegram')
 
 load_dotenv()
 
@@ -18,15 +32,31 @@ RETRY_PERIOD = 600
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
+CONNECT_TIMEOUT = float(os.getenv('CONNECT_TIMEOUT', 5))
+READ_TIMEOUT = float(os.getenv('READ_TIMEOUT', 30))
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 20))
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', 3))
+HTTP_BACKOFF = float(os.getenv('HTTP_BACKOFF', 0.5))
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 64 * 1024))
+RETRY_STATUSES = (
+    HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+    HTTPStatus.GATEWAY_TIMEOUT,
+)
+
 HOMEWORK_VERDICTS = {
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
 
+UNKNOWN_VERDICT = os.getenv(
+    'UNKNOWN_VERDICT', 'Новый статус проверки: {status}.')
+
 TOKENS = ['PRACTICUM_TOKEN', 'TELEGRAM_CHAT_ID', 'TELEGRAM_TOKEN']
 
 API_ANSWER = 'Пустой ответ API'
+API_ANSWERED = 'Ответ API с кодом {code} за {latency:.3f} с'
 CONNECTION = 'Соединилсись с API, {response}'
 CONNECTION_ERROR = ('Ошибка ресурса, {error}.'
                     'Параметры запроса: {url}, {headers}, {params}'
@@ -43,7 +73,10 @@ RESPONSE_JSON_ERROR = ('Отсутствует необходимый ключ {
                        'Параметры запроса: {url}, {headers}, {params}')
 SEND_MESSAGE_ERROR = 'Сообщение {message} не отправлено, ошибка: {error}'
 SEND_MESSAGE_SUCCESS = 'Сообщение отправлено: {message}'
+SEND_SKIPPED = 'Telegram недоступен, отправка отложена на {delay:.0f} с'
 STATUS = 'Статус {status} неизвестен'
+STILL_FAILING = ('Сбой в работе программы продолжается, '
+                 'повторов: {count}. {error}')
 STATUS_VERDICT = 'Изменился статус проверки работы "{name}". {verdict}'
 TOKEN_ERROR_MESSAGE = 'Нет токена {token}'
 TOKEN_IS_ABSENT = '{token} отсутствует'
@@ -53,6 +86,52 @@ TYPE_LIST_ERROR = 'Неверный тип входящих данных, не 
 
 logger = logging.getLogger(__name__)
 
+VERDICTS = verdicts.VerdictCatalog().add(
+    'ru', STATUS_VERDICT, HOMEWORK_VERDICTS, UNKNOWN_VERDICT)
+for locale, translation in verdicts.TRANSLATIONS.items():
+    VERDICTS.add(locale, **translation)
+
+DEFAULT_TENANT = 'default'
+API_LATENCY = metrics.histogram(
+    'homework_api_request_seconds',
+    'Время запроса к API домашки.', ['tenant'])
+API_RESPONSES = metrics.counter(
+    'homework_api_responses_total',
+    'Ответы API домашки по кодам, error - сбой соединения.',
+    ['tenant', 'code'])
+VALIDATION_FAILURES = metrics.counter(
+    'homework_validation_failures_total',
+    'Ответы API и работы, не прошедшие проверку.', ['stage'])
+SEND_LATENCY = metrics.histogram(
+    'homework_telegram_send_seconds', 'Время отправки сообщения.')
+SEND_FAILURES = metrics.counter(
+    'homework_telegram_send_failures_total', 'Неотправленные сообщения.')
+
+
+class TooManyRequests(ValueError):
+    """API просит повторить запрос не раньше чем через retry_after секунд."""
+
+    def __init__(self, message, retry_after=None):
+        """Ошибка с задержкой из заголовка Retry-After."""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+IN_FLIGHT = SingleFlight('practicum')
+API_BREAKER = CircuitBreaker('practicum')
+SEND_BREAKER = CircuitBreaker('telegram')
+
+
+def is_outage(error):
+    """Говорит ли ошибка Telegram о недоступности сервиса.
+
+    BadRequest в python-telegram-bot - подкласс NetworkError, но это
+    ошибка запроса, а не сбой сервиса.
+    """
+    errors = telegram.error
+    return (isinstance(error, (errors.NetworkError, errors.RetryAfter))
+            and not isinstance(error, errors.BadRequest))
+
 
 def check_tokens():
     """Проверка переменных окружения программы."""
@@ -64,47 +143,218 @@ def check_tokens():
         raise KeyError(TOKEN_ERROR_MESSAGE.format(token=empty_tokens))
 
 
-def send_message(bot, message):
-    """Отправка сообщения."""
+def send_message_to(bot, chat_id, message):
+    """Отправка сообщения в заданный чат.
+
+    Пока Telegram недоступен (выключатель SEND_BREAKER разомкнут),
+    сообщение не отправляется и исключение не пишется в журнал.
+    """
+    if not SEND_BREAKER.allow():
+        logger.debug(SEND_SKIPPED.format(
+            delay=SEND_BREAKER.remaining()), extra={'chat_id': chat_id})
+        return False
+    started = time.perf_counter()
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
-        logger.debug(SEND_MESSAGE_SUCCESS.format(message=message))
+        bot.send_message(chat_id, message)
+        SEND_BREAKER.success()
+        latency = time.perf_counter() - started
+        SEND_LATENCY.observe(latency)
+        logger.debug(
+            SEND_MESSAGE_SUCCESS.format(message=message),
+            extra={'chat_id': chat_id, 'latency': latency, 'sampled': True})
         return True
-    except TelegramError as error:
+    except telegram.error.TelegramError as error:
+        if is_outage(error):
+            SEND_BREAKER.failure()
+        else:
+            SEND_BREAKER.success()
+        SEND_LATENCY.observe(time.perf_counter() - started)
+        SEND_FAILURES.inc()
         logger.exception(
-            SEND_MESSAGE_ERROR.format(message=message, error=error))
+            SEND_MESSAGE_ERROR.format(message=message, error=error),
+            extra={'chat_id': chat_id})
         return False
 
 
-def get_api_answer(timestamp):
-    """Запрос к единственному эндпоинту API-сервиса."""
-    params = {'from_date': timestamp}
+def send_message(bot, message):
+    """Отправка сообщения."""
+    return send_message_to(bot, TELEGRAM_CHAT_ID, message)
+
+
+_session = None
+
+
+def get_session():
+    """Общая HTTP-сессия с пулом соединений и повтором запросов.
+
+    Повторы идут с короткой паузой и не ждут Retry-After: запрос
+    не должен останавливать цикл опроса, а указанную сервером
+    задержку выдерживает расписание опросов через TooManyRequests.
+    """
+    global _session
+    if _session is None:
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        retries = Retry(
+            total=HTTP_RETRIES,
+            backoff_factor=HTTP_BACKOFF,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False,
+            respect_retry_after_header=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=HTTP_POOL_SIZE,
+            max_retries=retries,
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _session = session
+    return _session
+
+
+def make_headers(token):
+    """Заголовки авторизации для токена Практикума."""
+    return {'Authorization': f'OAuth {token}'}
+
+
+def parse_retry_after(value):
+    """Задержка в секундах из заголовка Retry-After или None."""
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return int(value)
+    from email.utils import parsedate_to_datetime
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0, int(retry_at.timestamp() - time.time()))
+
+
+def fetch_response(timestamp, headers, session=None, cache=None,
+                   tenant=DEFAULT_TENANT, stream=False):
+    """HTTP-ответ API с проверенным кодом возврата.
+
+    С сессией запрос идёт через её пул соединений, без сессии
+    каждый раз открывается новое соединение. С кэшем (слотом
+    ResponseCache) для неизменившегося ответа возвращается None.
+    Одновременные запросы с тем же токеном, from_date и If-None-Match
+    склеиваются в один: вызовы делят HTTP-ответ, а кэш каждого
+    сверяется с ним отдельно. С stream=True тело ответа не
+    загружается заранее, и такой запрос не склеивается: тело потока
+    можно прочитать только один раз. Поток с ошибочным кодом
+    закрывается сразу, чтобы вернуть соединение в пул.
+    """
+    if cache is not None:
+        headers = cache.prepare(timestamp, headers)
     askings = dict(
-        url=ENDPOINT, headers=HEADERS, params=params)
+        url=ENDPOINT, headers=headers, params={'from_date': timestamp})
+    if stream:
+        response = _get(askings, session, tenant, stream=True)
+    else:
+        response = IN_FLIGHT.do(
+            (headers.get('Authorization'), timestamp,
+             headers.get('If-None-Match')),
+            _get, askings, session, tenant)
+    if cache is not None and cache.unchanged(timestamp, response):
+        return None
     try:
-        response = requests.get(
-            **askings
-        )
-    except requests.RequestException as error:
-        raise ConnectionError(CONNECTION_ERROR.format(
-            error=error,
+        _check_status(response, askings)
+    except Exception:
+        if stream:
+            response.close()
+        raise
+    return response
+
+
+def _check_status(response, askings):
+    if response.status_code in (HTTPStatus.TOO_MANY_REQUESTS,
+                                HTTPStatus.SERVICE_UNAVAILABLE):
+        raise TooManyRequests(CONNECTION_WRONG_CODE.format(
+            code=response.status_code,
             **askings,
-        ))
+        ), parse_retry_after(response.headers.get('Retry-After')))
     if response.status_code != HTTPStatus.OK:
         raise ValueError(CONNECTION_WRONG_CODE.format(
             code=response.status_code,
             **askings,
         ))
+
+
+def _get(askings, session, tenant, stream=False):
+    API_BREAKER.check()
+    started = time.perf_counter()
+    try:
+        response = (session or requests).get(
+            **askings, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+            **({'stream': True} if stream else {}))
+    except requests.RequestException as error:
+        API_BREAKER.failure()
+        API_LATENCY.observe(time.perf_counter() - started, tenant=tenant)
+        API_RESPONSES.inc(tenant=tenant, code='error')
+        raise ConnectionError(CONNECTION_ERROR.format(
+            error=error,
+            **askings,
+        ))
+    if (response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+            or response.status_code == HTTPStatus.TOO_MANY_REQUESTS):
+        API_BREAKER.failure()
+    else:
+        API_BREAKER.success()
+    latency = time.perf_counter() - started
+    API_LATENCY.observe(latency, tenant=tenant)
+    API_RESPONSES.inc(tenant=tenant, code=response.status_code)
+    logger.debug(
+        API_ANSWERED.format(code=response.status_code, latency=latency),
+        extra={'tenant': tenant, 'latency': latency, 'sampled': True})
+    return response
+
+
+def request_homeworks(timestamp, headers, session=None, cache=None,
+                      tenant=DEFAULT_TENANT):
+    """Запрос к API с заданными заголовками авторизации.
+
+    Ответ, который не изменился с прошлого запроса с тем же
+    кэшем, не разбирается: вместо него возвращается None. Каждый
+    вызов получает свой разобранный ответ, даже если HTTP-запрос
+    был общим.
+    """
+    response = fetch_response(timestamp, headers, session, cache, tenant)
+    if response is None:
+        return None
     response_json = response.json()
     for key in ['error', 'code']:
         if key in response_json:
             raise ValueError(RESPONSE_JSON_ERROR.format(
                 key=key,
                 value=response_json.get(key),
-                **askings,))
+                url=ENDPOINT, headers=headers,
+                params={'from_date': timestamp}))
     return response_json
 
 
+def stream_homeworks(timestamp, headers, session=None,
+                     tenant=DEFAULT_TENANT):
+    """Потоковый запрос для длинной истории работ.
+
+    Возвращает HomeworkStream: работы читаются из тела ответа
+    по одной, и память не растёт с длиной истории.
+    """
+    response = fetch_response(
+        timestamp, headers, session, tenant=tenant, stream=True)
+    return HomeworkStream(
+        response.iter_content(STREAM_CHUNK_SIZE), close=response.close)
+
+
+def get_api_answer(timestamp):
+    """Запрос к единственному эндпоинту API-сервиса."""
+    return request_homeworks(timestamp, HEADERS)
+
+
+@metrics.count_failures(VALIDATION_FAILURES, stage='check_response')
 def check_response(response):
     """Проверка ответа API на соответствие документации."""
     if not isinstance(response, dict):
@@ -117,51 +367,110 @@ def check_response(response):
     return homeworks
 
 
-def parse_status(homework):
-    """Извлечение статуса домашней работы."""
+def homework_fields(homework):
+    """Название и статус работы; KeyError, если их нет."""
     if 'homework_name' not in homework:
         raise KeyError(KEY_ERROR.format(key='homework_name'))
     if 'status' not in homework:
         raise KeyError(KEY_ERROR.format(key='status'))
-    status = homework['status']
+    return homework['homework_name'], homework['status']
+
+
+@metrics.count_failures(VALIDATION_FAILURES, stage='parse_status')
+def parse_status(homework):
+    """Извлечение статуса домашней работы."""
+    name, status = homework_fields(homework)
     if status not in HOMEWORK_VERDICTS:
         raise ValueError(STATUS.format(status=status))
-    return STATUS_VERDICT.format(
-        name=homework['homework_name'], verdict=HOMEWORK_VERDICTS[status])
+    return VERDICTS.render(name, status)
+
+
+@metrics.count_failures(VALIDATION_FAILURES, stage='render_status')
+def render_status(homework, locale=None):
+    """Сообщение о статусе работы на языке locale.
+
+    В отличие от parse_status, неизвестный статус не прерывает
+    цикл: для него используется вердикт UNKNOWN_VERDICT.
+    """
+    return VERDICTS.render(*homework_fields(homework), locale)
+
+
+def render_changes(homeworks, locale=None):
+    """Одно сообщение обо всех изменившихся работах."""
+    return '\n\n'.join(
+        render_status(homework, locale) for homework in homeworks)
+
+
+def render_messages(homeworks, locale=None):
+    """Сообщения об изменившихся работах не длиннее MESSAGE_LIMIT.
+
+    Telegram отклоняет более длинные сообщения, и ответ с длинной
+    историей иначе не удалось бы зафиксировать.
+    """
+    return list(outbox.batches(
+        render_status(homework, locale) for homework in homeworks))
+
+
+def error_text(error, count):
+    """Текст уведомления об ошибке или о продолжающемся сбое."""
+    if count == 1:
+        return ERROR.format(error=error)
+    return STILL_FAILING.format(error=error, count=count)
 
 
 def main():
     """Основная логика работы бота."""
     check_tokens()
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
+    if bot_api.TELEGRAM_SENDER == bot_api.PTB:
+        bot = telegram.Bot(token=TELEGRAM_TOKEN)
+    else:
+        bot = bot_api.make_bot(TELEGRAM_TOKEN)
     send_message(bot, FIRST_MESSAGE)
     timestamp = int(time.time())
-    last_error = ''
+    errors = ErrorFilter()
+    statuses = StatusTracker()
     while True:
         try:
             response = get_api_answer(timestamp)
             homeworks = check_response(response)
-            if homeworks and send_message(bot, parse_status(homeworks[0])):
-                timestamp = response.get('current_date', timestamp)
+            changes = statuses.diff(schema.validate(homeworks))
+            if all(send_message(bot, message)
+                   for message in render_messages(changes)):
+                statuses.commit()
+                if homeworks:
+                    timestamp = response.get('current_date', timestamp)
+            errors.reset()
         except Exception as error:
-            if (last_error != error
-                    and send_message(bot, ERROR.format(error=error))):
-                last_error = error
+            count = errors.report(error)
+            if count and send_message(bot, error_text(error, count)):
+                errors.mark_sent(error)
             logger.error(ERROR.format(error=error))
         finally:
             time.sleep(RETRY_PERIOD)
 
 
 if __name__ == '__main__':
-    formatter = '%(lineno)d, %(asctime)s, %(levelname)s, %(message)s'
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format=formatter,
-        filename=f'{__file__}.log',
-        filemode='w',
-    )
-    console = logging.StreamHandler()
-    console.setLevel(logging.INFO)
-    console.setFormatter(logging.Formatter(formatter))
-    logging.getLogger('').addHandler(console)
-    main()
+    if '--startup-profile' in sys.argv[1:]:
+        import startup
+        sys.exit(startup.main())
+    log_setup.setup_logging(f'{__file__}.log')
+    if metrics.METRICS_PORT:
+        metrics.start_metrics_server()
+    if sys.argv[1:2] == ['backfill']:
+        import backfill
+        backfill.main(sys.argv[2:])
+    elif os.getenv('ASYNC_MODE'):
+        import asyncio
+        import async_bot
+        asyncio.run(async_bot.main())
+    elif os.getenv('WEBHOOK_PORT'):
+        import webhook
+        webhook.main()
+    elif int(os.getenv('SHARD_WORKERS', 0)) > 1:
+        import sharding
+        sharding.run_workers()
+    elif os.getenv('TENANTS_FILE') or os.getenv('STATE_PATH'):
+        import tenants
+        tenants.main()
+    else:
+        main()
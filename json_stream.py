@@ -0,0 +1,150 @@
+"""Потоковый разбор ответа API без загрузки всего тела в память.
+
+HomeworkStream читает тело по частям и отдаёт работы из списка
+homeworks по одной, как только очередная работа пришла целиком.
+Остальные ключи верхнего уровня (current_date, code, error)
+собираются в словарь fields. В памяти одновременно находятся только
+необработанный хвост тела и одна работа.
+"""
+import codecs
+import json
+import re
+
+TYPE_DICTIONARY_ERROR = 'Ответ API должен быть словарём, получено: {types}'
+TYPE_LIST_ERROR = 'Ключ homeworks должен содержать список, получено: {types}'
+KEY_MISSING = 'В ответе API нет ключа {key}.'
+RESPONSE_ERROR = 'API вернул ошибку: {key}={value}'
+UNEXPECTED_END = 'Ответ API оборвался'
+UNEXPECTED_CHAR = 'Неожиданный символ {char!r} в позиции {position}'
+
+ARRAY_KEY = 'homeworks'
+ERROR_KEYS = ('error', 'code')
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+_decoder = json.JSONDecoder()
+
+
+class HomeworkStream:
+    """Итератор работ из тела ответа, поступающего частями.
+
+    После полного прохода в fields лежат остальные ключи ответа,
+    а в count - число прочитанных работ.
+    """
+
+    def __init__(self, chunks, close=None):
+        """Поток по итерируемому набору частей тела (bytes или str)."""
+        self.chunks = iter(chunks)
+        self.close = close
+        self.fields = {}
+        self.count = 0
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._position = 0
+        self._finished = False
+
+    def __iter__(self):
+        """Работы из списка homeworks по одной."""
+        try:
+            yield from self._parse()
+        finally:
+            if self.close is not None:
+                self.close()
+        for key in ERROR_KEYS:
+            if key in self.fields:
+                raise ValueError(RESPONSE_ERROR.format(
+                    key=key, value=self.fields[key]))
+
+    def _parse(self):
+        if self._next_char() != '{':
+            raise TypeError(TYPE_DICTIONARY_ERROR.format(
+                types=type(self._value())))
+        self._position += 1
+        seen_array = False
+        char = self._next_char()
+        while char != '}':
+            if self.fields or seen_array:
+                self._expect(',')
+            key = self._value()
+            self._next_char()
+            self._expect(':')
+            if key == ARRAY_KEY:
+                seen_array = True
+                yield from self._array()
+            else:
+                self.fields[key] = self._value()
+            char = self._next_char()
+        self._position += 1
+        if not seen_array and not any(
+                key in self.fields for key in ERROR_KEYS):
+            raise KeyError(KEY_MISSING.format(key=ARRAY_KEY))
+
+    def _array(self):
+        if self._next_char() != '[':
+            raise TypeError(TYPE_LIST_ERROR.format(types=type(self._value())))
+        self._position += 1
+        char = self._next_char()
+        while char != ']':
+            if self.count:
+                self._expect(',')
+            yield self._value()
+            self.count += 1
+            char = self._next_char()
+        self._position += 1
+
+    def _expect(self, char):
+        if self._next_char() != char:
+            raise ValueError(UNEXPECTED_CHAR.format(
+                char=self._buffer[self._position],
+                position=self._position))
+        self._position += 1
+
+    def _next_char(self):
+        """Первый значимый символ, при необходимости с дочиткой тела."""
+        while True:
+            match = WHITESPACE.match(self._buffer, self._position)
+            self._position = match.end()
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._read():
+                raise ValueError(UNEXPECTED_END)
+
+    def _value(self):
+        """Очередное значение JSON целиком.
+
+        Значение считается полным, только если за ним в буфере уже
+        есть символ: иначе число могло оборваться на середине. Разбор
+        незавершённого значения повторяется, когда буфер вырос вдвое,
+        чтобы длинное значение не разбиралось заново на каждой части.
+        """
+        self._next_char()
+        attempt = 0
+        while True:
+            if self._finished or len(self._buffer) >= attempt:
+                try:
+                    value, end = _decoder.raw_decode(
+                        self._buffer, self._position)
+                except json.JSONDecodeError:
+                    if self._finished:
+                        raise
+                else:
+                    if end < len(self._buffer) or self._finished:
+                        self._position = end
+                        return value
+                attempt = 2 * len(self._buffer)
+            self._read()
+
+    def _read(self):
+        """Дочитывание следующей части; False, если тело кончилось."""
+        if self._finished:
+            return False
+        self._buffer = self._buffer[self._position:]
+        self._position = 0
+        for chunk in self.chunks:
+            if isinstance(chunk, bytes):
+                chunk = self._text.decode(chunk)
+            if chunk:
+                self._buffer += chunk
+                return True
+        self._buffer += self._text.decode(b'', final=True)
+        self._finished = True
+        return True
@@ -0,0 +1,27 @@
+"""Отложенный импорт тяжёлых зависимостей.
+
+python-telegram-bot и requests вместе с urllib3 и certifi загружаются
+дольше, чем весь остальной бот. Модуль, импортированный через
+lazy_import, выполняется при первом обращении к его атрибуту, поэтому
+запуск бота не ждёт зависимостей, которые понадобятся позже.
+"""
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    """Модуль name, загружаемый при первом обращении к атрибуту.
+
+    Уже загруженный модуль возвращается как есть. Вложенные модули
+    (telegram.error) загружают родительский пакет сразу, поэтому
+    откладывать имеет смысл только импорт пакета верхнего уровня.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
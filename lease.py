@@ -0,0 +1,285 @@
+"""Аренда пользователей: каждого опрашивает только один экземпляр бота.
+
+Экземпляр захватывает аренду пользователя на LEASE_TTL секунд и
+продлевает её раз в LEASE_RENEW секунд. Чужая аренда захватывается,
+только когда она истекла или освобождена. При остановке экземпляр
+дописывает контрольные точки и освобождает аренду, поэтому во время
+выкладки новый экземпляр подхватывает пользователей через несколько
+секунд, а не через период опроса.
+
+Аренда хранится в SQLite (по умолчанию) или в JSON-файле под
+блокировкой fcntl; другие хранилища подключаются через BACKENDS.
+"""
+import abc
+from contextlib import contextmanager
+import json
+import logging
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+
+LEASE_BACKEND = os.getenv('LEASE_BACKEND', 'sqlite')
+LEASE_PATH = os.getenv('LEASE_PATH', '')
+LEASE_TTL = float(os.getenv('LEASE_TTL', 15))
+LEASE_RENEW = float(os.getenv('LEASE_RENEW', 3))
+RESTART_GAP = float(os.getenv('RESTART_GAP', 600))
+INSTANCE_ID = os.getenv('INSTANCE_ID') or socket.gethostname()
+QUERY_CHUNK = 500
+
+LEASE_BACKEND_ERROR = 'Неизвестное хранилище аренды {backend}'
+LEASES_CHANGED = ('Экземпляр {owner}: получено пользователей {acquired}, '
+                  'потеряно {lost}, всего {held}')
+LEASES_RELEASED = 'Экземпляр {owner}: освобождено пользователей {count}'
+
+logger = logging.getLogger(__name__)
+
+
+def claim(leases, keys, owner, now):
+    """Ключи, аренду которых можно взять, и окончание прежней аренды.
+
+    leases - словарь {ключ: (владелец, окончание)}. Для ключа без
+    аренды окончание равно 0, для своей аренды - её текущее окончание.
+    """
+    claimed = {}
+    for key in keys:
+        holder, expires_at = leases.get(key, (owner, 0.0))
+        if holder == owner or expires_at <= now:
+            claimed[key] = expires_at
+    return claimed
+
+
+class LeaseStore(abc.ABC):
+    """Хранилище аренды.
+
+    Хранилище должно выполнять acquire и release атомарно
+    относительно других экземпляров.
+    """
+
+    @abc.abstractmethod
+    def acquire(self, keys, owner, now, ttl):
+        """Захват и продление аренды ключей до now + ttl.
+
+        Возвращает {ключ: окончание прежней аренды} для ключей,
+        аренда которых теперь у owner; занятые другими ключи
+        пропускаются.
+        """
+
+    @abc.abstractmethod
+    def release(self, keys, owner, now):
+        """Освобождение аренды ключей, которые держит owner."""
+
+    def close(self):
+        """Освобождение ресурсов хранилища."""
+
+
+class SQLiteLeases(LeaseStore):
+    """Аренда в общей базе SQLite."""
+
+    def __init__(self, path):
+        """Открытие или создание базы."""
+        self._db = sqlite3.connect(
+            path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, '
+            'owner TEXT NOT NULL, expires_at REAL NOT NULL)')
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+
+    def _rows(self, db, keys):
+        rows = {}
+        for start in range(0, len(keys), QUERY_CHUNK):
+            chunk = keys[start:start + QUERY_CHUNK]
+            rows.update(
+                (key, (owner, expires_at))
+                for key, owner, expires_at in db.execute(
+                    'SELECT key, owner, expires_at FROM leases '
+                    f'WHERE key IN ({", ".join("?" * len(chunk))})', chunk))
+        return rows
+
+    def acquire(self, keys, owner, now, ttl):
+        """Захват и продление аренды одной транзакцией."""
+        keys = list(keys)
+        with self._transaction() as db:
+            claimed = claim(self._rows(db, keys), keys, owner, now)
+            db.executemany(
+                'INSERT OR REPLACE INTO leases (key, owner, expires_at) '
+                'VALUES (?, ?, ?)',
+                [(key, owner, now + ttl) for key in claimed])
+        return claimed
+
+    def release(self, keys, owner, now):
+        """Окончание аренды в момент now."""
+        with self._transaction() as db:
+            db.executemany(
+                'UPDATE leases SET expires_at = ? '
+                'WHERE key = ? AND owner = ? AND expires_at > ?',
+                [(now, key, owner, now) for key in keys])
+
+    def close(self):
+        """Закрытие базы."""
+        self._db.close()
+
+
+class FileLeases(LeaseStore):
+    """Аренда в JSON-файле, заменяемом атомарно под блокировкой."""
+
+    def __init__(self, path):
+        """Хранилище в файле path; блокировка - в файле path.lock."""
+        self.path = path
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        import fcntl
+        with self._lock, open(f'{self.path}.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                leases = {}
+                if os.path.exists(self.path):
+                    with open(self.path, encoding='utf-8') as file:
+                        leases = {
+                            key: tuple(value)
+                            for key, value in json.load(file).items()}
+                yield leases
+                self._write(leases)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _write(self, leases):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        descriptor, temp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+                json.dump(leases, file)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def acquire(self, keys, owner, now, ttl):
+        """Захват и продление аренды под блокировкой файла."""
+        with self._locked() as leases:
+            claimed = claim(leases, keys, owner, now)
+            for key in claimed:
+                leases[key] = (owner, now + ttl)
+        return claimed
+
+    def release(self, keys, owner, now):
+        """Окончание аренды в момент now."""
+        with self._locked() as leases:
+            for key in keys:
+                holder, expires_at = leases.get(key, (None, 0.0))
+                if holder == owner and expires_at > now:
+                    leases[key] = (owner, now)
+
+
+BACKENDS = {
+    'sqlite': SQLiteLeases,
+    'file': FileLeases,
+}
+
+
+class LeaseKeeper:
+    """Аренда, которую держит этот экземпляр."""
+
+    def __init__(self, store, owner=None, ttl=LEASE_TTL,
+                 renew=LEASE_RENEW, clock=time.time):
+        """Экземпляр owner без аренды; захват - в renew().
+
+        По умолчанию владелец - INSTANCE_ID и номер процесса: у старого
+        и нового экземпляров при выкладке они различаются, даже если
+        имя машины одно.
+        """
+        self.store = store
+        self.owner = owner or f'{INSTANCE_ID}-{os.getpid()}'
+        self.ttl = ttl
+        self.period = renew
+        self.clock = clock
+        self.held = set()
+        self.previous = {}
+        self._renewed_at = None
+
+    def due(self):
+        """Пора ли продлевать аренду."""
+        return (self._renewed_at is None
+                or self.clock() - self._renewed_at >= self.period)
+
+    def holds(self, key):
+        """Держит ли экземпляр аренду ключа.
+
+        Аренда, не продлённая за ttl секунд, могла перейти к другому
+        экземпляру, поэтому после этого срока ключ не считается своим.
+        """
+        return key in self.held and (
+            self.clock() < self._renewed_at + self.ttl)
+
+    def extend(self):
+        """Продление уже взятой аренды без захвата новых ключей."""
+        self.renew(set(self.held))
+
+    def renew(self, keys):
+        """Продление аренды нужных ключей и освобождение остальных.
+
+        Для новых ключей запоминается окончание прежней аренды:
+        по нему видно, подхватил ли экземпляр пользователя у другого.
+        """
+        now = self._renewed_at = self.clock()
+        keys = set(keys)
+        surplus = self.held - keys
+        if surplus:
+            self.store.release(surplus, self.owner, now)
+        claimed = self.store.acquire(keys, self.owner, now, self.ttl)
+        acquired = claimed.keys() - self.held
+        lost = self.held - surplus - claimed.keys()
+        for key in acquired:
+            self.previous[key] = claimed[key]
+        if acquired or lost or surplus:
+            logger.info(LEASES_CHANGED.format(
+                owner=self.owner, acquired=len(acquired),
+                lost=len(lost | surplus), held=len(claimed)))
+        self.held = set(claimed)
+
+    def handover(self, key):
+        """Подхвачен ли ключ у экземпляра, остановленного недавно.
+
+        Если прежняя аренда закончилась меньше RESTART_GAP секунд
+        назад, это выкладка или перезапуск, а не новый запуск бота.
+        """
+        return self.clock() - self.previous.get(key, 0.0) < RESTART_GAP
+
+    def release(self):
+        """Освобождение всей аренды при остановке."""
+        held, self.held = self.held, set()
+        if held:
+            self.store.release(held, self.owner, self.clock())
+            logger.info(LEASES_RELEASED.format(
+                owner=self.owner, count=len(held)))
+
+
+def open_leases(backend=None, path=None):
+    """Хранилище аренды по настройкам окружения."""
+    backend = backend or LEASE_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(LEASE_BACKEND_ERROR.format(backend=backend))
+    return BACKENDS[backend](path or LEASE_PATH)
+
+
+def from_env():
+    """Аренда по настройкам окружения или None, если она не включена."""
+    if not LEASE_PATH:
+        return None
+    return LeaseKeeper(open_leases())
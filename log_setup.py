@@ -0,0 +1,135 @@
+"""Неблокирующий журнал в формате JSON с ротацией файлов.
+
+Потоки бота только кладут записи в очередь (QueueHandler), а в файл
+и на консоль их пишет отдельный поток QueueListener. Файл не
+перезаписывается при запуске, а ротируется по размеру (LOG_MAX_BYTES)
+или по времени (LOG_ROTATE_WHEN, например midnight). Записи DEBUG,
+помеченные sampled, попадают в журнал с долей LOG_SAMPLE_RATE:
+это частые сообщения об успешных опросах и отправках.
+"""
+import atexit
+import json
+import logging
+from logging.handlers import (
+    QueueHandler, QueueListener, RotatingFileHandler,
+    TimedRotatingFileHandler,
+)
+import os
+import queue
+import random
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUPS = int(os.getenv('LOG_BACKUPS', 5))
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN', '')
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', 0.1))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+
+TEXT_FORMAT = '%(lineno)d, %(asctime)s, %(levelname)s, %(message)s'
+FIELDS = ('tenant', 'chat_id', 'homework', 'status', 'latency')
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись журнала одной строкой JSON.
+
+    Кроме времени, уровня и текста в запись попадают поля FIELDS,
+    переданные через extra.
+    """
+
+    def format(self, record):
+        """Строка JSON для записи."""
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'line': record.lineno,
+            'message': record.getMessage(),
+        }
+        for name in FIELDS:
+            if hasattr(record, name):
+                data[name] = getattr(record, name)
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SampleFilter(logging.Filter):
+    """Пропуск доли rate записей DEBUG, помеченных sampled."""
+
+    def __init__(self, rate=LOG_SAMPLE_RATE, rng=random.random):
+        """Фильтр с заданной долей пропускаемых записей."""
+        super().__init__()
+        self.rate = rate
+        self.rng = rng
+
+    def filter(self, record):
+        """Остальные записи пропускаются всегда."""
+        if record.levelno > logging.DEBUG or not getattr(
+                record, 'sampled', False):
+            return True
+        return self.rng() < self.rate
+
+
+class QueueLogHandler(QueueHandler):
+    """QueueHandler, не блокирующий поток при переполненной очереди.
+
+    При переполнении запись отбрасывается: журнал не должен
+    задерживать опрос API и отправку сообщений.
+    """
+
+    def enqueue(self, record):
+        """Запись в очередь без ожидания."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+class LogListener(QueueListener):
+    """QueueListener, который можно останавливать повторно."""
+
+    def stop(self):
+        """Остановка потока записи, если он запущен."""
+        if self._thread is not None:
+            super().stop()
+
+
+def file_handler(filename):
+    """Обработчик файла с ротацией по размеру или по времени."""
+    if LOG_ROTATE_WHEN:
+        return TimedRotatingFileHandler(
+            filename, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUPS,
+            encoding='utf-8')
+    return RotatingFileHandler(
+        filename, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+        encoding='utf-8')
+
+
+def setup_logging(filename):
+    """Настройка корневого журнала; возвращает запущенный QueueListener.
+
+    Лишние записи DEBUG отбрасываются ещё до очереди. Слушатель
+    останавливается при выходе из программы, дописав оставшиеся
+    в очереди записи.
+    """
+    log_file = file_handler(filename)
+    log_file.setLevel(LOG_LEVEL)
+    if LOG_FORMAT == 'json':
+        log_file.setFormatter(JsonFormatter())
+    else:
+        log_file.setFormatter(logging.Formatter(TEXT_FORMAT))
+    console = logging.StreamHandler()
+    console.setLevel(logging.INFO)
+    console.setFormatter(logging.Formatter(TEXT_FORMAT))
+    records = queue.Queue(LOG_QUEUE_SIZE)
+    listener = LogListener(
+        records, log_file, console, respect_handler_level=True)
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    handler = QueueLogHandler(records)
+    handler.addFilter(SampleFilter(LOG_SAMPLE_RATE))
+    root.addHandler(handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
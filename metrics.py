@@ -0,0 +1,280 @@
+"""Метрики бота в текстовом формате Prometheus.
+
+Счётчики, датчики и гистограммы регистрируются в общем реестре
+и отдаются встроенным HTTP-сервером по адресу /metrics.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+import functools
+from http import HTTPStatus
+import logging
+import os
+import threading
+import time
+
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1, 2.5, 5, 10, 30)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+METRICS_STARTED = 'Метрики доступны на http://{host}:{port}/metrics'
+METRIC_DUPLICATE = 'Метрика {name} уже зарегистрирована'
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value):
+    return (str(value).replace('\\', '\\\\')
+            .replace('"', '\\"').replace('\n', '\\n'))
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Metric:
+    """Метрика с набором меток."""
+
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        """Метрика без значений."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """Строки значений метрики."""
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f'{self.name}{_labels(self.labelnames, key)} {value}'
+            for key, value in items
+        ]
+
+    def render(self):
+        """Описание и значения метрики."""
+        return '\n'.join([
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+            *self.samples(),
+        ])
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """Увеличение счётчика."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """Текущее значение счётчика."""
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """Датчик: произвольное значение или функция, вычисляющая его."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        """Датчик; function без аргументов вызывается при выгрузке."""
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def set(self, value, **labels):
+        """Установка значения."""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels):
+        """Текущее значение датчика."""
+        if self.function is not None:
+            return self.function()
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        """Строки значений датчика."""
+        if self.function is not None:
+            return [f'{self.name} {self.function()}']
+        return super().samples()
+
+
+class Histogram(Metric):
+    """Распределение значений по корзинам."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        """Гистограмма с заданными границами корзин."""
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        """Учёт одного значения."""
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(
+                key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Учёт длительности блока кода."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        """Число учтённых значений."""
+        counts, _ = self._values.get(self._key(labels), ((), 0))
+        return sum(counts)
+
+    def samples(self):
+        """Строки корзин, суммы и количества."""
+        with self._lock:
+            items = [(key, (list(counts), total))
+                     for key, (counts, total) in self._values.items()]
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            bounds = [*self.buckets, '+Inf']
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = _labels(self.labelnames, key, [('le', bound)])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {total}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Набор метрик, выгружаемых вместе."""
+
+    def __init__(self):
+        """Пустой реестр."""
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Регистрация метрики.
+
+        Повторная регистрация такой же метрики возвращает уже
+        зарегистрированную: модуль может быть загружен дважды,
+        как __main__ и по имени.
+        """
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is None:
+                self._metrics[metric.name] = metric
+                return metric
+        if (type(existing) is not type(metric)
+                or existing.labelnames != metric.labelnames):
+            raise ValueError(METRIC_DUPLICATE.format(name=metric.name))
+        return existing
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    """Счётчик в общем реестре."""
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=(), function=None):
+    """Датчик в общем реестре."""
+    return REGISTRY.register(
+        Gauge(name, documentation, labelnames, function))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """Гистограмма в общем реестре."""
+    return REGISTRY.register(
+        Histogram(name, documentation, labelnames, buckets))
+
+
+def count_failures(metric, **labels):
+    """Декоратор: учёт исключений функции в счётчике."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                metric.inc(**labels)
+                raise
+        return wrapper
+    return decorator
+
+
+def metrics_handler(registry=REGISTRY):
+    """Класс HTTP-обработчика, отдающего метрики по GET /metrics.
+
+    http.server тянет за собой пакет email и загружается только при
+    запуске сервера метрик, а не при импорте бота.
+    """
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """Выдача метрик по GET /metrics."""
+
+        def do_GET(self):
+            """Ответ с метриками или 404."""
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(HTTPStatus.NOT_FOUND)
+                return
+            body = registry.render().encode()
+            self.send_response(HTTPStatus.OK)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            """Запросы к метрикам не пишутся в журнал."""
+
+    return MetricsHandler
+
+
+def start_metrics_server(port=None, host=None):
+    """Запуск HTTP-сервера метрик в фоновом потоке."""
+    from http.server import ThreadingHTTPServer
+    server = ThreadingHTTPServer(
+        (host or METRICS_HOST, METRICS_PORT if port is None else port),
+        metrics_handler(),
+    )
+    thread = threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True)
+    thread.start()
+    logger.info(METRICS_STARTED.format(
+        host=server.server_address[0], port=server.server_address[1]))
+    return server
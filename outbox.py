@@ -0,0 +1,287 @@
+"""Очередь исходящих сообщений Telegram.
+
+Опрос API кладёт сообщения в очередь и не ждёт доставки. Пул потоков
+отправляет их с учётом ограничений Telegram: token bucket на каждый
+чат и один общий на бота. Сообщения в один чат, пришедшие в пределах
+окна склейки, уходят одним сообщением. RetryAfter и сетевые ошибки
+приводят к повтору, остальные ошибки и исчерпание попыток - в очередь
+недоставленных сообщений.
+"""
+from collections import deque
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+
+from telegram.error import (BadRequest, NetworkError, RetryAfter,
+                            TelegramError)
+
+from ratelimit import TokenBucket
+
+OUTBOX_WORKERS = int(os.getenv('OUTBOX_WORKERS', 4))
+CHAT_RATE = float(os.getenv('CHAT_RATE', 1))
+CHAT_BURST = int(os.getenv('CHAT_BURST', 3))
+GLOBAL_RATE = float(os.getenv('GLOBAL_RATE', 25))
+COALESCE_WINDOW = float(os.getenv('COALESCE_WINDOW', 1))
+SEND_ATTEMPTS = int(os.getenv('SEND_ATTEMPTS', 5))
+SEND_BACKOFF = float(os.getenv('SEND_BACKOFF', 2))
+MESSAGE_LIMIT = 4096
+DEAD_LETTERS_LIMIT = 1000
+
+CALLBACK_ERROR = 'Ошибка обработчика доставки в чат {chat_id}: {error}'
+DEAD_LETTER = 'Сообщение в чат {chat_id} не доставлено: {error}'
+MESSAGE_SENT = 'Сообщение в чат {chat_id} отправлено, склеено: {count}'
+RETRY_SCHEDULED = ('Повтор отправки в чат {chat_id} через {delay:.1f} с, '
+                   'ошибка: {error}')
+
+logger = logging.getLogger(__name__)
+
+
+def batches(lines, limit=MESSAGE_LIMIT):
+    """Склейка строк в сообщения не длиннее limit символов.
+
+    Строки разделяются пустой строкой; строка длиннее limit
+    разрезается на части.
+    """
+    batch = []
+    size = 0
+    for line in lines:
+        for start in range(0, len(line) or 1, limit):
+            part = line[start:start + limit]
+            if batch and size + 2 + len(part) > limit:
+                yield '\n\n'.join(batch)
+                batch, size = [], 0
+            size += len(part) + (2 if batch else 0)
+            batch.append(part)
+    if batch:
+        yield '\n\n'.join(batch)
+
+
+class Envelope:
+    """Сообщение в очереди и обработчик результата его доставки."""
+
+    __slots__ = ('text', 'callback', 'attempts')
+
+    def __init__(self, text, callback=None):
+        """Сообщение, ещё не отправлявшееся."""
+        self.text = text
+        self.callback = callback
+        self.attempts = 0
+
+
+class Outbox:
+    """Очередь исходящих сообщений с пулом отправителей."""
+
+    def __init__(self, bot, workers=OUTBOX_WORKERS, chat_rate=CHAT_RATE,
+                 chat_burst=CHAT_BURST, global_rate=GLOBAL_RATE,
+                 window=COALESCE_WINDOW, attempts=SEND_ATTEMPTS,
+                 backoff=SEND_BACKOFF, clock=time.monotonic, breaker=None):
+        """Очередь; отправители запускаются методом start().
+
+        С выключателем breaker (breaker.CircuitBreaker) при недоступном
+        Telegram пачки откладываются до пробного вызова, не расходуя
+        попыток.
+        """
+        self.bot = bot
+        self.breaker = breaker
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.window = window
+        self.attempts = attempts
+        self.backoff = backoff
+        self.clock = clock
+        self.global_bucket = TokenBucket(
+            global_rate, max(1, int(global_rate)), clock=clock)
+        self.dead_letters = deque(maxlen=DEAD_LETTERS_LIMIT)
+        self.sent = 0
+        self._chat_buckets = {}
+        self._pending = {}
+        self._in_flight = set()
+        self._ready = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._stopped = False
+
+    def start(self):
+        """Запуск потоков-отправителей."""
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f'outbox-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def put(self, chat_id, text, callback=None):
+        """Постановка сообщения в очередь.
+
+        callback(delivered) вызывается из потока-отправителя после
+        доставки или окончательного отказа.
+        """
+        with self._condition:
+            queue = self._pending.setdefault(chat_id, deque())
+            queue.append(Envelope(text, callback))
+            if len(queue) == 1 and chat_id not in self._in_flight:
+                self._schedule(chat_id, self.window)
+
+    def join(self, timeout=None):
+        """Ожидание, пока очередь не опустеет."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending or self._in_flight:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                self._condition.wait(remaining)
+        return True
+
+    def stop(self, timeout=None):
+        """Остановка отправителей после опустошения очереди."""
+        self.join(timeout)
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _schedule(self, chat_id, delay):
+        heapq.heappush(
+            self._ready, (self.clock() + delay, next(self._order), chat_id))
+        self._condition.notify()
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(
+                self.chat_rate, self.chat_burst, clock=self.clock)
+        return bucket
+
+    def _take(self):
+        """Следующая пачка сообщений, которую можно отправить сейчас."""
+        while not self._stopped:
+            if not self._ready:
+                self._condition.wait()
+                continue
+            due, _, chat_id = self._ready[0]
+            now = self.clock()
+            if due > now:
+                self._condition.wait(due - now)
+                continue
+            heapq.heappop(self._ready)
+            wait = max(self._chat_bucket(chat_id).wait_time(),
+                       self.global_bucket.wait_time())
+            if wait > 0:
+                self._schedule(chat_id, wait)
+                continue
+            self._chat_bucket(chat_id).consume()
+            self.global_bucket.consume()
+            self._in_flight.add(chat_id)
+            return chat_id, self._coalesce(chat_id)
+        return None, None
+
+    def _coalesce(self, chat_id):
+        """Сообщения чата, умещающиеся в одно сообщение Telegram."""
+        queue = self._pending[chat_id]
+        batch = [queue.popleft()]
+        size = len(batch[0].text)
+        while queue and size + 2 + len(queue[0].text) <= MESSAGE_LIMIT:
+            size += 2 + len(queue[0].text)
+            batch.append(queue.popleft())
+        return batch
+
+    def _finish(self, chat_id, batch=None, delay=None):
+        """Возврат неотправленной пачки в очередь и снятие блокировки чата."""
+        with self._condition:
+            self._in_flight.discard(chat_id)
+            queue = self._pending.get(chat_id)
+            if batch:
+                queue.extendleft(reversed(batch))
+            if queue:
+                self._schedule(chat_id, delay or 0)
+            else:
+                self._pending.pop(chat_id, None)
+            self._condition.notify_all()
+
+    def _work(self):
+        while True:
+            with self._condition:
+                chat_id, batch = self._take()
+            if chat_id is None:
+                return
+            retry = self._send(chat_id, batch)
+            if retry is None:
+                self._finish(chat_id)
+            else:
+                self._finish(chat_id, batch, retry)
+
+    def _send(self, chat_id, batch):
+        """Отправка пачки; задержка до повтора или None."""
+        breaker = self.breaker
+        if breaker is not None and not breaker.allow():
+            return breaker.remaining() or breaker.probe_interval
+        try:
+            self.bot.send_message(
+                chat_id, '\n\n'.join(item.text for item in batch))
+        except RetryAfter as error:
+            self._outage(True)
+            return self._retry(chat_id, batch, error, error.retry_after)
+        except BadRequest as error:
+            self._outage(False)
+            self._dead_letter(chat_id, batch, error)
+            return None
+        except NetworkError as error:
+            self._outage(True)
+            attempt = max(item.attempts for item in batch)
+            return self._retry(
+                chat_id, batch, error, self.backoff * 2 ** attempt)
+        except TelegramError as error:
+            self._outage(False)
+            self._dead_letter(chat_id, batch, error)
+            return None
+        self._outage(False)
+        self.sent += 1
+        logger.debug(
+            MESSAGE_SENT.format(chat_id=chat_id, count=len(batch)),
+            extra={'chat_id': chat_id, 'sampled': True})
+        self._notify(chat_id, batch, True)
+        return None
+
+    def _outage(self, failed):
+        """Учёт результата вызова в выключателе."""
+        if self.breaker is None:
+            return
+        if failed:
+            self.breaker.failure()
+        else:
+            self.breaker.success()
+
+    def _retry(self, chat_id, batch, error, delay):
+        for item in batch:
+            item.attempts += 1
+        if max(item.attempts for item in batch) >= self.attempts:
+            self._dead_letter(chat_id, batch, error)
+            return None
+        logger.warning(RETRY_SCHEDULED.format(
+            chat_id=chat_id, delay=delay, error=error))
+        return delay
+
+    def _dead_letter(self, chat_id, batch, error):
+        logger.error(DEAD_LETTER.format(chat_id=chat_id, error=error))
+        for item in batch:
+            self.dead_letters.append((chat_id, item.text, str(error)))
+        self._notify(chat_id, batch, False)
+
+    def _notify(self, chat_id, batch, delivered):
+        for item in batch:
+            if item.callback is None:
+                continue
+            try:
+                item.callback(delivered)
+            except Exception as error:
+                logger.exception(CALLBACK_ERROR.format(
+                    chat_id=chat_id, error=error))
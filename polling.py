@@ -0,0 +1,118 @@
+"""Адаптивный интервал опроса API для каждого пользователя.
+
+Пока работа на проверке, API опрашивается чаще. После ошибок и долгого
+отсутствия изменений интервал растёт экспоненциально со случайным
+разбросом, ответ 429 с Retry-After откладывает опрос на указанное время,
+а token bucket ограничивает число запросов пользователя в час.
+"""
+import os
+import random
+import time
+
+from homework import RETRY_PERIOD
+from ratelimit import TokenBucket
+
+FAST_PERIOD = int(os.getenv('FAST_PERIOD', 120))
+MAX_PERIOD = int(os.getenv('MAX_PERIOD', 3600))
+IDLE_POLLS = int(os.getenv('IDLE_POLLS', 6))
+POLL_JITTER = float(os.getenv('POLL_JITTER', 0.1))
+REQUESTS_PER_HOUR = int(os.getenv('REQUESTS_PER_HOUR', 40))
+REQUESTS_BURST = int(os.getenv('REQUESTS_BURST', 3))
+
+MAX_DOUBLINGS = 16
+REVIEWING = 'reviewing'
+
+
+class PollState:
+    """Состояние расписания опросов одного пользователя."""
+
+    __slots__ = ('_next_due', 'errors', 'idle', 'reviewing',
+                 'retry_after', 'budget', 'listener')
+
+    def __init__(self, budget, next_due=0.0):
+        """Пользователь, которого пора опросить."""
+        self.listener = None
+        self._next_due = next_due
+        self.errors = 0
+        self.idle = 0
+        self.reviewing = False
+        self.retry_after = None
+        self.budget = budget
+
+    @property
+    def next_due(self):
+        """Момент следующего опроса по time.monotonic()."""
+        return self._next_due
+
+    @next_due.setter
+    def next_due(self, value):
+        """Новый срок опроса; listener переносит его в расписание."""
+        self._next_due = value
+        self.notify()
+
+    def notify(self):
+        """Перенос в расписание после смены срока или приоритета."""
+        if self.listener is not None:
+            self.listener()
+
+
+class PollPolicy:
+    """Расчёт времени следующего опроса по его результатам."""
+
+    def __init__(self, base=RETRY_PERIOD, fast=FAST_PERIOD, limit=MAX_PERIOD,
+                 idle_polls=IDLE_POLLS, jitter=POLL_JITTER,
+                 per_hour=REQUESTS_PER_HOUR, burst=REQUESTS_BURST,
+                 clock=time.monotonic, rng=random.random):
+        """Политика с заданными интервалами и бюджетом запросов."""
+        self.base = base
+        self.fast = fast
+        self.limit = limit
+        self.idle_polls = idle_polls
+        self.jitter = jitter
+        self.per_hour = per_hour
+        self.burst = burst
+        self.clock = clock
+        self.rng = rng
+
+    def new_state(self):
+        """Состояние нового пользователя: опросить сразу."""
+        return PollState(
+            TokenBucket(self.per_hour / 3600, self.burst, clock=self.clock),
+            next_due=self.clock(),
+        )
+
+    def success(self, state, changed, reviewing):
+        """Учёт успешного опроса."""
+        state.errors = 0
+        state.retry_after = None
+        state.reviewing = reviewing
+        state.idle = 0 if changed else state.idle + 1
+        return self._schedule(state)
+
+    def failure(self, state, error):
+        """Учёт неудачного опроса."""
+        state.errors += 1
+        state.retry_after = getattr(error, 'retry_after', None)
+        return self._schedule(state)
+
+    def delay(self, state):
+        """Интервал до следующего опроса без учёта бюджета."""
+        if state.retry_after is not None:
+            return state.retry_after
+        if state.errors:
+            delay = self.base * 2 ** min(state.errors - 1, MAX_DOUBLINGS)
+        elif state.reviewing:
+            delay = self.fast
+        elif state.idle > self.idle_polls:
+            delay = self.base * 2 ** min(
+                state.idle - self.idle_polls, MAX_DOUBLINGS)
+        else:
+            delay = self.base
+        delay = min(delay, self.limit)
+        return delay * (1 + self.jitter * (2 * self.rng() - 1))
+
+    def _schedule(self, state):
+        state.budget.consume()
+        delay = max(self.delay(state), state.budget.wait_time())
+        state.next_due = self.clock() + delay
+        return delay
@@ -0,0 +1,40 @@
+"""Ограничение частоты операций алгоритмом token bucket."""
+import threading
+import time
+
+
+class TokenBucket:
+    """Ведро на capacity токенов, пополняемое со скоростью rate в секунду."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        """Полное ведро."""
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def consume(self, tokens=1):
+        """Списание токенов, если их хватает."""
+        with self._lock:
+            self._refill()
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            return True
+
+    def wait_time(self, tokens=1):
+        """Секунды до момента, когда токенов хватит."""
+        with self._lock:
+            self._refill()
+            missing = tokens - self._tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate
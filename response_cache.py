@@ -0,0 +1,87 @@
+"""Кэш отпечатков ответов API: неизменившийся ответ не разбирается.
+
+Если сервер отдаёт ETag, следующий запрос уходит с If-None-Match
+и ответ 304 считается неизменившимся. Иначе сравнивается хеш тела
+ответа без поля current_date, которое меняется при каждом запросе.
+"""
+from http import HTTPStatus
+import hashlib
+import logging
+import re
+
+CACHE_HIT = 'Ответ API для {key} не изменился, разбор пропущен'
+
+CURRENT_DATE = re.compile(rb'"current_date"\s*:\s*-?\d+')
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(content):
+    """Хеш тела ответа без поля current_date."""
+    return hashlib.blake2b(
+        CURRENT_DATE.sub(b'', content), digest_size=16).digest()
+
+
+class CacheSlot:
+    """Отпечаток последнего обработанного ответа одного пользователя."""
+
+    __slots__ = ('key', 'cache', 'from_date', 'etag', 'digest', '_pending')
+
+    def __init__(self, key, cache):
+        """Пустой слот пользователя key."""
+        self.key = key
+        self.cache = cache
+        self.from_date = None
+        self.etag = None
+        self.digest = None
+        self._pending = None
+
+    def prepare(self, from_date, headers):
+        """Заголовки запроса, при возможности с If-None-Match."""
+        if self.etag and from_date == self.from_date:
+            return {**headers, 'If-None-Match': self.etag}
+        return headers
+
+    def unchanged(self, from_date, response):
+        """Совпадает ли ответ с последним обработанным."""
+        self.cache.polls += 1
+        if response.status_code == HTTPStatus.NOT_MODIFIED:
+            return self._hit()
+        digest = fingerprint(response.content)
+        if from_date == self.from_date and digest == self.digest:
+            return self._hit()
+        self._pending = (from_date, response.headers.get('ETag'), digest)
+        return False
+
+    def commit(self):
+        """Запоминание ответа после его успешной обработки."""
+        if self._pending is not None:
+            self.from_date, self.etag, self.digest = self._pending
+            self._pending = None
+
+    def _hit(self):
+        self.cache.short_circuited += 1
+        logger.debug(CACHE_HIT.format(key=self.key),
+                     extra={'tenant': self.key, 'sampled': True})
+        return True
+
+
+class ResponseCache:
+    """Отпечатки ответов API по пользователям."""
+
+    def __init__(self):
+        """Пустой кэш и нулевые счётчики."""
+        self._slots = {}
+        self.polls = 0
+        self.short_circuited = 0
+
+    def slot(self, key):
+        """Слот пользователя; создаётся при первом обращении."""
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = CacheSlot(key, self)
+        return slot
+
+    def discard(self, key):
+        """Удаление отпечатка пользователя."""
+        self._slots.pop(key, None)
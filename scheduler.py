@@ -0,0 +1,94 @@
+"""Расписание опросов для большого числа пользователей.
+
+Сроки хранятся в двоичной куче: постановка в расписание и извлечение
+наступившего срока стоят O(log n), а ближайший срок виден сразу, без
+обхода всех пользователей. Ключи, срок которых наступил, переходят
+в очередь готовых и отдаются сначала по приоритету, затем по сроку:
+пользователи с работой на проверке опрашиваются раньше остальных.
+Готовый ключ остаётся в очереди, пока его не поставят в расписание
+заново, поэтому пропущенный опрос не теряется. Методы можно вызывать
+из разных потоков: поток-отправитель возвращает пользователя
+в расписание после доставки.
+"""
+import heapq
+import itertools
+import threading
+
+URGENT = 0
+NORMAL = 1
+
+COMPACT_RATIO = 2
+
+
+class Scheduler:
+    """Очередь ключей по сроку, а среди наступивших - по приоритету."""
+
+    def __init__(self):
+        """Пустое расписание."""
+        self._timers = []
+        self._entries = {}
+        self._ready = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Число ключей в расписании."""
+        return len(self._entries)
+
+    def __contains__(self, key):
+        """Есть ли ключ в расписании."""
+        return key in self._entries
+
+    def schedule(self, key, due, priority=NORMAL):
+        """Постановка ключа на срок due; прежний срок отменяется.
+
+        Отменённые записи остаются в куче и отбрасываются при
+        извлечении, а когда их становится больше живых, куча
+        перестраивается.
+        """
+        with self._lock:
+            order = next(self._counter)
+            self._entries[key] = (priority, due, order)
+            self._ready.pop(key, None)
+            heapq.heappush(self._timers, (due, order, key))
+            if len(self._timers) > COMPACT_RATIO * len(self._entries) + 64:
+                self._compact()
+
+    def remove(self, key):
+        """Снятие ключа с расписания."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._ready.pop(key, None)
+
+    def due(self, now):
+        """Ключи со сроком не позже now: сначала срочные, затем по сроку."""
+        with self._lock:
+            timers = self._timers
+            while timers and timers[0][0] <= now:
+                _, order, key = heapq.heappop(timers)
+                entry = self._entries.get(key)
+                if entry is not None and entry[2] == order:
+                    self._ready[key] = entry
+            return sorted(self._ready, key=self._ready.__getitem__)
+
+    def next_due(self):
+        """Ближайший срок или None для пустого расписания."""
+        with self._lock:
+            if self._ready:
+                return min(due for _, due, _ in self._ready.values())
+            timers = self._timers
+            while timers:
+                due, order, key = timers[0]
+                entry = self._entries.get(key)
+                if entry is not None and entry[2] == order:
+                    return due
+                heapq.heappop(timers)
+            return None
+
+    def _compact(self):
+        self._timers = [
+            (due, order, key)
+            for key, (_, due, order) in self._entries.items()
+            if key not in self._ready
+        ]
+        heapq.heapify(self._timers)
@@ -0,0 +1,126 @@
+"""Проверка работ из ответа API по заранее собранной схеме.
+
+Схема собирается один раз в функцию проверки одной записи. Список
+работ проверяется за один проход: неправильные записи не прерывают
+цикл, а откладываются в карантин с причиной, остальные идут дальше.
+Время проверки и число отложенных записей видны в метриках.
+"""
+from collections import deque
+import logging
+import os
+import time
+
+import metrics
+
+QUARANTINE_SIZE = int(os.getenv('QUARANTINE_SIZE', 100))
+
+NOT_A_DICT = 'Работа должна быть словарём, получено: {types}'
+FIELD_MISSING = 'В работе нет ключа {key}'
+FIELD_TYPE = 'Ключ {key} должен иметь тип {expected}, получено: {types}'
+RECORD_QUARANTINED = 'Пользователь {tenant}: работа отложена, {reason}'
+
+HOMEWORK_SCHEMA = {
+    'homework_name': ((str,), True),
+    'status': ((str,), True),
+    'id': ((int, str), False),
+    'date_updated': ((str, int, float), False),
+    'reviewer_comment': ((str, type(None)), False),
+}
+
+logger = logging.getLogger(__name__)
+
+VALIDATION_SECONDS = metrics.histogram(
+    'homework_schema_validation_seconds',
+    'Время проверки списка работ по схеме.',
+    buckets=(0.00001, 0.0001, 0.001, 0.01, 0.1, 1))
+RECORDS_CHECKED = metrics.counter(
+    'homework_schema_checked_records_total',
+    'Работы, проверенные по схеме.')
+RECORDS_QUARANTINED = metrics.counter(
+    'homework_schema_quarantined_records_total',
+    'Работы, отложенные в карантин.', ['reason'])
+
+_MISSING = object()
+
+
+def compile_schema(schema):
+    """Функция проверки записи: None или пара (код, причина).
+
+    schema - словарь {ключ: (допустимые типы, обязательный ли)}.
+    """
+    checks = tuple(
+        (key, types, required, ' или '.join(
+            kind.__name__ for kind in types))
+        for key, (types, required) in schema.items()
+    )
+
+    def check(record):
+        if not isinstance(record, dict):
+            return 'type', NOT_A_DICT.format(types=type(record))
+        for key, types, required, expected in checks:
+            value = record.get(key, _MISSING)
+            if value is _MISSING:
+                if required:
+                    return f'missing:{key}', FIELD_MISSING.format(key=key)
+            elif not isinstance(value, types):
+                return f'type:{key}', FIELD_TYPE.format(
+                    key=key, expected=expected, types=type(value))
+        return None
+
+    return check
+
+
+check_homework = compile_schema(HOMEWORK_SCHEMA)
+
+
+class Quarantine:
+    """Последние отложенные записи с причинами."""
+
+    def __init__(self, size=QUARANTINE_SIZE):
+        """Пустой карантин на size записей."""
+        self.records = deque(maxlen=size)
+        self.total = 0
+
+    def __len__(self):
+        """Число хранимых записей."""
+        return len(self.records)
+
+    def add(self, tenant, record, code, reason):
+        """Откладывание записи."""
+        self.records.append((tenant, record, reason))
+        self.total += 1
+        RECORDS_QUARANTINED.inc(reason=code)
+        logger.warning(
+            RECORD_QUARANTINED.format(tenant=tenant, reason=reason),
+            extra={'tenant': tenant})
+
+
+quarantine = Quarantine()
+
+
+def iter_valid(homeworks, tenant='default', check=check_homework):
+    """Правильные работы из итерируемого набора, остальные - в карантин.
+
+    Подходит и для потока из json_stream: записи проверяются по мере
+    поступления, а время проверки учитывается в метрике в конце.
+    """
+    spent = 0.0
+    checked = 0
+    try:
+        for record in homeworks:
+            started = time.perf_counter()
+            problem = check(record)
+            spent += time.perf_counter() - started
+            checked += 1
+            if problem is None:
+                yield record
+            else:
+                quarantine.add(tenant, record, *problem)
+    finally:
+        VALIDATION_SECONDS.observe(spent)
+        RECORDS_CHECKED.inc(checked)
+
+
+def validate(homeworks, tenant='default'):
+    """Список правильных работ; неправильные уходят в карантин."""
+    return list(iter_valid(homeworks, tenant))
@@ -0,0 +1,231 @@
+"""Распределение пользователей между несколькими процессами бота.
+
+Пользователи закрепляются за процессами согласованным хешированием:
+при появлении или уходе процесса переезжает только доля
+пользователей, пропорциональная его доле в кольце. Живые процессы
+отмечаются в общей таблице SQLite (SHARD_PATH) раз в HEARTBEAT_PERIOD
+секунд; процесс, не отмечавшийся MEMBER_TTL секунд, считается ушедшим.
+Каждый процесс опрашивает только своих пользователей.
+
+С SHARD_WORKERS > 1 homework.py сам запускает столько процессов на
+одной машине. Для нескольких машин каждому процессу задаются свой
+WORKER_ID и общий для всех SHARD_PATH.
+"""
+from bisect import bisect
+import hashlib
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+SHARD_WORKERS = int(os.getenv('SHARD_WORKERS', 0))
+SHARD_PATH = os.getenv('SHARD_PATH', '')
+WORKER_ID = os.getenv('WORKER_ID') or os.getenv('DYNO') or (
+    f'{socket.gethostname()}-{os.getpid()}')
+HEARTBEAT_PERIOD = float(os.getenv('HEARTBEAT_PERIOD', 5))
+MEMBER_TTL = float(os.getenv('MEMBER_TTL', 15))
+VNODES = 64
+DEFAULT_SHARD_PATH = 'homework_shards.sqlite3'
+
+REBALANCED = 'Процесс {worker}: состав {members}, моих пользователей {count}'
+WORKER_STARTED = 'Запущен процесс {worker}, pid {pid}'
+WORKER_DIED = 'Процесс {worker} завершился с кодом {code}, перезапуск'
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(value):
+    digest = hashlib.blake2b(value.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HashRing:
+    """Кольцо согласованного хеширования с виртуальными узлами."""
+
+    def __init__(self, nodes=(), replicas=VNODES):
+        """Кольцо из заданных узлов."""
+        self.replicas = replicas
+        self._points = []
+        self._owners = []
+        self.nodes = set()
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self):
+        """Число узлов."""
+        return len(self.nodes)
+
+    def add(self, node):
+        """Добавление узла."""
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        self._rebuild()
+
+    def remove(self, node):
+        """Удаление узла."""
+        self.nodes.discard(node)
+        self._rebuild()
+
+    def node_for(self, key):
+        """Узел, за которым закреплён ключ, или None для пустого кольца."""
+        if not self._points:
+            return None
+        index = bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+    def _rebuild(self):
+        points = sorted(
+            (_hash(f'{node}#{replica}'), node)
+            for node in self.nodes for replica in range(self.replicas)
+        )
+        self._points = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+
+class SQLiteMembership:
+    """Отметки живых процессов в общей базе SQLite."""
+
+    def __init__(self, path, ttl=MEMBER_TTL):
+        """Открытие или создание базы."""
+        self.ttl = ttl
+        self._db = sqlite3.connect(
+            path, timeout=10, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS workers '
+            '(worker TEXT PRIMARY KEY, seen_at REAL NOT NULL)')
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def heartbeat(self, worker, now):
+        """Отметка, что процесс жив."""
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO workers (worker, seen_at) '
+                'VALUES (?, ?)', (worker, now))
+
+    def leave(self, worker):
+        """Удаление отметки при остановке процесса."""
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM workers WHERE worker = ?', (worker,))
+
+    def alive(self, now):
+        """Процессы, отмечавшиеся не раньше ttl секунд назад."""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT worker FROM workers WHERE seen_at >= ? '
+                'ORDER BY worker', (now - self.ttl,)).fetchall()
+        return [worker for worker, in rows]
+
+
+class Coordinator:
+    """Состав процессов и закрепление пользователей за этим процессом."""
+
+    def __init__(self, worker, membership, heartbeat=HEARTBEAT_PERIOD,
+                 clock=time.time):
+        """Координатор процесса worker; состав читается в refresh()."""
+        self.worker = worker
+        self.membership = membership
+        self.heartbeat = heartbeat
+        self.clock = clock
+        self.members = ()
+        self.ring = HashRing()
+        self._checked_at = None
+
+    @property
+    def grace(self):
+        """Задержка перед опросом перешедших к процессу пользователей.
+
+        За это время прежний владелец замечает новый состав
+        и перестаёт их опрашивать.
+        """
+        return 2 * self.heartbeat
+
+    def refresh(self):
+        """Отметка и перечитывание состава; True, если состав изменился.
+
+        Обращается к базе не чаще раза в heartbeat секунд.
+        """
+        now = self.clock()
+        if (self._checked_at is not None
+                and now - self._checked_at < self.heartbeat):
+            return False
+        self._checked_at = now
+        self.membership.heartbeat(self.worker, now)
+        members = tuple(self.membership.alive(now))
+        if self.worker not in members:
+            members = tuple(sorted(members + (self.worker,)))
+        if members == self.members:
+            return False
+        self.members = members
+        self.ring = HashRing(members)
+        return True
+
+    def owns(self, key):
+        """Закреплён ли ключ за этим процессом."""
+        return self.ring.node_for(key) in (self.worker, None)
+
+    def leave(self):
+        """Выход из состава при остановке."""
+        self.membership.leave(self.worker)
+
+
+def from_env():
+    """Координатор по настройкам окружения или None без шардирования."""
+    if not SHARD_PATH and SHARD_WORKERS <= 1:
+        return None
+    return Coordinator(
+        WORKER_ID, SQLiteMembership(SHARD_PATH or DEFAULT_SHARD_PATH))
+
+
+def _worker_main(worker, index):
+    """Точка входа дочернего процесса.
+
+    Метрики процесса с номером index отдаются на порту
+    METRICS_PORT + 1 + index: порт METRICS_PORT занят управляющим
+    процессом, который сам не опрашивает API.
+    """
+    global WORKER_ID
+    WORKER_ID = worker
+    import log_setup
+    import metrics
+    import tenants
+    log_setup.setup_logging(os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        f'homework.py.{worker}.log'))
+    if metrics.METRICS_PORT:
+        metrics.start_metrics_server(metrics.METRICS_PORT + 1 + index)
+    tenants.main()
+
+
+def run_workers(count=SHARD_WORKERS):
+    """Запуск count процессов опроса и перезапуск завершившихся."""
+    context = multiprocessing.get_context('spawn')
+    workers = {}
+
+    def start(index):
+        worker = f'{WORKER_ID}-{index}'
+        process = context.Process(
+            target=_worker_main, args=(worker, index), name=worker,
+            daemon=True)
+        process.start()
+        workers[index] = process
+        logger.info(WORKER_STARTED.format(worker=worker, pid=process.pid))
+
+    for index in range(count):
+        start(index)
+    try:
+        while True:
+            time.sleep(HEARTBEAT_PERIOD)
+            for index, process in list(workers.items()):
+                if not process.is_alive():
+                    logger.error(WORKER_DIED.format(
+                        worker=process.name, code=process.exitcode))
+                    start(index)
+    finally:
+        for process in workers.values():
+            process.terminate()
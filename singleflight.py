@@ -0,0 +1,64 @@
+"""Склейка одновременных одинаковых запросов.
+
+Если запрос с тем же ключом уже выполняется, новый вызов не
+отправляет свой, а ждёт результата первого и получает тот же
+результат или то же исключение. Общий результат нельзя изменять:
+его видят все дождавшиеся вызовы.
+"""
+import threading
+
+import metrics
+
+COALESCED = metrics.counter(
+    'homework_singleflight_coalesced_total',
+    'Вызовы, дождавшиеся результата такого же выполнявшегося вызова.',
+    ['name'])
+
+
+class _Call:
+    """Выполняющийся вызов и его результат."""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Группа вызовов, склеиваемых по ключу."""
+
+    def __init__(self, name):
+        """Пустая группа; name - метка в метриках."""
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Число выполняющихся вызовов."""
+        return len(self._calls)
+
+    def do(self, key, func, *args, **kwargs):
+        """Результат func(*args, **kwargs), общий для вызовов с ключом key."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            COALESCED.inc(name=self.name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
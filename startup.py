@@ -0,0 +1,125 @@
+"""Замер времени запуска бота по этапам.
+
+python homework.py --startup-profile запускает отдельный интерпретатор,
+чтобы все импорты были холодными, и печатает время каждого этапа:
+импорта бота, проверки токенов, загрузки python-telegram-bot,
+создания бота, загрузки requests и создания HTTP-сессии. Если импорт
+бота дольше STARTUP_BUDGET секунд, команда завершается с кодом 1.
+"""
+from contextlib import contextmanager
+import json
+import os
+import subprocess
+import sys
+import time
+
+STARTUP_BUDGET = float(os.getenv('STARTUP_BUDGET', 0.2))
+HEAVY_MODULES = (
+    'telegram.bot', 'requests.sessions', 'urllib3.connectionpool',
+    'http.server',
+)
+IMPORT_PHASE = 'import homework'
+
+PHASE_LINE = '{name:<18} {milliseconds:8.1f} мс {note}'
+TOTAL_LINE = '{name:<18} {milliseconds:8.1f} мс'
+EAGER_MODULES = 'При импорте загружены тяжёлые модули: {modules}'
+BUDGET_EXCEEDED = 'Импорт бота дольше бюджета {budget:.0f} мс'
+
+
+class StartupProfile:
+    """Время этапов запуска."""
+
+    def __init__(self, clock=time.perf_counter):
+        """Профиль без этапов."""
+        self.clock = clock
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        """Замер этапа; ошибка этапа записывается, а не прерывает замер."""
+        started = self.clock()
+        note = ''
+        try:
+            yield
+        except Exception as error:
+            note = f'{type(error).__name__}: {error}'
+        self.phases.append((name, self.clock() - started, note))
+
+
+def profile_here():
+    """Замер этапов запуска в текущем процессе.
+
+    Имеет смысл только в свежем интерпретаторе, где бот ещё
+    не импортирован.
+    """
+    profile = StartupProfile()
+    homework = None
+    with profile.phase(IMPORT_PHASE):
+        import homework
+    eager = [name for name in HEAVY_MODULES if name in sys.modules]
+    with profile.phase('check_tokens'):
+        homework.check_tokens()
+    with profile.phase('import telegram'):
+        homework.telegram.Bot
+    with profile.phase('telegram.Bot'):
+        homework.telegram.Bot(token=homework.TELEGRAM_TOKEN)
+    with profile.phase('import requests'):
+        homework.requests.Session
+    with profile.phase('HTTP session'):
+        homework.get_session()
+    return {'phases': profile.phases, 'eager': eager}
+
+
+def measure(python=sys.executable):
+    """Замер этапов запуска в отдельном интерпретаторе.
+
+    Кроме этапов возвращает общее время работы интерпретатора: разница
+    с суммой этапов - это запуск самого Python.
+    """
+    started = time.perf_counter()
+    result = subprocess.run(
+        [python, '-m', 'startup'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        universal_newlines=True, check=True,
+    )
+    data = json.loads(result.stdout.splitlines()[-1])
+    data['total'] = time.perf_counter() - started
+    return data
+
+
+def import_time(data):
+    """Время импорта бота из результата measure()."""
+    return next(
+        seconds for name, seconds, _ in data['phases']
+        if name == IMPORT_PHASE)
+
+
+def report(data, budget=STARTUP_BUDGET):
+    """Строки отчёта о запуске."""
+    lines = [
+        PHASE_LINE.format(
+            name=name, milliseconds=seconds * 1000, note=note).rstrip()
+        for name, seconds, note in data['phases']
+    ]
+    phases = sum(seconds for _, seconds, _ in data['phases'])
+    lines.append(TOTAL_LINE.format(
+        name='python', milliseconds=(data['total'] - phases) * 1000))
+    lines.append(TOTAL_LINE.format(
+        name='total', milliseconds=data['total'] * 1000))
+    if data['eager']:
+        lines.append(EAGER_MODULES.format(modules=', '.join(data['eager'])))
+    if import_time(data) > budget:
+        lines.append(BUDGET_EXCEEDED.format(budget=budget * 1000))
+    return lines
+
+
+def main():
+    """Печать отчёта; код возврата 1, если бюджет импорта превышен."""
+    data = measure()
+    print('\n'.join(report(data)))
+    return int(import_time(data) > STARTUP_BUDGET)
+
+
+if __name__ == '__main__':
+    print(json.dumps(profile_here(), ensure_ascii=False))
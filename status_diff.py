@@ -0,0 +1,75 @@
+"""Отслеживание статусов всех работ из ответа API."""
+
+
+def homework_key(homework):
+    """Идентификатор работы: id, а при его отсутствии название.
+
+    Ключ - всегда строка, чтобы он не менялся при сохранении в JSON.
+    """
+    return str(homework.get('id', homework.get('homework_name')))
+
+
+class StatusTracker:
+    """Последние отправленные статусы работ одного пользователя."""
+
+    def __init__(self):
+        """Трекер без известных статусов."""
+        self._statuses = {}
+        self._pending = {}
+
+    def __len__(self):
+        """Количество известных работ."""
+        return len(self._statuses)
+
+    def status(self, homework):
+        """Последний отправленный статус работы или None."""
+        return self._statuses.get(homework_key(homework))
+
+    def has_status(self, status, pending=False):
+        """Есть ли работа с заданным последним статусом.
+
+        С pending=True учитываются и изменения, ожидающие commit():
+        так расписание видит статусы, о которых ещё отправляется
+        уведомление.
+        """
+        if not pending:
+            return status in self._statuses.values()
+        return status in self._pending.values() or any(
+            value == status for key, value in self._statuses.items()
+            if key not in self._pending)
+
+    def diff(self, homeworks):
+        """Работы, статус которых изменился, от старых к новым.
+
+        API отдаёт работы от новых к старым, поэтому для каждой
+        работы учитывается первое вхождение. homeworks может быть
+        любым итерируемым объектом, в том числе потоком из
+        json_stream: в памяти остаются только изменившиеся работы.
+        Найденные изменения запоминаются до вызова commit().
+        """
+        changes = {}
+        seen = set()
+        for homework in homeworks:
+            key = homework_key(homework)
+            if key in seen:
+                continue
+            seen.add(key)
+            if self._statuses.get(key, object()) != homework.get('status'):
+                changes[key] = homework
+        self._pending = {
+            key: homework.get('status') for key, homework in changes.items()
+        }
+        return list(changes.values())[::-1]
+
+    def commit(self):
+        """Запоминание статусов после отправки уведомления."""
+        self._statuses.update(self._pending)
+        self._pending = {}
+
+    def load(self, statuses):
+        """Восстановление статусов из словаря {идентификатор: статус}."""
+        self._statuses.update(statuses)
+
+    def dump(self):
+        """Копия известных статусов."""
+        return dict(self._statuses)
@@ -0,0 +1,190 @@
+"""Контрольные точки опроса: время, статусы работ и последняя ошибка.
+
+Изменения копятся в памяти и записываются одной транзакцией
+в flush(), который вызывается раз за цикл опроса. По умолчанию
+используется SQLite в режиме WAL, запасной вариант - JSON-файл,
+заменяемый атомарно под блокировкой fcntl.
+"""
+import abc
+from contextlib import contextmanager
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+
+STATE_BACKEND = os.getenv('STATE_BACKEND', 'sqlite')
+STATE_PATH = os.getenv('STATE_PATH', 'homework_state.sqlite3')
+
+STATE_BACKEND_ERROR = 'Неизвестное хранилище состояния {backend}'
+STATE_FLUSHED = 'Сохранено контрольных точек: {count}'
+
+logger = logging.getLogger(__name__)
+
+
+class StateStore(abc.ABC):
+    """Хранилище контрольных точек с отложенной записью.
+
+    Хранилище реализует _read и _write; без них класс не создаётся.
+    """
+
+    def __init__(self):
+        """Хранилище без несохранённых изменений."""
+        self._dirty = {}
+        self._lock = threading.Lock()
+
+    def load(self, key):
+        """Сохранённое состояние или None."""
+        with self._lock:
+            if key in self._dirty:
+                return self._dirty[key]
+        return self._read(key)
+
+    def save(self, key, state):
+        """Запоминание состояния до следующего flush()."""
+        with self._lock:
+            self._dirty[key] = state
+
+    def flush(self):
+        """Запись накопленных изменений одной транзакцией.
+
+        Если запись не удалась, изменения возвращаются в очередь
+        (более новые, сохранённые за это время, не затираются),
+        и исключение передаётся дальше.
+        """
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        if dirty:
+            try:
+                self._write(dirty)
+            except BaseException:
+                with self._lock:
+                    self._dirty = {**dirty, **self._dirty}
+                raise
+            logger.debug(STATE_FLUSHED.format(count=len(dirty)))
+        return len(dirty)
+
+    def close(self):
+        """Запись изменений и освобождение ресурсов."""
+        self.flush()
+
+    @abc.abstractmethod
+    def _read(self, key):
+        """Сохранённое состояние ключа или None."""
+
+    @abc.abstractmethod
+    def _write(self, states):
+        """Запись словаря {ключ: состояние} одной транзакцией."""
+
+
+class SQLiteStore(StateStore):
+    """Контрольные точки в SQLite в режиме WAL."""
+
+    def __init__(self, path):
+        """Открытие или создание базы."""
+        super().__init__()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=FULL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS checkpoints '
+            '(key TEXT PRIMARY KEY, state TEXT NOT NULL)')
+        self._db.commit()
+        self._db_lock = threading.Lock()
+
+    def _read(self, key):
+        with self._db_lock:
+            row = self._db.execute(
+                'SELECT state FROM checkpoints WHERE key = ?', (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _write(self, states):
+        with self._db_lock, self._db:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO checkpoints (key, state) '
+                'VALUES (?, ?)',
+                [(key, json.dumps(state)) for key, state in states.items()],
+            )
+
+    def close(self):
+        """Запись изменений и закрытие базы."""
+        super().close()
+        self._db.close()
+
+
+class JSONFileStore(StateStore):
+    """Контрольные точки в JSON-файле, заменяемом атомарно.
+
+    Файл могут делить несколько процессов. Чтение перечитывает файл,
+    если его заменили, а запись под блокировкой fcntl сливает свои
+    изменения с текущим содержимым, не затирая чужие контрольные точки.
+    """
+
+    def __init__(self, path):
+        """Хранилище в файле path; блокировка - в файле path.lock."""
+        super().__init__()
+        self.path = path
+        self._states = {}
+        self._version = None
+        self._file_lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self, exclusive):
+        import fcntl
+        with self._file_lock, open(f'{self.path}.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                self._refresh()
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _file_version(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self):
+        version = self._file_version()
+        if version is not None and version != self._version:
+            with open(self.path, encoding='utf-8') as file:
+                self._states = json.load(file)
+            self._version = version
+
+    def _read(self, key):
+        with self._locked(exclusive=False):
+            return self._states.get(key)
+
+    def _write(self, states):
+        with self._locked(exclusive=True):
+            self._states.update(states)
+            directory = os.path.dirname(os.path.abspath(self.path))
+            descriptor, temp_path = tempfile.mkstemp(dir=directory)
+            try:
+                with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+                    json.dump(self._states, file)
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+            self._version = self._file_version()
+
+
+BACKENDS = {
+    'sqlite': SQLiteStore,
+    'json': JSONFileStore,
+}
+
+
+def open_store(backend=None, path=None):
+    """Хранилище контрольных точек по настройкам окружения."""
+    backend = backend or STATE_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(STATE_BACKEND_ERROR.format(backend=backend))
+    return BACKENDS[backend](path or STATE_PATH)
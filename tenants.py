@@ -0,0 +1,728 @@
+"""Опрос API для множества пользователей из одного процесса."""
+from dataclasses import dataclass, field
+import functools
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+from breaker import CircuitOpenError
+from error_filter import ErrorFilter
+import bot_api
+import homework
+import lease
+import metrics
+import storage
+from outbox import OUTBOX_WORKERS, Outbox
+from polling import PollPolicy, PollState, REVIEWING
+from response_cache import ResponseCache
+import schema
+from scheduler import NORMAL, URGENT, Scheduler
+import sharding
+from status_diff import StatusTracker
+
+TENANTS_FILE = os.getenv('TENANTS_FILE')
+STREAM_HISTORY_AGE = int(os.getenv('STREAM_HISTORY_AGE', 7 * 24 * 3600))
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', 10))
+
+TENANT_DUPLICATE = 'Пользователь {name} уже зарегистрирован'
+TENANT_FIELD_ERROR = 'У пользователя {index} нет поля {key}.'
+SUBSCRIPTION_FIELD_ERROR = 'У чата {chat} пользователя {index} нет поля {key}.'
+TENANT_CONFLICT = ('Запись {index} с токеном пользователя {name} '
+                   'задаёт другое значение поля {key}')
+TENANTS_LOADED = 'Загружено пользователей: {count}'
+TENANTS_TYPE_ERROR = 'Файл пользователей должен содержать список, тип: {types}'
+TENANT_POLL_ERROR = 'Пользователь {name}: {error}'
+TENANT_POLL_DEFERRED = 'Пользователь {name}: опрос отложен, {error}'
+STATUS_CHANGED = 'Пользователь {name}: работа {homework} в статусе {status}'
+LEASE_LOST = 'Аренда пользователя {name} потеряна, опрос остановлен'
+TENANTS_RESTORED = 'Восстановлено контрольных точек: {count}'
+CHECKPOINTS_NOT_SAVED = ('Контрольные точки не сохранены, повтор '
+                         'в следующем цикле: {error}')
+CYCLE_DONE = ('Опрос {count} пользователей занял {elapsed:.2f} с, '
+              'всего пропущено неизменившихся ответов: {skipped}')
+
+logger = logging.getLogger(__name__)
+
+policy = PollPolicy()
+response_cache = ResponseCache()
+checkpoints = None
+outbox = None
+coordinator = None
+leases = None
+# Будит главный цикл, когда доставка вернула пользователя в расписание.
+woken = threading.Event()
+
+metrics.gauge(
+    'homework_api_cached_polls', 'Опросы API с кэшем ответов.',
+    function=lambda: response_cache.polls)
+metrics.gauge(
+    'homework_api_short_circuited_polls',
+    'Опросы, ответ на которые не изменился и не разбирался.',
+    function=lambda: response_cache.short_circuited)
+metrics.gauge(
+    'homework_outbox_sent_messages', 'Сообщения, отправленные очередью.',
+    function=lambda: outbox.sent if outbox else 0)
+metrics.gauge(
+    'homework_outbox_dead_letters', 'Недоставленные сообщения в очереди.',
+    function=lambda: len(outbox.dead_letters) if outbox else 0)
+
+
+@dataclass
+class Subscription:
+    """Чат, получающий сообщения об изменениях работ пользователя.
+
+    Пустой фильтр statuses или homeworks пропускает все статусы
+    или все работы.
+    """
+
+    chat_id: str
+    statuses: frozenset = frozenset()
+    homeworks: frozenset = frozenset()
+    locale: str = ''
+
+    def accepts(self, change):
+        """Нужно ли сообщать в чат об изменении."""
+        return (
+            (not self.statuses or change.get('status') in self.statuses)
+            and (not self.homeworks
+                 or change.get('homework_name') in self.homeworks)
+        )
+
+    @classmethod
+    def from_record(cls, record):
+        """Подписка из записи файла пользователей."""
+        return cls(
+            chat_id=record['chat_id'],
+            statuses=frozenset(record.get('statuses', ())),
+            homeworks=frozenset(record.get('homeworks', ())),
+            locale=record.get('locale', ''),
+        )
+
+
+@dataclass
+class Tenant:
+    """Пользователь бота и состояние его опроса.
+
+    Ответ API одного опроса расходится по всем подпискам пользователя.
+    chat_id - основной чат: в него же приходят сообщения об ошибках.
+    """
+
+    token: str
+    chat_id: str
+    name: str = ''
+    timestamp: int = 0
+    locale: str = ''
+    subscriptions: list = field(default_factory=list, repr=False)
+    headers: dict = field(init=False, repr=False)
+    statuses: StatusTracker = field(
+        default_factory=StatusTracker, repr=False)
+    poll: PollState = field(
+        default_factory=lambda: policy.new_state(), repr=False)
+    delivering: bool = field(default=False, repr=False)
+    errors: ErrorFilter = field(default_factory=ErrorFilter, repr=False)
+    owned: bool = field(default=True, repr=False)
+    sent: set = field(default_factory=set, repr=False)
+    synced: bool = field(default=False, repr=False)
+
+    def __post_init__(self):
+        """Имя, подписка основного чата и заголовки авторизации."""
+        self.name = self.name or str(self.chat_id)
+        if not self.subscriptions:
+            self.subscriptions = [Subscription(self.chat_id)]
+        self.headers = homework.make_headers(self.token)
+
+
+class TenantRegistry:
+    """Реестр пользователей: токен, чат и время последнего опроса."""
+
+    def __init__(self, tenants=()):
+        """Реестр, заполненный переданными пользователями."""
+        self._tenants = {}
+        self.scheduler = Scheduler()
+        for tenant in tenants:
+            self.add(tenant)
+
+    def __iter__(self):
+        """Обход снимка реестра: его можно менять во время обхода."""
+        return iter(list(self._tenants.values()))
+
+    def __len__(self):
+        """Количество пользователей."""
+        return len(self._tenants)
+
+    def __contains__(self, name):
+        """Есть ли пользователь с таким именем."""
+        return name in self._tenants
+
+    def get(self, name):
+        """Пользователь по имени или None."""
+        return self._tenants.get(name)
+
+    def add(self, tenant):
+        """Регистрация пользователя."""
+        if tenant.name in self._tenants:
+            raise ValueError(TENANT_DUPLICATE.format(name=tenant.name))
+        if not tenant.timestamp:
+            tenant.timestamp = int(time.time())
+        self._tenants[tenant.name] = tenant
+        tenant.poll.listener = functools.partial(self.reschedule, tenant)
+        self.reschedule(tenant)
+        return tenant
+
+    def remove(self, name):
+        """Удаление пользователя из реестра."""
+        response_cache.discard(name)
+        self.scheduler.remove(name)
+        tenant = self._tenants.pop(name, None)
+        if tenant is not None:
+            tenant.poll.listener = None
+        return tenant
+
+    def reschedule(self, tenant):
+        """Перенос срока опроса пользователя в расписание.
+
+        Вызывается при каждом изменении tenant.poll.next_due. Чужие
+        пользователи и пользователи с недоставленным сообщением
+        в расписании не держатся, пользователи с работой на проверке
+        идут впереди остальных.
+        """
+        if not tenant.owned or tenant.delivering:
+            self.scheduler.remove(tenant.name)
+            return
+        reviewing = tenant.statuses.has_status(REVIEWING, pending=True)
+        priority = URGENT if reviewing else NORMAL
+        self.scheduler.schedule(tenant.name, tenant.poll.next_due, priority)
+
+    @classmethod
+    def from_env(cls):
+        """Реестр из одного пользователя из переменных окружения."""
+        return cls([Tenant(
+            token=homework.PRACTICUM_TOKEN,
+            chat_id=homework.TELEGRAM_CHAT_ID,
+        )])
+
+    @classmethod
+    def from_file(cls, path):
+        """Реестр из JSON-файла со списком пользователей.
+
+        Дополнительные чаты пользователя перечисляются в поле chats.
+        Записи с одним токеном объединяются в одного пользователя
+        с несколькими чатами: API для них опрашивается один раз.
+        ValueError, если такие записи расходятся в имени или timestamp.
+        """
+        with open(path, encoding='utf-8') as file:
+            records = json.load(file)
+        if not isinstance(records, list):
+            raise TypeError(TENANTS_TYPE_ERROR.format(types=type(records)))
+        tenants = {}
+        for index, record in enumerate(records):
+            for key in ('token', 'chat_id'):
+                if key not in record:
+                    raise KeyError(
+                        TENANT_FIELD_ERROR.format(index=index, key=key))
+            for chat, extra in enumerate(record.get('chats', ())):
+                if 'chat_id' not in extra:
+                    raise KeyError(SUBSCRIPTION_FIELD_ERROR.format(
+                        chat=chat, index=index, key='chat_id'))
+            subscriptions = [Subscription.from_record(record)] + [
+                Subscription.from_record(extra)
+                for extra in record.get('chats', ())
+            ]
+            tenant = tenants.get(record['token'])
+            if tenant is not None:
+                check_duplicate(tenant, record, index)
+                tenant.subscriptions.extend(subscriptions)
+                continue
+            tenants[record['token']] = Tenant(
+                token=record['token'],
+                chat_id=record['chat_id'],
+                name=record.get('name', ''),
+                timestamp=record.get('timestamp', 0),
+                locale=record.get('locale', ''),
+                subscriptions=subscriptions,
+            )
+        registry = cls(tenants.values())
+        logger.info(TENANTS_LOADED.format(count=len(registry)))
+        return registry
+
+
+def check_duplicate(tenant, record, index):
+    """ValueError, если запись с тем же токеном меняет поля пользователя.
+
+    Локаль такой записи не теряется: она остаётся у её чата.
+    """
+    for key in ('name', 'timestamp'):
+        if key in record and record[key] != getattr(tenant, key):
+            raise ValueError(TENANT_CONFLICT.format(
+                index=index, name=tenant.name, key=key))
+
+
+def collect_update(tenant, response):
+    """Сообщения подписчикам об изменениях из ответа API."""
+    return render_update(
+        tenant, tenant.statuses.diff(schema.validate(
+            homework.check_response(response), tenant.name)))
+
+
+def render_update(tenant, changes):
+    """Список пар (чат, сообщение); каждое изменение в журнале.
+
+    Чат получает сообщения о тех изменениях, которые пропускают
+    фильтры его подписки: одно, если они умещаются в MESSAGE_LIMIT,
+    иначе несколько.
+    """
+    for change in changes:
+        logger.info(
+            STATUS_CHANGED.format(
+                name=tenant.name, homework=change.get('homework_name'),
+                status=change.get('status')),
+            extra={'tenant': tenant.name,
+                   'homework': change.get('homework_name'),
+                   'status': change.get('status')})
+    letters = []
+    for subscription in tenant.subscriptions:
+        accepted = [
+            change for change in changes if subscription.accepts(change)]
+        letters.extend(
+            (subscription.chat_id, text)
+            for text in homework.render_messages(
+                accepted, subscription.locale or tenant.locale))
+    return letters
+
+
+def fetch_update(tenant):
+    """Запрос к API и сообщения подписчикам об изменениях.
+
+    Возвращает пару (список пар (чат, сообщение), ответ) или None,
+    если ответ не изменился. Первая загрузка истории пользователя
+    без контрольной точки с timestamp старше STREAM_HISTORY_AGE
+    секунд разбирается потоком: вместо списка работ в ответе
+    остаётся их количество. Дальше timestamp стоит на месте, пока
+    нет новых работ, но опрос идёт обычным путём, через кэш ответов
+    и склейку запросов.
+    """
+    if not tenant.synced and STREAM_HISTORY_AGE and (
+            tenant.timestamp < time.time() - STREAM_HISTORY_AGE):
+        stream = homework.stream_homeworks(
+            tenant.timestamp, tenant.headers, homework.get_session(),
+            tenant.name)
+        changes = tenant.statuses.diff(
+            schema.iter_valid(stream, tenant.name))
+        response = dict(stream.fields, homeworks=stream.count)
+        return render_update(tenant, changes), response
+    response = homework.request_homeworks(
+        tenant.timestamp, tenant.headers, homework.get_session(),
+        response_cache.slot(tenant.name), tenant.name)
+    if response is None:
+        return None
+    return collect_update(tenant, response), response
+
+
+def commit_update(tenant, response):
+    """Фиксация полностью обработанного ответа.
+
+    Вызывается, когда изменений нет или сообщение о них доставлено.
+    """
+    if response.get('homeworks'):
+        tenant.timestamp = response.get('current_date', tenant.timestamp)
+    tenant.statuses.commit()
+    tenant.sent.clear()
+    tenant.synced = True
+    response_cache.slot(tenant.name).commit()
+    checkpoint(tenant)
+
+
+def checkpoint(tenant):
+    """Запись состояния пользователя в хранилище, если оно подключено."""
+    if checkpoints is not None:
+        checkpoints.save(tenant.name, {
+            'timestamp': tenant.timestamp,
+            'statuses': tenant.statuses.dump(),
+            'errors': tenant.errors.dump(),
+        })
+
+
+def restore(registry, store):
+    """Подключение хранилища и восстановление состояния пользователей."""
+    global checkpoints
+    checkpoints = store
+    restored = 0
+    for tenant in registry:
+        if load_checkpoint(tenant):
+            restored += 1
+            registry.reschedule(tenant)
+    logger.info(TENANTS_RESTORED.format(count=restored))
+    return restored
+
+
+def load_checkpoint(tenant):
+    """Состояние пользователя из хранилища; False, если его там нет."""
+    state = checkpoints.load(tenant.name) if checkpoints else None
+    if state is None:
+        return False
+    tenant.timestamp = state['timestamp']
+    tenant.errors.load(state.get('errors', {}))
+    tenant.statuses.load(state['statuses'])
+    tenant.synced = True
+    return True
+
+
+def lease_valid(tenant):
+    """Можно ли опрашивать пользователя и писать ему прямо сейчас.
+
+    Долгий цикл опроса продлевает аренду по ходу, а пользователь,
+    чья аренда потеряна, снимается с расписания до следующего
+    распределения: иначе его опрашивали бы два экземпляра.
+    """
+    if leases is None:
+        return True
+    if leases.due():
+        leases.extend()
+    if leases.holds(tenant.name):
+        return True
+    logger.warning(LEASE_LOST.format(name=tenant.name))
+    tenant.owned = False
+    tenant.poll.notify()
+    return False
+
+
+def rebalance(registry, now):
+    """Перераспределение пользователей после смены состава или аренды.
+
+    Процесс опрашивает пользователя, если тот закреплён за ним
+    при шардировании и его аренда у этого экземпляра. Перешедшие
+    к процессу пользователи перечитывают контрольную точку, сохранённую
+    прежним владельцем. Без аренды они опрашиваются не раньше чем через
+    coordinator.grace секунд: за это время прежний владелец замечает
+    новый состав.
+    """
+    sharded = coordinator is not None and coordinator.refresh()
+    if not sharded and (leases is None or not leases.due()):
+        return
+    if leases is not None:
+        leases.renew(
+            tenant.name for tenant in registry
+            if coordinator is None or coordinator.owns(tenant.name))
+    grace = coordinator.grace if leases is None else 0
+    owned = 0
+    for tenant in registry:
+        owns = (coordinator is None or coordinator.owns(tenant.name)) and (
+            leases is None or leases.holds(tenant.name))
+        if owns and not tenant.owned:
+            load_checkpoint(tenant)
+            tenant.poll.next_due = max(tenant.poll.next_due, now + grace)
+        if owns != tenant.owned:
+            tenant.owned = owns
+            registry.reschedule(tenant)
+        owned += owns
+    if sharded:
+        logger.info(sharding.REBALANCED.format(
+            worker=coordinator.worker,
+            members=', '.join(coordinator.members), count=owned))
+
+
+def flush_checkpoints():
+    """Запись накопленных за цикл контрольных точек."""
+    if checkpoints is not None:
+        checkpoints.flush()
+
+
+def flush_cycle_checkpoints():
+    """Запись контрольных точек в конце цикла опроса.
+
+    Ошибка записи (занятая база, полный диск) не останавливает опрос:
+    несохранённые точки остаются в хранилище до следующего цикла.
+    """
+    try:
+        flush_checkpoints()
+    except Exception as error:
+        logger.error(CHECKPOINTS_NOT_SAVED.format(error=error))
+
+
+def error_message(tenant, error):
+    """Сообщение об ошибке или None, если о ней уже сообщалось.
+
+    О разомкнутом выключателе пользователю не сообщается: это следствие
+    сбоя, о котором он уже получил сообщение, и опрос просто
+    откладывается.
+    """
+    if isinstance(error, CircuitOpenError):
+        logger.debug(
+            TENANT_POLL_DEFERRED.format(name=tenant.name, error=error),
+            extra={'tenant': tenant.name})
+        return None
+    logger.error(TENANT_POLL_ERROR.format(name=tenant.name, error=error),
+                 extra={'tenant': tenant.name})
+    count = tenant.errors.report(error)
+    if count is None:
+        return None
+    return homework.error_text(error, count)
+
+
+def deliver(bot, tenant, message, on_delivered):
+    """Отправка сообщения в основной чат пользователя."""
+    deliver_letters(bot, tenant, [(tenant.chat_id, message)], on_delivered,
+                    sent=set())
+
+
+def pending_letters(letters, sent):
+    """Сообщения, которые ещё не доставлены в свои чаты.
+
+    sent - множество доставленных пар (чат, сообщение). При повторе
+    после частичной доставки сообщения, которые чат уже получил,
+    пропускаются.
+    """
+    return [letter for letter in letters if letter not in sent]
+
+
+def send_letters(bot, tenant, letters, sent=None):
+    """Отправка сообщений по чатам без очереди; True, если доставлены все.
+
+    По умолчанию доставленные сообщения запоминаются в tenant.sent
+    до фиксации ответа.
+    """
+    sent = tenant.sent if sent is None else sent
+    delivered = True
+    for chat_id, text in pending_letters(letters, sent):
+        if homework.send_message_to(bot, chat_id, text):
+            sent.add((chat_id, text))
+        else:
+            delivered = False
+    return delivered
+
+
+def deliver_letters(bot, tenant, letters, on_delivered, sent=None):
+    """Отправка сообщений по чатам пользователя.
+
+    on_delivered вызывается, когда доставлены все сообщения. С очередью
+    исходящих сообщений опрос не ждёт доставки: on_delivered вызовет
+    поток-отправитель, а до тех пор пользователь снят с расписания.
+    Без аренды пользователя ничего не отправляется.
+    """
+    sent = tenant.sent if sent is None else sent
+    if not lease_valid(tenant):
+        return
+    if outbox is None:
+        if send_letters(bot, tenant, letters, sent):
+            on_delivered()
+        return
+    queue_letters(tenant, pending_letters(letters, sent), on_delivered, sent)
+
+
+def queue_letters(tenant, letters, on_delivered, sent):
+    """Отправка сообщений через очередь исходящих сообщений."""
+    if not letters:
+        on_delivered()
+        return
+    lock = threading.Lock()
+    remaining = [len(letters)]
+    failed = []
+
+    def delivered(chat_id, text, success):
+        with lock:
+            if success:
+                sent.add((chat_id, text))
+            else:
+                failed.append(chat_id)
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        try:
+            if not failed:
+                on_delivered()
+        finally:
+            set_delivering(tenant, False)
+            woken.set()
+
+    set_delivering(tenant, True)
+    for chat_id, text in letters:
+        outbox.put(chat_id, text, functools.partial(delivered, chat_id, text))
+
+
+def set_delivering(tenant, delivering):
+    """Отметка доставки с переносом пользователя в расписании."""
+    tenant.delivering = delivering
+    tenant.poll.notify()
+
+
+def mark_error_sent(tenant, error):
+    """Запоминание отправленного уведомления об ошибке."""
+    tenant.errors.mark_sent(error)
+    checkpoint(tenant)
+
+
+def poll_tenant(bot, tenant):
+    """Один цикл опроса API для пользователя."""
+    if not lease_valid(tenant):
+        return
+    letters = None
+    try:
+        update = fetch_update(tenant)
+        if update is not None:
+            letters, response = update
+            if not letters:
+                commit_update(tenant, response)
+            else:
+                deliver_letters(bot, tenant, letters,
+                                lambda: commit_update(tenant, response))
+    except Exception as error:
+        policy.failure(tenant.poll, error)
+        message = error_message(tenant, error)
+        if message:
+            deliver(bot, tenant, message,
+                    lambda failed=error: mark_error_sent(tenant, failed))
+    else:
+        schedule_success(tenant, changed=bool(letters))
+
+
+def schedule_success(tenant, changed):
+    """Сброс ошибок и планирование следующего опроса после успешного."""
+    tenant.errors.reset()
+    policy.success(
+        tenant.poll, changed,
+        tenant.statuses.has_status(REVIEWING, pending=True))
+
+
+def due_tenants(registry, now):
+    """Пользователи, которых пора опросить.
+
+    Срочные пользователи (с работой на проверке) идут первыми, затем
+    остальные по сроку. Пользователей с недоставленным сообщением
+    и закреплённых за другими процессами нет в расписании.
+    """
+    rebalance(registry, now)
+    return [registry.get(name) for name in registry.scheduler.due(now)]
+
+
+def next_wakeup(registry, now):
+    """Момент ближайшего запланированного опроса.
+
+    При шардировании процесс просыпается и для отметки в составе,
+    с арендой - для её продления.
+    """
+    wakeup = registry.scheduler.next_due()
+    if wakeup is None:
+        wakeup = now + homework.RETRY_PERIOD
+    if coordinator is not None:
+        wakeup = min(wakeup, now + coordinator.heartbeat)
+    if leases is not None:
+        wakeup = min(wakeup, now + leases.period)
+    return wakeup
+
+
+def poll_due(bot, registry):
+    """Опрос пользователей, которым пора; момент следующего пробуждения."""
+    started = time.monotonic()
+    due = due_tenants(registry, started)
+    for tenant in due:
+        poll_tenant(bot, tenant)
+    flush_cycle_checkpoints()
+    elapsed = time.monotonic() - started
+    logger.debug(CYCLE_DONE.format(
+        count=len(due),
+        elapsed=elapsed,
+        skipped=response_cache.short_circuited,
+    ))
+    return next_wakeup(registry, started + elapsed)
+
+
+def load_registry():
+    """Загрузка реестра пользователей и их контрольных точек."""
+    if not homework.TELEGRAM_TOKEN:
+        logger.critical(homework.TOKEN_IS_ABSENT.format(
+            token='TELEGRAM_TOKEN'))
+        raise KeyError(homework.TOKEN_ERROR_MESSAGE.format(
+            token='TELEGRAM_TOKEN'))
+    if TENANTS_FILE:
+        registry = TenantRegistry.from_file(TENANTS_FILE)
+    else:
+        homework.check_tokens()
+        registry = TenantRegistry.from_env()
+    restore(registry, storage.open_store())
+    return registry
+
+
+def start_sharding(registry):
+    """Подключение к составу процессов и аренде, если они включены.
+
+    До первого распределения пользователи считаются чужими, чтобы
+    перешедшие от других процессов получили задержку перед опросом.
+    """
+    global coordinator, leases
+    coordinator = sharding.from_env()
+    leases = lease.from_env()
+    if coordinator is None and leases is None:
+        return
+    for tenant in registry:
+        tenant.owned = False
+        registry.reschedule(tenant)
+    rebalance(registry, time.monotonic())
+
+
+def greeting_due(tenant):
+    """Нужно ли сообщать пользователю о запуске бота.
+
+    Не нужно, если пользователь подхвачен у только что остановленного
+    экземпляра: при выкладке приветствие не повторяется.
+    """
+    return tenant.owned and (
+        leases is None or not leases.handover(tenant.name))
+
+
+def greetings(tenant):
+    """Сообщения о запуске бота во все чаты пользователя."""
+    return [
+        (subscription.chat_id, homework.FIRST_MESSAGE)
+        for subscription in tenant.subscriptions
+    ]
+
+
+def stop_on_sigterm():
+    """Остановка по SIGTERM через SystemExit, чтобы сработали finally.
+
+    Так останавливаемый при выкладке экземпляр успевает освободить
+    аренду. Обработчик ставится только из главного потока.
+    """
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+
+
+def shutdown():
+    """Доставка очереди, запись контрольных точек и уход из состава.
+
+    Аренда освобождается последней, когда состояние пользователей уже
+    сохранено и следующий экземпляр не повторит отправленных сообщений.
+    """
+    if outbox is not None:
+        outbox.stop(SHUTDOWN_TIMEOUT)
+    flush_checkpoints()
+    if leases is not None:
+        leases.release()
+    if coordinator is not None:
+        coordinator.leave()
+
+
+def main():
+    """Опрос всех пользователей реестра из одного процесса."""
+    global outbox
+    stop_on_sigterm()
+    registry = load_registry()
+    start_sharding(registry)
+    bot = bot_api.make_bot(homework.TELEGRAM_TOKEN, OUTBOX_WORKERS + 1)
+    if OUTBOX_WORKERS:
+        outbox = Outbox(bot, breaker=homework.SEND_BREAKER).start()
+    for tenant in registry:
+        if greeting_due(tenant):
+            deliver_letters(bot, tenant, greetings(tenant), lambda: None,
+                            sent=set())
+    try:
+        while True:
+            woken.clear()
+            wakeup = poll_due(bot, registry)
+            woken.wait(max(0, wakeup - time.monotonic()))
+    finally:
+        shutdown()
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import utils
+
+
+@pytest.fixture
+def async_bot_module():
+    import async_bot
+    return async_bot
+
+
+class TestAsyncBot:
+
+    def test_poll_all_respects_api_concurrency(self, monkeypatch,
+                                               random_timestamp,
+                                               homework_module,
+                                               async_bot_module):
+        import tenants
+        lock = threading.Lock()
+        state = {'current': 0, 'peak': 0}
+
+        def slow_request(timestamp, headers, session=None,
+                         cache=None, tenant=None):
+            with lock:
+                state['current'] += 1
+                state['peak'] = max(state['peak'], state['current'])
+            time.sleep(0.02)
+            with lock:
+                state['current'] -= 1
+            return {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': random_timestamp,
+            }
+
+        monkeypatch.setattr(homework_module, 'request_homeworks', slow_request)
+        monkeypatch.setattr(async_bot_module, 'API_CONCURRENCY', 3)
+        monkeypatch.setattr(tenants, 'STREAM_HISTORY_AGE', 0)
+        registry = tenants.TenantRegistry(
+            tenants.Tenant(token=str(index), chat_id=index, timestamp=1)
+            for index in range(10)
+        )
+        bot = utils.RecordingBot()
+        asyncio.run(async_bot_module.poll_due(bot, registry))
+        assert 1 < state['peak'] <= 3, (
+            'Проверьте, что запросы к API выполняются одновременно, '
+            'но не больше заданного предела.'
+        )
+        assert len(bot.sent) == 10
+        assert all(
+            tenant.timestamp == random_timestamp for tenant in registry
+        )
+
+    def test_get_api_answer_respects_api_concurrency(self, monkeypatch,
+                                                     homework_module,
+                                                     async_bot_module):
+        session = object()
+        lock = threading.Lock()
+        state = {'current': 0, 'peak': 0, 'sessions': set()}
+
+        def slow_request(timestamp, headers, session=None,
+                         cache=None, tenant=None):
+            with lock:
+                state['current'] += 1
+                state['peak'] = max(state['peak'], state['current'])
+                state['sessions'].add(session)
+            time.sleep(0.02)
+            with lock:
+                state['current'] -= 1
+            return {'homeworks': [], 'current_date': timestamp}
+
+        monkeypatch.setattr(homework_module, 'request_homeworks', slow_request)
+        monkeypatch.setattr(homework_module, 'get_session', lambda: session)
+        monkeypatch.setattr(async_bot_module, 'API_CONCURRENCY', 2)
+
+        async def ask_all():
+            return await asyncio.gather(*(
+                async_bot_module.get_api_answer(timestamp)
+                for timestamp in range(6)))
+
+        answers = asyncio.run(ask_all())
+        assert [answer['current_date'] for answer in answers] == list(
+            range(6))
+        assert 1 < state['peak'] <= 2, (
+            'Асинхронные запросы к API ограничены семафором api.'
+        )
+        assert state['sessions'] == {session}, (
+            'Запросы должны идти через общую сессию.'
+        )
+
+    def test_poll_tenant_reports_error(self, monkeypatch, homework_module,
+                                       async_bot_module):
+        import tenants
+
+        def broken_request(timestamp, headers, session=None,
+                           cache=None, tenant=None):
+            raise ConnectionError('Something wrong')
+
+        monkeypatch.setattr(
+            homework_module, 'request_homeworks', broken_request)
+        monkeypatch.setattr(tenants, 'STREAM_HISTORY_AGE', 0)
+        tenant = tenants.Tenant(token='a', chat_id=1, timestamp=1)
+        bot = utils.RecordingBot()
+        asyncio.run(async_bot_module.poll_tenant(bot, tenant))
+        asyncio.run(async_bot_module.poll_tenant(bot, tenant))
+        assert len(bot.sent) == 1
+        assert tenant.timestamp == 1
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from json_stream import HomeworkStream
+import utils
+
+
+@pytest.fixture
+def backfill_module():
+    import backfill
+    return backfill
+
+
+@pytest.fixture
+def history(monkeypatch, homework_module):
+    homeworks = [
+        {'id': index, 'homework_name': f'hw{index}',
+         'status': 'approved', 'date_updated': 1000 + 100 * index}
+        for index in range(10, 0, -1)
+    ]
+    requests_made = []
+
+    def fake_stream(timestamp, headers, session=None, tenant=None):
+        requests_made.append(timestamp)
+        body = json.dumps({
+            'homeworks': [
+                homework for homework in homeworks
+                if homework['date_updated'] >= timestamp
+            ],
+            'current_date': 5000,
+        }).encode()
+        return HomeworkStream(
+            body[start:start + 16] for start in range(0, len(body), 16))
+
+    monkeypatch.setattr(homework_module, 'stream_homeworks', fake_stream)
+    return requests_made
+
+
+class TestBackfill:
+
+    def test_changes_are_sent_once_in_chronological_order(
+            self, history, backfill_module):
+        import tenants
+        tenant = tenants.Tenant(token='a', chat_id=1, timestamp=0)
+        bot = utils.RecordingBot()
+        result = backfill_module.backfill(
+            bot, tenants.TenantRegistry([tenant]), since=1000, workers=2)
+        assert history == [1000], (
+            'История пользователя должна загружаться одним запросом.'
+        )
+        assert result == {'1': 10}
+        text = '\n\n'.join(text for _, text in bot.sent)
+        positions = [text.index(f'"hw{index}"') for index in range(1, 11)]
+        assert positions == sorted(positions), (
+            'Изменения должны отправляться от старых к новым, без повторов.'
+        )
+        assert tenant.timestamp == 5000
+        backfill_module.backfill(
+            bot, tenants.TenantRegistry([tenant]), since=1000)
+        assert len(bot.sent) == 1, (
+            'Повторная догрузка не должна повторять уведомления.'
+        )
+
+    def test_tenants_are_fetched_once_each(self, history, backfill_module):
+        import tenants
+        registry = tenants.TenantRegistry(
+            tenants.Tenant(token=str(index), chat_id=index, timestamp=0)
+            for index in range(5)
+        )
+        result = backfill_module.backfill(
+            utils.RecordingBot(), registry, since=1500, workers=3)
+        assert len(history) == 5, (
+            'На каждого пользователя должен уходить один запрос.'
+        )
+        assert set(result.values()) == {6}
+
+    def test_since_date_format(self, backfill_module):
+        args = backfill_module.parse_args(['--since', '2024-01-01'])
+        assert args.since == 1704067200
+        with pytest.raises(SystemExit):
+            backfill_module.parse_args(['--since', '01.01.2024'])
@@ -0,0 +1,67 @@
+import pytest
+
+
+@pytest.fixture
+def bench(monkeypatch):
+    import async_bot
+    import homework
+    import tenants
+    from benchmarks import bench_poll
+
+    for module, names in (
+        (homework, ('ENDPOINT', 'HTTP_POOL_SIZE', '_session')),
+        (tenants, ('policy', 'checkpoints', 'outbox')),
+        (async_bot, ('API_CONCURRENCY', 'SEND_CONCURRENCY')),
+    ):
+        for name in names:
+            monkeypatch.setattr(module, name, getattr(module, name))
+    return bench_poll
+
+
+class TestBenchmark:
+
+    @pytest.mark.parametrize('mode', ['sync', 'async'])
+    def test_notifications_reach_fake_telegram(self, bench, mode):
+        result = bench.run(bench.parse_args([
+            '--tenants', '5', '--duration', '1.5', '--period', '0.2',
+            '--change-rate', '10', '--seed', '1', '--mode', mode,
+            '--api-latency', '0', '--telegram-latency', '0',
+        ]))
+        assert result['polls'] > 5, (
+            'За время замера бот должен опросить поддельный API.'
+        )
+        assert result['notifications'] > 0, (
+            'Изменения статусов должны доходить до поддельного Bot API.'
+        )
+        assert result['latency_p50_s'] <= result['latency_p99_s']
+
+    def test_percentile(self, bench):
+        values = list(range(101))
+        assert bench.percentile(values, 0.5) == 50
+        assert bench.percentile(values, 0.99) == 99
+
+    def test_both_senders_are_measured(self):
+        from benchmarks import bench_send
+
+        result = bench_send.run(bench_send.parse_args([
+            '--messages', '20', '--threads', '2',
+        ]))
+        assert [row['sender'] for row in result] == list(bench_send.SENDERS)
+        assert all(row['messages'] == 20 for row in result), (
+            'Каждый отправитель должен доставить все сообщения замера.'
+        )
+
+    def test_schedule_dispatches_due_tenants(self):
+        from benchmarks import bench_schedule
+
+        result = bench_schedule.run(bench_schedule.parse_args([
+            '--tenants', '500', '--cycles', '20', '--period', '10',
+            '--seed', '1',
+        ]))
+        assert result['tenants'] == 500
+        assert result['dispatched_per_cycle'] > 0, (
+            'На каждом шаге должны находиться пользователи, которым пора.'
+        )
+        assert result['urgent_first'], (
+            'Пользователи с работой на проверке должны идти первыми.'
+        )
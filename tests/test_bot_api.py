@@ -0,0 +1,128 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import socket
+import threading
+
+import pytest
+import telegram
+
+import bot_api
+from benchmarks.fakes import FakeTelegram
+
+TOKEN = '1234:abcdefg'
+
+
+@pytest.fixture
+def fake_telegram():
+    fake = FakeTelegram(None).start()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def failing_api():
+    """Bot API, отвечающий заданными кодом и телом."""
+    answer = {}
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            body = json.dumps(answer['data']).encode()
+            self.send_response(answer['code'])
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+
+    def send(code, data):
+        answer.update(code=code, data=data)
+        bot = bot_api.DirectBot(TOKEN, f'http://{host}:{port}/bot')
+        return bot.send_message(1, 'text')
+
+    yield send
+    server.shutdown()
+    server.server_close()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class TestDirectBot:
+
+    def test_message_is_delivered(self, fake_telegram):
+        bot = bot_api.DirectBot(TOKEN, fake_telegram.base_url)
+        message = bot.send_message(42, 'Привет', parse_mode='HTML')
+        assert fake_telegram.messages == 1, (
+            'DirectBot должен отправить сообщение в Bot API.'
+        )
+        assert message['chat']['id'] == 42
+        assert message['text'] == 'Привет'
+
+    @pytest.mark.parametrize('code, data, error', [
+        (400, {'ok': False, 'description': 'chat not found'},
+         telegram.error.BadRequest),
+        (403, {'ok': False, 'description': 'bot was blocked'},
+         telegram.error.Unauthorized),
+        (404, {'ok': False}, telegram.error.InvalidToken),
+        (409, {'ok': False, 'description': 'conflict'},
+         telegram.error.Conflict),
+        (502, {}, telegram.error.NetworkError),
+    ])
+    def test_api_errors_match_telegram_bot(self, failing_api, code, data,
+                                           error):
+        with pytest.raises(error):
+            failing_api(code, data)
+
+    def test_retry_after_is_passed(self, failing_api):
+        with pytest.raises(telegram.error.RetryAfter) as info:
+            failing_api(429, {'ok': False, 'parameters': {'retry_after': 7}})
+        assert info.value.retry_after == 7, (
+            'Пауза из ответа 429 должна попадать в RetryAfter.'
+        )
+
+    def test_chat_migration_is_passed(self, failing_api):
+        with pytest.raises(telegram.error.ChatMigrated) as info:
+            failing_api(400, {
+                'ok': False, 'parameters': {'migrate_to_chat_id': -100},
+            })
+        assert info.value.new_chat_id == -100
+
+    def test_connection_error_is_network_error(self):
+        bot = bot_api.DirectBot(TOKEN, f'http://127.0.0.1:{free_port()}/bot')
+        with pytest.raises(telegram.error.NetworkError):
+            bot.send_message(1, 'text')
+
+    def test_malformed_token_is_rejected(self):
+        with pytest.raises(telegram.error.InvalidToken):
+            bot_api.DirectBot('token')
+
+
+class TestMakeBot:
+
+    def test_sender_is_chosen_by_setting(self, monkeypatch):
+        monkeypatch.setattr(bot_api, 'TELEGRAM_SENDER', bot_api.DIRECT)
+        assert isinstance(bot_api.make_bot(TOKEN), bot_api.DirectBot)
+        monkeypatch.setattr(bot_api, 'TELEGRAM_SENDER', bot_api.PTB)
+        assert isinstance(bot_api.make_bot(TOKEN), telegram.Bot)
+
+    def test_unknown_sender_is_rejected(self, monkeypatch):
+        monkeypatch.setattr(bot_api, 'TELEGRAM_SENDER', 'carrier-pigeon')
+        with pytest.raises(ValueError):
+            bot_api.make_bot(TOKEN)
+
+    def test_main_uses_same_sender_choice(self, monkeypatch,
+                                          homework_module):
+        monkeypatch.setattr(homework_module, 'check_tokens', lambda: None)
+        monkeypatch.setattr(bot_api, 'TELEGRAM_SENDER', 'carrier-pigeon')
+        with pytest.raises(ValueError):
+            homework_module.main()
@@ -0,0 +1,196 @@
+import pytest
+from telegram.error import BadRequest, NetworkError
+
+import breaker
+from outbox import Outbox
+import utils
+
+
+@pytest.fixture
+def clock():
+    return utils.FakeClock()
+
+
+@pytest.fixture
+def circuit(clock):
+    return breaker.CircuitBreaker(
+        'test', threshold=3, probe_interval=30, clock=clock)
+
+
+def state(name='test'):
+    return breaker.CIRCUIT_STATE.value(endpoint=name)
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold_failures(self, circuit):
+        for _ in range(2):
+            circuit.failure()
+        assert circuit.allow(), 'До порога сбоев вызовы разрешены.'
+        circuit.failure()
+        assert circuit.state == breaker.OPEN
+        assert not circuit.allow(), (
+            'Разомкнутый выключатель должен отклонять вызовы.'
+        )
+        assert state() == breaker.STATE_VALUES[breaker.OPEN], (
+            'Состояние выключателя должно быть видно в метриках.'
+        )
+
+    def test_success_resets_failures(self, circuit):
+        circuit.failure()
+        circuit.failure()
+        circuit.success()
+        circuit.failure()
+        circuit.failure()
+        assert circuit.state == breaker.CLOSED, (
+            'Учитываются только сбои подряд.'
+        )
+
+    def test_single_probe_after_interval(self, circuit, clock):
+        for _ in range(3):
+            circuit.failure()
+        clock.now += 29
+        assert not circuit.allow()
+        assert circuit.remaining() == pytest.approx(1)
+        clock.now += 1
+        assert circuit.allow(), 'Через probe_interval разрешается проба.'
+        assert circuit.state == breaker.HALF_OPEN
+        assert not circuit.allow(), 'Пробный вызов должен быть один.'
+        circuit.success()
+        assert circuit.state == breaker.CLOSED
+        assert state() == breaker.STATE_VALUES[breaker.CLOSED]
+
+    def test_failed_probe_reopens(self, circuit, clock):
+        for _ in range(3):
+            circuit.failure()
+        clock.now += 30
+        assert circuit.allow()
+        circuit.failure()
+        assert circuit.state == breaker.OPEN, (
+            'Неудачная проба должна снова разомкнуть выключатель.'
+        )
+        assert circuit.remaining() == pytest.approx(30)
+
+    def test_check_raises_with_retry_after(self, circuit, clock):
+        for _ in range(3):
+            circuit.failure()
+        clock.now += 10
+        with pytest.raises(breaker.CircuitOpenError) as error:
+            circuit.check()
+        assert error.value.retry_after == pytest.approx(20), (
+            'Ошибка должна сообщать время до пробного вызова.'
+        )
+
+
+class TestBreakerIntegration:
+
+    def test_open_api_breaker_skips_request(self, monkeypatch, circuit,
+                                            homework_module):
+        monkeypatch.setattr(homework_module, 'API_BREAKER', circuit)
+        for _ in range(3):
+            circuit.failure()
+
+        class Session:
+            def get(self, **kwargs):
+                raise AssertionError(
+                    'При разомкнутом выключателе запрос не отправляется.')
+
+        with pytest.raises(ConnectionError):
+            homework_module.fetch_response(
+                0, {'Authorization': 'OAuth a'}, Session())
+
+    def test_open_api_breaker_is_not_reported(self, monkeypatch, circuit,
+                                              clock, homework_module):
+        import tenants
+
+        monkeypatch.setattr(homework_module, 'API_BREAKER', circuit)
+        for _ in range(3):
+            circuit.failure()
+
+        class Bot:
+            def send_message(self, chat_id, text):
+                raise AssertionError(
+                    'О разомкнутом выключателе пользователю не сообщают.')
+
+        tenant = tenants.Tenant(token='a', chat_id=1)
+        started = tenant.poll.next_due
+        tenants.poll_tenant(Bot(), tenant)
+        assert tenant.poll.next_due > started, (
+            'Опрос при разомкнутом выключателе должен откладываться.'
+        )
+        assert tenant.errors.report(ConnectionError('down')) == 1, (
+            'Разомкнутый выключатель не считается новой ошибкой.'
+        )
+
+    def test_api_server_errors_open_breaker(self, monkeypatch, circuit,
+                                            homework_module):
+        monkeypatch.setattr(homework_module, 'API_BREAKER', circuit)
+
+        class Response:
+            status_code = 502
+            headers = {}
+
+        class Session:
+            calls = 0
+
+            def get(self, **kwargs):
+                Session.calls += 1
+                return Response()
+
+        for _ in range(5):
+            with pytest.raises((ValueError, ConnectionError)):
+                homework_module.fetch_response(
+                    0, {'Authorization': 'OAuth a'}, Session())
+        assert Session.calls == 3, (
+            'После порога сбоев API больше не должен опрашиваться.'
+        )
+
+    def test_open_send_breaker_skips_send(self, monkeypatch, circuit,
+                                          homework_module):
+        monkeypatch.setattr(homework_module, 'SEND_BREAKER', circuit)
+
+        class Bot:
+            calls = 0
+
+            def send_message(self, chat_id, text):
+                Bot.calls += 1
+                raise NetworkError('down')
+
+        bot = Bot()
+        results = [homework_module.send_message_to(bot, 1, 'text')
+                   for _ in range(5)]
+        assert not any(results)
+        assert Bot.calls == 3, (
+            'При разомкнутом выключателе сообщения не отправляются.'
+        )
+
+    def test_bad_request_does_not_open_breaker(self, monkeypatch, circuit,
+                                               homework_module):
+        monkeypatch.setattr(homework_module, 'SEND_BREAKER', circuit)
+
+        class Bot:
+            def send_message(self, chat_id, text):
+                raise BadRequest('chat not found')
+
+        for _ in range(5):
+            homework_module.send_message_to(Bot(), 1, 'text')
+        assert circuit.state == breaker.CLOSED, (
+            'Ошибка запроса не означает недоступность Telegram.'
+        )
+
+    def test_outbox_defers_without_spending_attempts(self, circuit):
+        for _ in range(3):
+            circuit.failure()
+
+        class Bot:
+            def send_message(self, chat_id, text):
+                raise AssertionError('Отправка должна быть отложена.')
+
+        outbox = Outbox(Bot(), window=0, breaker=circuit)
+        outbox.put(1, 'text')
+        with outbox._condition:
+            chat_id, batch = outbox._take()
+        assert outbox._send(chat_id, batch) == pytest.approx(30)
+        assert batch[0].attempts == 0, (
+            'Отложенная выключателем отправка не расходует попыток.'
+        )
@@ -0,0 +1,88 @@
+import pytest
+
+import utils
+
+
+class TestErrorFilter:
+
+    def test_same_error_is_reported_once_per_cooldown(self):
+        from error_filter import ErrorFilter
+
+        clock = utils.FakeClock()
+        errors = ErrorFilter(cooldown=60, clock=clock)
+        assert errors.report(ValueError('Код 500, from_date 1')) == 1
+        errors.mark_sent(ValueError('Код 500, from_date 1'))
+        for second in range(2, 5):
+            assert errors.report(
+                ValueError(f'Код 500, from_date {second}')) is None, (
+                'Ошибки, отличающиеся только числами, должны считаться '
+                'одной и той же ошибкой.'
+            )
+        clock.now += 60
+        assert errors.report(ValueError('Код 500, from_date 5')) == 4, (
+            'После паузы должна приходить сводка с числом повторов.'
+        )
+
+    def test_other_error_type_is_new(self):
+        from error_filter import ErrorFilter
+
+        clock = utils.FakeClock()
+        errors = ErrorFilter(cooldown=60, clock=clock)
+        errors.mark_sent(ValueError('Something wrong'))
+        assert errors.report(TypeError('Something wrong')) == 1
+        clock.now += 60
+        errors.reset()
+        assert errors.report(ValueError('Something wrong')) == 1
+
+    def test_success_does_not_cancel_cooldown(self):
+        from error_filter import ErrorFilter
+
+        clock = utils.FakeClock()
+        errors = ErrorFilter(cooldown=60, clock=clock)
+        errors.mark_sent(ValueError('Something wrong'))
+        for _ in range(3):
+            clock.now += 10
+            errors.reset()
+            assert errors.report(ValueError('Something wrong')) is None, (
+                'Успешный опрос не должен отменять паузу между '
+                'уведомлениями о сбое.'
+            )
+        clock.now += 30
+        assert errors.report(ValueError('Something wrong')) == 4
+
+    def test_unsent_error_is_reported_as_new(self):
+        from error_filter import ErrorFilter
+
+        errors = ErrorFilter(cooldown=60, clock=utils.FakeClock())
+        assert errors.report(ValueError('Something wrong')) == 1
+        assert errors.report(ValueError('Something wrong')) == 1, (
+            'Пока уведомление не отправлено, сводка о продолжающемся '
+            'сбое не нужна.'
+        )
+
+    def test_main_does_not_flood_chat_with_errors(self, monkeypatch,
+                                                 homework_module):
+        sent = []
+        sleeps = []
+
+        def failing_api(timestamp):
+            raise ConnectionError('Something wrong')
+
+        def sleep(secs):
+            sleeps.append(secs)
+            if len(sleeps) == 5:
+                raise utils.BreakInfiniteLoop('break')
+
+        monkeypatch.setattr(homework_module, 'check_tokens', lambda: None)
+        monkeypatch.setattr(
+            homework_module.telegram, 'Bot', utils.MockTelegramBot)
+        monkeypatch.setattr(homework_module, 'get_api_answer', failing_api)
+        monkeypatch.setattr(
+            homework_module, 'send_message',
+            lambda bot, message: sent.append(message) or True)
+        monkeypatch.setattr(homework_module.time, 'sleep', sleep)
+        with pytest.raises(utils.BreakInfiniteLoop):
+            homework_module.main()
+        assert len(sent) == 2, (
+            'Одинаковая ошибка не должна отправляться в каждом цикле.'
+        )
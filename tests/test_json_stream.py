@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+from json_stream import HomeworkStream
+
+
+def chunked(data, size):
+    body = json.dumps(data, ensure_ascii=False).encode()
+    return [body[start:start + size] for start in range(0, len(body), size)]
+
+
+class TestHomeworkStream:
+    RESPONSE = {
+        'current_date': 1000198991,
+        'homeworks': [
+            {'id': index, 'homework_name': f'работа {index}',
+             'status': 'approved', 'reviewer_comment': 'Ок, {[]}'}
+            for index in range(50)
+        ],
+    }
+
+    @pytest.mark.parametrize('size', [1, 2, 7, 4096])
+    def test_chunk_boundaries_do_not_matter(self, size):
+        stream = HomeworkStream(chunked(self.RESPONSE, size))
+        assert list(stream) == self.RESPONSE['homeworks'], (
+            'Работы должны разбираться одинаково при любом разбиении '
+            'тела ответа на части.'
+        )
+        assert stream.count == 50
+        assert stream.fields == {'current_date': 1000198991}
+
+    def test_homeworks_are_yielded_before_body_ends(self):
+        chunks = chunked(self.RESPONSE, 64)
+        consumed = []
+
+        def body():
+            for chunk in chunks:
+                consumed.append(chunk)
+                yield chunk
+
+        first = next(iter(HomeworkStream(body())))
+        assert first == self.RESPONSE['homeworks'][0]
+        assert len(consumed) < len(chunks), (
+            'Первая работа должна быть доступна до получения всего ответа.'
+        )
+
+    @pytest.mark.parametrize('body, error', [
+        ([], TypeError),
+        ({'homeworks': {}}, TypeError),
+        ({'current_date': 1}, KeyError),
+        ({'code': 'not_authenticated', 'homeworks': []}, ValueError),
+    ])
+    def test_invalid_responses(self, body, error):
+        with pytest.raises(error):
+            list(HomeworkStream(chunked(body, 3)))
+
+    def test_truncated_body(self):
+        chunks = chunked(self.RESPONSE, 100)[:-1]
+        with pytest.raises(ValueError):
+            list(HomeworkStream(chunks))
+
+    def test_stream_is_closed(self):
+        closed = []
+        list(HomeworkStream(chunked(self.RESPONSE, 100),
+                            close=lambda: closed.append(True)))
+        assert closed == [True]
+
+    def test_error_response_is_closed(self, monkeypatch, homework_module):
+        from breaker import CircuitBreaker
+
+        monkeypatch.setattr(
+            homework_module, 'API_BREAKER', CircuitBreaker('test'))
+        closed = []
+
+        class Response:
+            headers = {}
+
+            def __init__(self, status_code):
+                self.status_code = status_code
+
+            def close(self):
+                closed.append(self.status_code)
+
+        class Session:
+            codes = [503, 404]
+
+            def get(self, **kwargs):
+                return Response(self.codes.pop(0))
+
+        session = Session()
+        for _ in range(2):
+            with pytest.raises((ValueError, ConnectionError)):
+                homework_module.stream_homeworks(0, {}, session)
+        assert closed == [503, 404], (
+            'Поток с ошибочным кодом должен закрываться, '
+            'иначе соединение не вернётся в пул.'
+        )
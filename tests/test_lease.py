@@ -0,0 +1,175 @@
+import pytest
+
+import lease
+import utils
+
+
+@pytest.fixture(params=['sqlite', 'file'])
+def store(request, tmp_path):
+    return lease.open_leases(request.param, str(tmp_path / 'leases'))
+
+
+@pytest.fixture
+def clock():
+    return utils.FakeClock()
+
+
+def keeper(store, owner, clock):
+    return lease.LeaseKeeper(store, owner, ttl=15, renew=3, clock=clock)
+
+
+class TestLeaseStore:
+
+    def test_lease_is_exclusive_until_expired(self, store):
+        assert store.acquire(['x', 'y'], 'a', 100, 15) == {'x': 0, 'y': 0}
+        assert store.acquire(['x', 'z'], 'b', 110, 15) == {'z': 0}, (
+            'Чужая действующая аренда не захватывается.'
+        )
+        assert store.acquire(['x'], 'a', 112, 15) == {'x': 115}, (
+            'Владелец продлевает свою аренду.'
+        )
+        assert store.acquire(['x'], 'b', 127, 15) == {'x': 127}, (
+            'Истёкшая аренда захватывается другим экземпляром.'
+        )
+
+    def test_incomplete_backend_is_rejected(self):
+        class AcquireOnly(lease.LeaseStore):
+            def acquire(self, keys, owner, now, ttl):
+                return {}
+
+        with pytest.raises(TypeError):
+            AcquireOnly()
+
+    def test_released_lease_is_free(self, store):
+        store.acquire(['x'], 'a', 100, 15)
+        store.release(['x'], 'b', 101)
+        assert store.acquire(['x'], 'b', 102, 15) == {}, (
+            'Освободить аренду может только её владелец.'
+        )
+        store.release(['x'], 'a', 103)
+        assert store.acquire(['x'], 'b', 104, 15) == {'x': 103}
+
+    def test_unknown_backend(self, tmp_path):
+        with pytest.raises(ValueError):
+            lease.open_leases('redis', str(tmp_path / 'leases'))
+
+
+class TestLeaseKeeper:
+
+    def test_handover_takes_seconds(self, store, clock):
+        old = keeper(store, 'old', clock)
+        new = keeper(store, 'new', clock)
+        old.renew(['x', 'y'])
+        new.renew(['x', 'y'])
+        assert old.held == {'x', 'y'} and new.held == set()
+        assert not new.due()
+        old.release()
+        clock.now += 3
+        assert new.due()
+        new.renew(['x', 'y'])
+        assert new.held == {'x', 'y'}, (
+            'Освобождённая аренда подхватывается при следующем продлении.'
+        )
+        assert new.handover('x'), (
+            'Подхват у недавно остановленного экземпляра - не новый запуск.'
+        )
+
+    def test_cold_start_is_not_handover(self, store, clock):
+        first = keeper(store, 'first', clock)
+        first.renew(['x'])
+        assert not first.handover('x')
+        first.release()
+        clock.now += lease.RESTART_GAP + 1
+        second = keeper(store, 'second', clock)
+        second.renew(['x'])
+        assert not second.handover('x'), (
+            'После долгого перерыва бот запускается заново.'
+        )
+
+    def test_unwanted_keys_are_released(self, store, clock):
+        first = keeper(store, 'first', clock)
+        second = keeper(store, 'second', clock)
+        first.renew(['x', 'y'])
+        first.renew(['x'])
+        second.renew(['y'])
+        assert first.held == {'x'} and second.held == {'y'}
+
+    def test_expired_lease_is_lost(self, store, clock):
+        stalled = keeper(store, 'stalled', clock)
+        other = keeper(store, 'other', clock)
+        stalled.renew(['x'])
+        clock.now += 16
+        other.renew(['x'])
+        stalled.renew(['x'])
+        assert other.held == {'x'} and stalled.held == set(), (
+            'Экземпляр, не продливший аренду вовремя, теряет пользователя.'
+        )
+
+    def test_unrenewed_lease_is_not_held(self, store, clock):
+        stalled = keeper(store, 'stalled', clock)
+        stalled.renew(['x'])
+        assert stalled.holds('x')
+        clock.now += 15
+        assert not stalled.holds('x'), (
+            'Аренда, не продлённая за ttl, могла перейти к другому.'
+        )
+
+
+class TestTenantLeases:
+
+    def test_second_instance_waits_for_release(self, monkeypatch, store,
+                                               clock, homework_module):
+        import tenants
+        registry = tenants.TenantRegistry(
+            tenants.Tenant(token=str(index), chat_id=index)
+            for index in range(5)
+        )
+        for tenant in registry:
+            tenant.poll.next_due = 0
+        other = keeper(store, 'old', clock)
+        other.renew(tenant.name for tenant in registry)
+        monkeypatch.setattr(tenants, 'coordinator', None)
+        monkeypatch.setattr(tenants, 'leases', keeper(store, 'new', clock))
+        monkeypatch.setattr(lease, 'from_env', lambda: tenants.leases)
+        monkeypatch.setattr(tenants.sharding, 'from_env', lambda: None)
+        tenants.start_sharding(registry)
+        assert tenants.due_tenants(registry, now=100) == [], (
+            'Пользователей с чужой арендой опрашивать нельзя.'
+        )
+        other.release()
+        clock.now += 3
+        assert len(tenants.due_tenants(registry, now=103)) == 5, (
+            'После освобождения аренды пользователи опрашиваются сразу.'
+        )
+        assert not any(tenants.greeting_due(tenant) for tenant in registry), (
+            'При выкладке приветствие не отправляется повторно.'
+        )
+
+    def test_long_cycle_stops_polling_lost_tenants(self, monkeypatch, store,
+                                                   clock, homework_module):
+        import tenants
+        registry = tenants.TenantRegistry(
+            tenants.Tenant(token=str(index), chat_id=index)
+            for index in range(2)
+        )
+        polled = []
+        monkeypatch.setattr(tenants, 'coordinator', None)
+        monkeypatch.setattr(tenants, 'leases', keeper(store, 'slow', clock))
+        monkeypatch.setattr(
+            tenants, 'fetch_update',
+            lambda tenant: polled.append(tenant.name))
+        tenants.leases.renew(tenant.name for tenant in registry)
+        first, second = registry
+        clock.now += 5
+        tenants.poll_tenant(None, first)
+        assert polled == [first.name], (
+            'Аренда продлевается по ходу цикла опроса.'
+        )
+        clock.now += 16
+        keeper(store, 'other', clock).renew([second.name])
+        tenants.poll_tenant(None, second)
+        assert polled == [first.name], (
+            'Пользователя, аренду которого забрали, опрашивать нельзя.'
+        )
+        assert not second.owned
+        assert second.name not in registry.scheduler
@@ -0,0 +1,68 @@
+import json
+import logging
+
+import pytest
+
+import log_setup
+
+
+@pytest.fixture
+def configured(monkeypatch, tmp_path):
+    monkeypatch.setattr(log_setup, 'LOG_MAX_BYTES', 2000)
+    monkeypatch.setattr(log_setup, 'LOG_BACKUPS', 2)
+    monkeypatch.setattr(log_setup, 'LOG_SAMPLE_RATE', 0)
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    path = tmp_path / 'bot.log'
+    listener = log_setup.setup_logging(str(path))
+    yield path, listener
+    listener.stop()
+    for handler in root.handlers:
+        if handler not in handlers:
+            root.removeHandler(handler)
+    root.setLevel(level)
+
+
+class TestLogSetup:
+
+    def test_records_are_json_with_fields(self, configured):
+        path, listener = configured
+        logging.getLogger('bot').info(
+            'Опрос', extra={'tenant': 'student', 'latency': 0.25})
+        listener.stop()
+        record = json.loads(path.read_text(encoding='utf-8'))
+        assert record['message'] == 'Опрос'
+        assert record['level'] == 'INFO'
+        assert record['tenant'] == 'student'
+        assert record['latency'] == 0.25
+
+    def test_sampled_debug_records_are_dropped(self, configured):
+        path, listener = configured
+        logger = logging.getLogger('bot')
+        logger.debug('Успешный опрос', extra={'sampled': True})
+        logger.debug('Важная запись')
+        listener.stop()
+        messages = [
+            json.loads(line)['message']
+            for line in path.read_text(encoding='utf-8').splitlines()
+        ]
+        assert messages == ['Важная запись'], (
+            'Проверьте, что частые записи DEBUG прореживаются.'
+        )
+
+    def test_log_file_is_rotated(self, configured):
+        path, listener = configured
+        for index in range(100):
+            logging.getLogger('bot').info('Запись %d', index)
+        listener.stop()
+        assert (path.parent / 'bot.log.1').exists(), (
+            'Журнал должен ротироваться по размеру, а не расти без предела.'
+        )
+
+    def test_sample_filter_rate(self):
+        record = logging.makeLogRecord(
+            {'levelno': logging.DEBUG, 'sampled': True})
+        assert log_setup.SampleFilter(0.5, rng=lambda: 0.4).filter(record)
+        assert not log_setup.SampleFilter(0.5, rng=lambda: 0.6).filter(record)
+        record.levelno = logging.INFO
+        assert log_setup.SampleFilter(0, rng=lambda: 0.6).filter(record)
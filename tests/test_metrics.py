@@ -0,0 +1,68 @@
+from http import HTTPStatus
+import urllib.request
+
+import pytest
+
+import metrics
+import utils
+
+
+class TestMetrics:
+
+    def test_render_prometheus_text(self):
+        registry = metrics.Registry()
+        counter = registry.register(
+            metrics.Counter('sent_total', 'Sent.', ['code']))
+        histogram = registry.register(
+            metrics.Histogram('latency_seconds', 'Latency.', buckets=(1, 5)))
+        counter.inc(code=200)
+        counter.inc(2, code=200)
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value)
+        text = registry.render()
+        assert '# TYPE sent_total counter' in text
+        assert 'sent_total{code="200"} 3' in text
+        assert 'latency_seconds_bucket{le="1"} 2' in text
+        assert 'latency_seconds_bucket{le="5"} 3' in text
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in text
+        assert 'latency_seconds_count 4' in text
+
+    def test_registry_reuses_same_metric(self):
+        registry = metrics.Registry()
+        first = registry.register(metrics.Counter('a', 'A.'))
+        assert registry.register(metrics.Counter('a', 'A.')) is first
+        with pytest.raises(ValueError):
+            registry.register(metrics.Gauge('a', 'A.'))
+
+    def test_metrics_endpoint(self):
+        server = metrics.start_metrics_server(port=0)
+        try:
+            host, port = server.server_address
+            with urllib.request.urlopen(
+                    f'http://{host}:{port}/metrics') as response:
+                assert response.status == HTTPStatus.OK
+                body = response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert 'homework_api_request_seconds' in body
+
+    def test_hot_paths_are_instrumented(self, monkeypatch, random_timestamp,
+                                        homework_module):
+        class Session:
+            def get(self, **kwargs):
+                return utils.MockResponseGET(
+                    random_timestamp=random_timestamp)
+
+        responses = homework_module.API_RESPONSES
+        before = responses.value(tenant='metrics', code=200)
+        homework_module.request_homeworks(
+            1, {}, Session(), tenant='metrics')
+        assert responses.value(tenant='metrics', code=200) == before + 1
+        assert homework_module.API_LATENCY.count(tenant='metrics') >= 1
+
+        failures = homework_module.VALIDATION_FAILURES
+        before = failures.value(stage='parse_status')
+        with pytest.raises(KeyError):
+            homework_module.parse_status({'status': 'approved'})
+        assert failures.value(stage='parse_status') == before + 1
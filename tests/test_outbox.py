@@ -0,0 +1,164 @@
+import threading
+
+import pytest
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+
+class ScriptedBot:
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        with self.lock:
+            if self.errors:
+                raise self.errors.pop(0)
+            self.sent.append((chat_id, text))
+
+
+class SlowBot(ScriptedBot):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.release.wait(2)
+        super().send_message(chat_id, text)
+
+
+@pytest.fixture
+def make_outbox():
+    from outbox import Outbox
+
+    boxes = []
+
+    def make(bot, **kwargs):
+        options = dict(workers=2, window=0.05, chat_rate=1000,
+                       global_rate=1000, backoff=0.01)
+        options.update(kwargs)
+        box = Outbox(bot, **options).start()
+        boxes.append(box)
+        return box
+
+    yield make
+    for box in boxes:
+        box.stop(timeout=1)
+
+
+class TestOutbox:
+
+    def test_messages_to_one_chat_are_coalesced(self, make_outbox):
+        bot = ScriptedBot()
+        box = make_outbox(bot)
+        results = []
+        for text in ('first', 'second'):
+            box.put(1, text, results.append)
+        box.put(2, 'other')
+        assert box.join(timeout=2)
+        assert sorted(bot.sent) == [(1, 'first\n\nsecond'), (2, 'other')], (
+            'Сообщения в один чат в пределах окна должны склеиваться.'
+        )
+        assert results == [True, True]
+
+    def test_retry_after_and_network_errors_are_retried(self, make_outbox):
+        bot = ScriptedBot([RetryAfter(0), NetworkError('timeout')])
+        box = make_outbox(bot)
+        box.put(1, 'text')
+        assert box.join(timeout=2)
+        assert bot.sent == [(1, 'text')]
+        assert not box.dead_letters
+
+    def test_permanent_errors_go_to_dead_letters(self, make_outbox):
+        bot = ScriptedBot([BadRequest('chat not found')] + [
+            NetworkError('timeout') for _ in range(3)
+        ])
+        box = make_outbox(bot, attempts=3)
+        results = []
+        box.put(1, 'bad', results.append)
+        assert box.join(timeout=2)
+        box.put(2, 'flaky', results.append)
+        assert box.join(timeout=2)
+        assert [letter[1] for letter in box.dead_letters] == ['bad', 'flaky']
+        assert results == [False, False]
+        assert bot.sent == []
+
+    def test_chat_rate_is_limited(self, make_outbox):
+        bot = ScriptedBot()
+        box = make_outbox(bot, window=0, chat_rate=1, chat_burst=1)
+        box.put(1, 'first')
+        assert box.join(timeout=2)
+        box.put(1, 'second')
+        assert not box.join(timeout=0.3), (
+            'Проверьте ограничение частоты отправки в один чат.'
+        )
+        assert bot.sent == [(1, 'first')]
+
+    def test_long_text_is_split_into_messages(self):
+        import outbox
+
+        messages = list(outbox.batches(['x' * 1000] * 10, limit=4096))
+        assert len(messages) == 3
+        assert all(len(message) <= 4096 for message in messages)
+        parts = list(outbox.batches(['y' * 5000, 'z'], limit=4096))
+        assert [len(part) for part in parts] == [4096, 907], (
+            'Строка длиннее лимита должна разрезаться на части.'
+        )
+
+    def test_tenant_is_committed_after_delivery(self, monkeypatch,
+                                                make_outbox):
+        import tenants
+
+        bot = ScriptedBot()
+        monkeypatch.setattr(tenants, 'outbox', make_outbox(bot))
+        tenant = tenants.Tenant(token='a', chat_id=1, timestamp=1)
+        registry = tenants.TenantRegistry([tenant])
+        committed = []
+        tenants.deliver(bot, tenant, 'text', lambda: committed.append(1))
+        assert tenants.due_tenants(registry, tenant.poll.next_due) == [], (
+            'Пользователь с недоставленным сообщением не должен '
+            'опрашиваться.'
+        )
+        assert tenants.outbox.join(timeout=2)
+        assert committed == [1]
+        assert tenants.due_tenants(
+            registry, tenant.poll.next_due) == [tenant]
+
+    def test_pending_delivery_does_not_spin_main_loop(self, monkeypatch,
+                                                      make_outbox):
+        import tenants
+
+        bot = SlowBot()
+        monkeypatch.setattr(tenants, 'outbox', make_outbox(bot))
+        tenant = tenants.Tenant(token='a', chat_id=1, timestamp=1)
+        registry = tenants.TenantRegistry([tenant])
+        tenants.woken.clear()
+        tenants.deliver(bot, tenant, 'text', lambda: None)
+        tenant.poll.next_due = 0
+        assert tenants.next_wakeup(registry, now=100) == 100 + (
+            tenants.homework.RETRY_PERIOD), (
+            'Пользователь с недоставленным сообщением не должен будить '
+            'главный цикл.'
+        )
+        bot.release.set()
+        assert tenants.woken.wait(2), (
+            'После доставки главный цикл должен проснуться.'
+        )
+        assert tenants.due_tenants(registry, now=100) == [tenant]
+
+    def test_priority_uses_statuses_being_delivered(self, monkeypatch,
+                                                    make_outbox):
+        import tenants
+
+        bot = SlowBot()
+        monkeypatch.setattr(tenants, 'outbox', make_outbox(bot))
+        tenant = tenants.Tenant(token='a', chat_id=1, timestamp=1)
+        tenants.TenantRegistry([tenant])
+        tenant.statuses.diff([{'id': 1, 'status': 'reviewing'}])
+        tenants.deliver(bot, tenant, 'text', lambda: None)
+        tenants.schedule_success(tenant, changed=True)
+        assert tenant.poll.reviewing, (
+            'Интервал опроса считается по статусам, о которых идёт '
+            'уведомление.'
+        )
+        bot.release.set()
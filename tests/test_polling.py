@@ -0,0 +1,71 @@
+from http import HTTPStatus
+
+import pytest
+
+import utils
+
+
+@pytest.fixture
+def policy():
+    from polling import PollPolicy
+    return PollPolicy(
+        base=600, fast=120, limit=3600, idle_polls=2, jitter=0,
+        per_hour=3600, burst=3, clock=utils.FakeClock(), rng=lambda: 0.5,
+    )
+
+
+class TestPolling:
+
+    def test_reviewing_polls_faster(self, policy):
+        state = policy.new_state()
+        assert policy.success(state, changed=True, reviewing=True) == 120
+        assert policy.success(state, changed=True, reviewing=False) == 600
+
+    def test_backoff_after_errors_and_idle(self, policy):
+        state = policy.new_state()
+        delays = [
+            policy.failure(state, ValueError('error')) for _ in range(5)
+        ]
+        assert delays == [600, 1200, 2400, 3600, 3600], (
+            'Проверьте экспоненциальный рост интервала после ошибок.'
+        )
+        delays = [
+            policy.success(state, changed=False, reviewing=False)
+            for _ in range(4)
+        ]
+        assert delays == [600, 600, 1200, 2400]
+        assert policy.success(state, changed=True, reviewing=False) == 600
+
+    def test_retry_after_is_honoured(self, policy, homework_module):
+        state = policy.new_state()
+        error = homework_module.TooManyRequests('slow down', retry_after=900)
+        assert policy.failure(state, error) == 900
+        assert state.next_due == policy.clock() + 900
+
+    def test_budget_caps_request_rate(self, policy):
+        policy.per_hour = 60
+        policy.fast = 1
+        state = policy.new_state()
+        delays = [
+            policy.success(state, changed=True, reviewing=True)
+            for _ in range(4)
+        ]
+        assert delays[:2] == [1, 1]
+        assert delays[2] == pytest.approx(60), (
+            'Проверьте, что бюджет запросов ограничивает частоту опроса.'
+        )
+
+    def test_429_raises_too_many_requests(self, monkeypatch,
+                                          current_timestamp,
+                                          homework_module):
+        class Session:
+            def get(self, **kwargs):
+                response = utils.MockResponseGET(
+                    http_status=HTTPStatus.TOO_MANY_REQUESTS)
+                response.headers = {'Retry-After': '120'}
+                return response
+
+        with pytest.raises(homework_module.TooManyRequests) as error:
+            homework_module.request_homeworks(
+                current_timestamp, {}, Session())
+        assert error.value.retry_after == 120
@@ -0,0 +1,88 @@
+import json
+from http import HTTPStatus
+
+import utils
+
+
+def make_session(payloads, etag=None):
+    calls = []
+
+    class Session:
+        def get(self, **kwargs):
+            calls.append(kwargs)
+            data = payloads[min(len(calls), len(payloads)) - 1]
+            status = HTTPStatus.OK
+            if etag and kwargs['headers'].get('If-None-Match') == etag:
+                status = HTTPStatus.NOT_MODIFIED
+            response = utils.MockResponseGET(http_status=status)
+            response.content = json.dumps(data).encode()
+            response.headers = {'ETag': etag} if etag else {}
+
+            def fail_json():
+                raise AssertionError(
+                    'Неизменившийся ответ не должен разбираться.')
+
+            response.json = (
+                fail_json if status == HTTPStatus.NOT_MODIFIED
+                else lambda: data
+            )
+            return response
+
+    return Session(), calls
+
+
+class TestResponseCache:
+
+    def test_unchanged_body_skips_decoding(self, homework_module):
+        from response_cache import ResponseCache
+
+        cache = ResponseCache()
+        slot = cache.slot('tenant')
+        session, calls = make_session([
+            {'homeworks': [], 'current_date': 1},
+            {'homeworks': [], 'current_date': 2},
+        ])
+        headers = {'Authorization': 'OAuth a'}
+        first = homework_module.request_homeworks(10, headers, session, slot)
+        assert first == {'homeworks': [], 'current_date': 1}
+        slot.commit()
+        second = homework_module.request_homeworks(10, headers, session, slot)
+        assert second is None, (
+            'Ответ, отличающийся только current_date, должен считаться '
+            'неизменившимся.'
+        )
+        assert cache.short_circuited == 1
+        assert cache.polls == 2
+
+    def test_uncommitted_response_is_processed_again(self, homework_module):
+        from response_cache import ResponseCache
+
+        slot = ResponseCache().slot('tenant')
+        session, calls = make_session([{'homeworks': [], 'current_date': 1}])
+        headers = {'Authorization': 'OAuth a'}
+        homework_module.request_homeworks(10, headers, session, slot)
+        assert homework_module.request_homeworks(
+            10, headers, session, slot) is not None, (
+            'Необработанный ответ не должен попадать в кэш.'
+        )
+        slot.commit()
+        assert homework_module.request_homeworks(
+            11, headers, session, slot) is not None, (
+            'Кэш должен учитывать from_date.'
+        )
+
+    def test_etag_is_sent_and_304_short_circuits(self, homework_module):
+        from response_cache import ResponseCache
+
+        cache = ResponseCache()
+        slot = cache.slot('tenant')
+        session, calls = make_session(
+            [{'homeworks': [], 'current_date': 1}], etag='"v1"')
+        headers = {'Authorization': 'OAuth a'}
+        homework_module.request_homeworks(10, headers, session, slot)
+        slot.commit()
+        assert homework_module.request_homeworks(
+            10, headers, session, slot) is None
+        assert calls[1]['headers']['If-None-Match'] == '"v1"'
+        assert 'If-None-Match' not in headers
+        assert cache.short_circuited == 1
@@ -0,0 +1,82 @@
+import pytest
+
+import scheduler
+
+
+@pytest.fixture
+def tenants_module():
+    import tenants
+    return tenants
+
+
+class TestScheduler:
+
+    def test_due_keys_are_ordered_by_priority_then_due(self):
+        queue = scheduler.Scheduler()
+        queue.schedule('idle-late', 5)
+        queue.schedule('idle-early', 1)
+        queue.schedule('reviewing', 4, scheduler.URGENT)
+        queue.schedule('future', 50, scheduler.URGENT)
+        assert queue.due(10) == ['reviewing', 'idle-early', 'idle-late'], (
+            'Срочные ключи должны выдаваться раньше, остальные - по сроку.'
+        )
+        assert queue.next_due() == 1
+
+    def test_ready_key_stays_until_rescheduled(self):
+        queue = scheduler.Scheduler()
+        queue.schedule('a', 1)
+        assert queue.due(2) == ['a']
+        assert queue.due(3) == ['a'], (
+            'Ключ остаётся готовым, пока его не поставят в расписание.'
+        )
+        queue.schedule('a', 10)
+        assert queue.due(3) == []
+        assert queue.next_due() == 10
+
+    def test_reschedule_replaces_previous_due(self):
+        queue = scheduler.Scheduler()
+        queue.schedule('a', 1)
+        queue.schedule('a', 20)
+        assert queue.due(5) == [] and queue.next_due() == 20
+        queue.remove('a')
+        assert queue.next_due() is None and 'a' not in queue
+
+    def test_stale_entries_are_compacted(self):
+        queue = scheduler.Scheduler()
+        for due in range(1000):
+            queue.schedule('a', 1000 - due)
+        assert len(queue._timers) < 100, (
+            'Отменённые сроки не должны копиться в куче.'
+        )
+        assert len(queue) == 1 and queue.due(1) == ['a']
+
+
+class TestTenantSchedule:
+
+    def test_reviewing_tenant_is_polled_first(self, tenants_module):
+        registry = tenants_module.TenantRegistry(
+            tenants_module.Tenant(token=str(index), chat_id=index)
+            for index in range(3)
+        )
+        for tenant in registry:
+            tenant.poll.next_due = 0
+        registry.get('2').statuses.load({1: 'reviewing'})
+        registry.reschedule(registry.get('2'))
+        due = tenants_module.due_tenants(registry, now=1)
+        assert [tenant.name for tenant in due] == ['2', '0', '1'], (
+            'Пользователь с работой на проверке опрашивается первым.'
+        )
+
+    def test_next_due_change_moves_tenant(self, tenants_module):
+        registry = tenants_module.TenantRegistry([
+            tenants_module.Tenant(token='a', chat_id=1),
+            tenants_module.Tenant(token='b', chat_id=2),
+        ])
+        registry.get('1').poll.next_due = 100
+        registry.get('2').poll.next_due = 30
+        assert tenants_module.next_wakeup(registry, now=0) == 30
+        removed = registry.remove('2')
+        removed.poll.next_due = 0
+        assert tenants_module.next_wakeup(registry, now=0) == 100, (
+            'Удалённый пользователь не должен оставаться в расписании.'
+        )
@@ -0,0 +1,53 @@
+import schema
+
+
+class TestSchema:
+    GOOD = {'id': 1, 'homework_name': 'hw', 'status': 'approved',
+            'date_updated': '2024-01-01T10:00:00Z'}
+
+    def test_bad_records_are_quarantined_with_reasons(self):
+        quarantine = schema.Quarantine()
+        schema.quarantine, saved = quarantine, schema.quarantine
+        try:
+            valid = schema.validate([
+                self.GOOD,
+                {'homework_name': 'hw2'},
+                {'homework_name': 'hw3', 'status': 5},
+                'hw4',
+                {'id': 5, 'homework_name': 'hw5', 'status': 'rejected'},
+            ], tenant='student')
+        finally:
+            schema.quarantine = saved
+        assert [record['homework_name'] for record in valid] == [
+            'hw', 'hw5'], (
+            'Неправильные работы не должны прерывать проверку остальных.'
+        )
+        reasons = [reason for _, _, reason in quarantine.records]
+        assert len(reasons) == 3
+        assert 'status' in reasons[0] and 'status' in reasons[1]
+        assert {tenant for tenant, _, _ in quarantine.records} == {'student'}
+
+    def test_validation_metrics(self):
+        checked = schema.RECORDS_CHECKED.value()
+        missing = schema.RECORDS_QUARANTINED.value(reason='missing:status')
+        observed = schema.VALIDATION_SECONDS.count()
+        schema.validate([self.GOOD, {'homework_name': 'hw'}])
+        assert schema.RECORDS_CHECKED.value() == checked + 2
+        assert schema.RECORDS_QUARANTINED.value(
+            reason='missing:status') == missing + 1
+        assert schema.VALIDATION_SECONDS.count() == observed + 1
+
+    def test_compiled_schema(self):
+        check = schema.compile_schema({'name': ((str,), True)})
+        assert check({'name': 'hw'}) is None
+        assert check({})[0] == 'missing:name'
+        assert check({'name': 1})[0] == 'type:name'
+
+    def test_poll_continues_after_bad_record(self, homework_module):
+        import tenants
+        tenant = tenants.Tenant(token='a', chat_id=1)
+        [(chat_id, message)] = tenants.collect_update(tenant, {'homeworks': [
+            {'homework_name': 'hw1', 'status': 'approved'},
+            {'status': 'approved'},
+        ]})
+        assert 'hw1' in message
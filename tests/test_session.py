@@ -0,0 +1,85 @@
+import pytest
+import requests
+
+import utils
+
+
+class TestSession:
+
+    def test_session_is_shared_and_pooled(self, monkeypatch,
+                                          homework_module):
+        monkeypatch.setattr(homework_module, '_session', None)
+        session = homework_module.get_session()
+        assert session is homework_module.get_session(), (
+            'Сессия должна создаваться один раз.'
+        )
+        adapter = session.get_adapter(homework_module.ENDPOINT)
+        assert adapter._pool_maxsize == homework_module.HTTP_POOL_SIZE
+        assert adapter.max_retries.total == homework_module.HTTP_RETRIES
+
+    def test_request_uses_session_and_timeouts(self, monkeypatch,
+                                               random_timestamp,
+                                               current_timestamp,
+                                               homework_module):
+        calls = []
+
+        class Session:
+            def get(self, **kwargs):
+                calls.append(kwargs)
+                return utils.MockResponseGET(
+                    random_timestamp=random_timestamp)
+
+        def fail_get(*args, **kwargs):
+            raise AssertionError('Запрос должен идти через сессию.')
+
+        monkeypatch.setattr(requests, 'get', fail_get)
+        homework_module.request_homeworks(
+            current_timestamp, {'Authorization': 'OAuth a'}, Session())
+        assert calls[0]['timeout'] == (
+            homework_module.CONNECT_TIMEOUT, homework_module.READ_TIMEOUT
+        ), 'Проверьте, что у запроса заданы таймауты.'
+
+    def test_retry_after_is_left_to_scheduler(self, monkeypatch,
+                                              homework_module):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        import threading
+        import time
+
+        import breaker
+
+        hits = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                hits.append(1)
+                self.send_response(503)
+                self.send_header('Retry-After', '30')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address
+        monkeypatch.setattr(homework_module, 'ENDPOINT',
+                            f'http://{host}:{port}/')
+        monkeypatch.setattr(homework_module, 'HTTP_BACKOFF', 0)
+        monkeypatch.setattr(homework_module, '_session', None)
+        monkeypatch.setattr(homework_module, 'API_BREAKER',
+                            breaker.CircuitBreaker('test-retry-after'))
+        started = time.monotonic()
+        try:
+            with pytest.raises(homework_module.TooManyRequests) as info:
+                homework_module.request_homeworks(
+                    0, {'Authorization': 'OAuth a'},
+                    homework_module.get_session())
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert time.monotonic() - started < 2, (
+            'Повторы не должны ждать Retry-After внутри запроса.'
+        )
+        assert info.value.retry_after == 30
+        assert len(hits) == homework_module.HTTP_RETRIES + 1
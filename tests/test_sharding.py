@@ -0,0 +1,105 @@
+import pytest
+
+import sharding
+import utils
+
+
+@pytest.fixture
+def membership(tmp_path):
+    return sharding.SQLiteMembership(str(tmp_path / 'shards.sqlite3'), ttl=15)
+
+
+class TestHashRing:
+    KEYS = [f'tenant-{index}' for index in range(2000)]
+
+    def test_keys_are_spread_over_nodes(self):
+        ring = sharding.HashRing(['a', 'b', 'c', 'd'])
+        counts = {}
+        for key in self.KEYS:
+            node = ring.node_for(key)
+            counts[node] = counts.get(node, 0) + 1
+        assert set(counts) == {'a', 'b', 'c', 'd'}
+        assert min(counts.values()) > len(self.KEYS) / 4 * 0.6, (
+            'Проверьте, что пользователи распределяются равномерно.'
+        )
+
+    def test_join_moves_only_share_of_keys(self):
+        ring = sharding.HashRing(['a', 'b', 'c'])
+        before = {key: ring.node_for(key) for key in self.KEYS}
+        ring.add('d')
+        moved = [key for key in self.KEYS if ring.node_for(key) != before[key]]
+        assert all(ring.node_for(key) == 'd' for key in moved), (
+            'При добавлении процесса пользователи переезжают только к нему.'
+        )
+        assert len(moved) < len(self.KEYS) / 2
+
+
+class TestCoordinator:
+
+    def test_membership_changes_rebalance(self, membership):
+        clock = utils.FakeClock()
+        first = sharding.Coordinator('a', membership, 5, clock)
+        second = sharding.Coordinator('b', membership, 5, clock)
+        assert first.refresh()
+        assert first.members == ('a',)
+        assert second.refresh()
+        assert second.members == ('a', 'b')
+        assert not first.refresh(), (
+            'Состав не должен перечитываться чаще раза в heartbeat секунд.'
+        )
+        clock.now += 5
+        assert first.refresh()
+        keys = [f'tenant-{index}' for index in range(100)]
+        for key in keys:
+            assert first.owns(key) != second.owns(key), (
+                'Каждый пользователь закреплён ровно за одним процессом.'
+            )
+        clock.now += 20
+        assert first.refresh()
+        assert first.members == ('a',), (
+            'Процесс без отметок дольше ttl считается ушедшим.'
+        )
+        assert all(first.owns(key) for key in keys)
+
+
+class TestTenantSharding:
+
+    def test_worker_serves_own_metrics(self, monkeypatch):
+        import log_setup
+        import metrics
+        import tenants
+
+        ports = []
+        monkeypatch.setattr(sharding, 'WORKER_ID', sharding.WORKER_ID)
+        monkeypatch.setattr(metrics, 'METRICS_PORT', 9100)
+        monkeypatch.setattr(metrics, 'start_metrics_server', ports.append)
+        monkeypatch.setattr(log_setup, 'setup_logging', lambda path: None)
+        monkeypatch.setattr(tenants, 'main', lambda: None)
+        sharding._worker_main('host-2', 2)
+        assert ports == [9103], (
+            'Каждый процесс опроса должен отдавать метрики на своём порту.'
+        )
+
+    def test_acquired_tenants_wait_and_reload(self, monkeypatch, membership,
+                                              homework_module):
+        import tenants
+        clock = utils.FakeClock()
+        coordinator = sharding.Coordinator('a', membership, 5, clock)
+        monkeypatch.setattr(tenants, 'coordinator', coordinator)
+        registry = tenants.TenantRegistry(
+            tenants.Tenant(token=str(index), chat_id=index)
+            for index in range(20)
+        )
+        for tenant in registry:
+            tenant.poll.next_due = 0
+        membership.heartbeat('b', clock.now)
+        due = tenants.due_tenants(registry, now=100)
+        mine = [tenant for tenant in registry if tenant.owned]
+        assert 0 < len(mine) < 20
+        assert due == mine
+        membership.leave('b')
+        clock.now += 5
+        assert tenants.due_tenants(registry, now=101) == mine, (
+            'Перешедшие пользователи опрашиваются только после задержки.'
+        )
+        assert len(tenants.due_tenants(registry, now=200)) == 20
@@ -0,0 +1,163 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
+import time
+
+import pytest
+
+import singleflight
+import utils
+
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_share_one_result(self):
+        flight = singleflight.SingleFlight('test')
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            release.wait(2)
+            return {'homeworks': []}
+
+        def call():
+            return flight.do('key', slow)
+
+        with ThreadPoolExecutor(5) as pool:
+            futures = [pool.submit(call) for _ in range(5)]
+            while singleflight.COALESCED.value(name='test') < 4:
+                release.wait(0.01)
+            release.set()
+        results = [future.result() for future in futures]
+        assert calls == [1], 'Одинаковые вызовы должны склеиваться.'
+        assert all(result is results[0] for result in results), (
+            'Все вызовы должны получить один и тот же результат.'
+        )
+        assert len(flight) == 0
+
+    def test_error_is_shared_and_key_is_freed(self):
+        flight = singleflight.SingleFlight('test-error')
+        release = threading.Event()
+
+        def failing():
+            release.wait(2)
+            raise ConnectionError('down')
+
+        with ThreadPoolExecutor(3) as pool:
+            futures = [pool.submit(flight.do, 'key', failing)
+                       for _ in range(3)]
+            while singleflight.COALESCED.value(name='test-error') < 2:
+                release.wait(0.01)
+            release.set()
+        for future in futures:
+            with pytest.raises(ConnectionError):
+                future.result()
+        assert flight.do('key', lambda: 'fresh') == 'fresh', (
+            'После завершения вызова ключ должен освобождаться.'
+        )
+
+    def test_different_keys_are_not_coalesced(self):
+        flight = singleflight.SingleFlight('test-keys')
+        assert flight.do(1, lambda: 'a') == 'a'
+        assert flight.do(2, lambda: 'b') == 'b'
+
+
+class TestRequestCoalescing:
+
+    def test_same_token_and_date_share_request(self, monkeypatch,
+                                               homework_module,
+                                               random_timestamp):
+        release = threading.Event()
+        calls = []
+
+        class Session:
+            def get(self, **kwargs):
+                calls.append(kwargs['params'])
+                release.wait(2)
+                return utils.MockResponseGET(
+                    random_timestamp=random_timestamp)
+
+        monkeypatch.setattr(
+            homework_module, 'IN_FLIGHT',
+            singleflight.SingleFlight('test-api'))
+        headers = {'Authorization': 'OAuth a'}
+        with ThreadPoolExecutor(4) as pool:
+            futures = [
+                pool.submit(homework_module.request_homeworks,
+                            1, headers, Session())
+                for _ in range(3)
+            ]
+            other = pool.submit(homework_module.request_homeworks,
+                                2, headers, Session())
+            while singleflight.COALESCED.value(name='test-api') < 2:
+                release.wait(0.01)
+            release.set()
+        responses = [future.result() for future in futures]
+        other.result()
+        assert sorted(params['from_date'] for params in calls) == [1, 2], (
+            'Запросы с одинаковыми токеном и from_date должны склеиваться.'
+        )
+        assert all(response == responses[0] for response in responses)
+        assert responses[0] is not responses[1], (
+            'Каждый вызов должен получать свой разобранный ответ.'
+        )
+
+    def test_tenants_sharing_token_share_one_poll(self, monkeypatch,
+                                                  homework_module):
+        import tenants
+
+        release = threading.Event()
+        calls = []
+        data = {
+            'homeworks': [{'id': 1, 'homework_name': 'hw',
+                           'status': 'approved'}],
+            'current_date': int(time.time()),
+        }
+
+        class Session:
+            def get(self, **kwargs):
+                calls.append(kwargs['headers'].get('If-None-Match'))
+                release.wait(2)
+                response = utils.MockResponseGET()
+                response.content = json.dumps(data).encode()
+                response.headers = {'ETag': '"v1"'}
+                response.json = lambda: json.loads(response.content)
+                return response
+
+        monkeypatch.setattr(
+            homework_module, 'IN_FLIGHT',
+            singleflight.SingleFlight('test-tenants'))
+        monkeypatch.setattr(homework_module, 'get_session', Session)
+        monkeypatch.setattr(tenants, 'response_cache',
+                            tenants.ResponseCache())
+        first, second = (
+            tenants.Tenant(token='shared', chat_id=index,
+                           timestamp=data['current_date'])
+            for index in (1, 2)
+        )
+        with ThreadPoolExecutor(2) as pool:
+            futures = [
+                pool.submit(tenants.fetch_update, tenant)
+                for tenant in (first, second)
+            ]
+            while singleflight.COALESCED.value(name='test-tenants') < 1:
+                release.wait(0.01)
+            release.set()
+        updates = [future.result() for future in futures]
+        assert calls == [None], (
+            'Опрос одного токена должен уходить в API один раз.'
+        )
+        assert all(letters for letters, _ in updates), (
+            'Каждый пользователь должен получить изменения из общего ответа.'
+        )
+        tenants.commit_update(first, updates[0][1])
+        with ThreadPoolExecutor(2) as pool:
+            futures = [
+                pool.submit(tenants.fetch_update, tenant)
+                for tenant in (first, second)
+            ]
+        [future.result() for future in futures]
+        assert sorted(calls[1:], key=str) == ['"v1"', None], (
+            'Запросы с разным If-None-Match не должны склеиваться.'
+        )
@@ -0,0 +1,57 @@
+import sys
+
+import pytest
+
+import lazy
+import startup
+
+
+@pytest.fixture(scope='module')
+def measured():
+    return [startup.measure() for _ in range(3)]
+
+
+class TestStartup:
+
+    def test_heavy_modules_are_deferred(self, measured):
+        assert measured[0]['eager'] == [], (
+            'Тяжёлые зависимости не должны загружаться при импорте бота.'
+        )
+
+    def test_import_fits_budget(self, measured):
+        best = min(startup.import_time(data) for data in measured)
+        assert best < startup.STARTUP_BUDGET, (
+            f'Импорт бота занял {best * 1000:.0f} мс, бюджет - '
+            f'{startup.STARTUP_BUDGET * 1000:.0f} мс.'
+        )
+
+    def test_all_phases_are_reported(self, measured):
+        names = [name for name, _, _ in measured[0]['phases']]
+        assert names[0] == startup.IMPORT_PHASE
+        assert 'import telegram' in names and 'HTTP session' in names
+        lines = startup.report(measured[0], budget=0)
+        assert lines[-1] == startup.BUDGET_EXCEEDED.format(budget=0), (
+            'Превышение бюджета должно попадать в отчёт.'
+        )
+
+    def test_phase_error_is_recorded(self):
+        profile = startup.StartupProfile()
+        with profile.phase('broken'):
+            raise KeyError('token')
+        [(name, _, note)] = profile.phases
+        assert name == 'broken' and note.startswith('KeyError')
+
+
+class TestLazyImport:
+
+    def test_module_is_loaded_on_first_access(self, monkeypatch):
+        monkeypatch.delitem(sys.modules, 'colorsys', raising=False)
+        module = lazy.lazy_import('colorsys')
+        namespace = object.__getattribute__(module, '__dict__')
+        assert 'ONE_THIRD' not in namespace, (
+            'Модуль не должен выполняться до первого обращения.'
+        )
+        assert module.rgb_to_hsv(0, 0, 0) == (0, 0, 0)
+
+    def test_loaded_module_is_returned(self):
+        assert lazy.lazy_import('sys') is sys
@@ -0,0 +1,32 @@
+from status_diff import StatusTracker
+
+
+class TestStatusDiff:
+    HOMEWORKS = [
+        {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'},
+        {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+    ]
+
+    def test_all_changes_in_chronological_order(self):
+        tracker = StatusTracker()
+        changes = tracker.diff(self.HOMEWORKS)
+        assert [homework['id'] for homework in changes] == [1, 2], (
+            'Проверьте, что обрабатываются все работы из ответа, '
+            'от старых к новым.'
+        )
+
+    def test_changes_are_remembered_only_after_commit(self):
+        tracker = StatusTracker()
+        tracker.diff(self.HOMEWORKS)
+        assert len(tracker.diff(self.HOMEWORKS)) == 2
+        tracker.commit()
+        assert tracker.diff(self.HOMEWORKS) == []
+        changed = [{'id': 2, 'homework_name': 'hw2', 'status': 'approved'}]
+        assert tracker.diff(changed) == changed
+
+    def test_render_changes_batches_messages(self, homework_module):
+        message = homework_module.render_changes(self.HOMEWORKS)
+        for verdict in ('approved', 'reviewing'):
+            assert homework_module.HOMEWORK_VERDICTS[verdict] in message, (
+                'Проверьте, что все изменения попадают в одно сообщение.'
+            )
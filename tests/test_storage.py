@@ -0,0 +1,126 @@
+import pytest
+
+import storage
+
+
+@pytest.fixture(params=['sqlite', 'json'])
+def store_path(request, tmp_path):
+    return request.param, str(tmp_path / f'state.{request.param}')
+
+
+class TestStorage:
+
+    def test_writes_are_batched_until_flush(self, store_path):
+        backend, path = store_path
+        store = storage.open_store(backend, path)
+        store.save('a', {'timestamp': 1})
+        store.save('a', {'timestamp': 2})
+        store.save('b', {'timestamp': 3})
+        assert store.load('a') == {'timestamp': 2}
+        assert storage.open_store(backend, path).load('a') is None, (
+            'До flush() состояние не должно записываться.'
+        )
+        assert store.flush() == 2
+        assert store.flush() == 0
+        store.close()
+        reopened = storage.open_store(backend, path)
+        assert reopened.load('a') == {'timestamp': 2}
+        assert reopened.load('b') == {'timestamp': 3}
+
+    def test_workers_sharing_a_file_keep_each_others_state(self,
+                                                           store_path):
+        backend, path = store_path
+        first = storage.open_store(backend, path)
+        second = storage.open_store(backend, path)
+        first.save('a', {'timestamp': 1})
+        first.flush()
+        second.save('b', {'timestamp': 2})
+        second.flush()
+        assert second.load('a') == {'timestamp': 1}, (
+            'Перешедший пользователь должен читать свежую контрольную точку.'
+        )
+        first.save('a', {'timestamp': 3})
+        first.flush()
+        assert second.load('a') == {'timestamp': 3}
+        reopened = storage.open_store(backend, path)
+        assert reopened.load('b') == {'timestamp': 2}, (
+            'Запись одного процесса не должна затирать состояние другого.'
+        )
+
+    def test_failed_flush_keeps_changes(self, monkeypatch, store_path):
+        import sqlite3
+
+        backend, path = store_path
+        store = storage.open_store(backend, path)
+        store.save('a', {'timestamp': 1})
+        store.save('b', {'timestamp': 1})
+        write = store._write
+
+        def locked(states):
+            store.save('a', {'timestamp': 2})
+            raise sqlite3.OperationalError('database is locked')
+
+        monkeypatch.setattr(store, '_write', locked)
+        with pytest.raises(sqlite3.OperationalError):
+            store.flush()
+        monkeypatch.setattr(store, '_write', write)
+        assert store.flush() == 2, (
+            'Контрольные точки, которые не удалось записать, '
+            'должны записываться при следующем flush().'
+        )
+        reopened = storage.open_store(backend, path)
+        assert reopened.load('a') == {'timestamp': 2}, (
+            'Более новое состояние не должно затираться старым.'
+        )
+        assert reopened.load('b') == {'timestamp': 1}
+
+    def test_failed_flush_does_not_stop_polling(self, monkeypatch, caplog):
+        import tenants
+
+        class BrokenStore:
+            def flush(self):
+                raise OSError('No space left on device')
+
+        monkeypatch.setattr(tenants, 'checkpoints', BrokenStore())
+        tenants.poll_due(None, tenants.TenantRegistry())
+        assert 'No space left on device' in caplog.text, (
+            'Ошибка записи контрольных точек должна попадать в журнал, '
+            'а не завершать цикл опроса.'
+        )
+
+    def test_incomplete_backend_is_rejected(self):
+        class ReadOnlyStore(storage.StateStore):
+            def _read(self, key):
+                return None
+
+        with pytest.raises(TypeError):
+            ReadOnlyStore()
+
+    def test_unknown_backend(self, tmp_path):
+        with pytest.raises(ValueError):
+            storage.open_store('redis', str(tmp_path / 'state'))
+
+    def test_tenant_state_survives_restart(self, monkeypatch, store_path):
+        import tenants
+
+        backend, path = store_path
+        monkeypatch.setattr(tenants, 'checkpoints', None)
+        tenant = tenants.Tenant(token='a', chat_id=1, timestamp=10)
+        tenants.restore(tenants.TenantRegistry([tenant]),
+                        storage.open_store(backend, path))
+        tenant.statuses.diff([{'id': 5, 'status': 'reviewing'}])
+        tenants.commit_update(tenant, {
+            'homeworks': [{'id': 5, 'status': 'reviewing'}],
+            'current_date': 20,
+        })
+        tenants.flush_checkpoints()
+
+        restarted = tenants.Tenant(token='a', chat_id=1, timestamp=99)
+        assert tenants.restore(tenants.TenantRegistry([restarted]),
+                               storage.open_store(backend, path)) == 1
+        assert restarted.timestamp == 20
+        assert restarted.statuses.diff(
+            [{'id': 5, 'status': 'reviewing'}]) == [], (
+            'После перезапуска уже отправленный статус не должен '
+            'отправляться повторно.'
+        )
@@ -0,0 +1,134 @@
+import json
+
+import pytest
+
+
+class FlakyBot:
+    def __init__(self, broken=()):
+        self.broken = set(broken)
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        from telegram.error import NetworkError
+        if chat_id in self.broken:
+            raise NetworkError('chat is unavailable')
+        self.sent.append((chat_id, text))
+
+
+@pytest.fixture
+def tenants_module(monkeypatch, homework_module):
+    import tenants
+    monkeypatch.setattr(tenants, 'STREAM_HISTORY_AGE', 0)
+    monkeypatch.setattr(tenants, 'outbox', None)
+    return tenants
+
+
+CHANGES = {'homeworks': [
+    {'homework_name': 'hw1', 'status': 'approved'},
+    {'homework_name': 'hw2', 'status': 'rejected'},
+], 'current_date': 100}
+
+
+class TestSubscriptions:
+
+    def test_registry_merges_chats_of_one_token(self, tmp_path,
+                                                tenants_module):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'token': 'a', 'chat_id': 1, 'chats': [
+                {'chat_id': 2, 'statuses': ['approved']},
+            ]},
+            {'token': 'a', 'chat_id': 3, 'homeworks': ['hw2']},
+            {'token': 'b', 'chat_id': 4},
+        ]))
+        registry = tenants_module.TenantRegistry.from_file(str(path))
+        assert len(registry) == 2, (
+            'Записи с одним токеном должны опрашиваться один раз.'
+        )
+        chats = [item.chat_id for item in registry.get('1').subscriptions]
+        assert chats == [1, 2, 3]
+
+    def test_conflicting_records_of_one_token(self, tmp_path,
+                                              tenants_module):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'token': 'a', 'chat_id': 1, 'name': 'student'},
+            {'token': 'a', 'chat_id': 2, 'name': 'student', 'locale': 'en'},
+        ]))
+        registry = tenants_module.TenantRegistry.from_file(str(path))
+        assert registry.get('student').subscriptions[1].locale == 'en', (
+            'Локаль второй записи должна остаться у её чата.'
+        )
+        for key, value in (('name', 'group'), ('timestamp', 100)):
+            path.write_text(json.dumps([
+                {'token': 'a', 'chat_id': 1, 'name': 'student'},
+                {'token': 'a', 'chat_id': 2, key: value},
+            ]))
+            with pytest.raises(ValueError):
+                tenants_module.TenantRegistry.from_file(str(path))
+
+    def test_chat_without_id_is_rejected(self, tmp_path, tenants_module):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'token': 'a', 'chat_id': 1, 'chats': [{'statuses': []}]},
+        ]))
+        with pytest.raises(KeyError):
+            tenants_module.TenantRegistry.from_file(str(path))
+
+    def test_filters_select_changes(self, tenants_module):
+        Subscription = tenants_module.Subscription
+        tenant = tenants_module.Tenant(
+            token='a', chat_id=1, subscriptions=[
+                Subscription(1),
+                Subscription(2, statuses=frozenset({'approved'})),
+                Subscription(3, homeworks=frozenset({'hw2'})),
+                Subscription(4, statuses=frozenset({'reviewing'})),
+            ])
+        letters = dict(tenants_module.collect_update(tenant, CHANGES))
+        assert set(letters) == {1, 2, 3}, (
+            'Чат без подходящих изменений не получает сообщения.'
+        )
+        assert 'hw1' in letters[1] and 'hw2' in letters[1]
+        assert 'hw1' in letters[2] and 'hw2' not in letters[2]
+        assert 'hw2' in letters[3] and 'hw1' not in letters[3]
+
+    def test_one_fetch_feeds_all_chats(self, monkeypatch, tenants_module):
+        calls = []
+
+        def fetch(tenant):
+            calls.append(tenant.name)
+            return tenants_module.collect_update(tenant, CHANGES), CHANGES
+
+        monkeypatch.setattr(tenants_module, 'fetch_update', fetch)
+        Subscription = tenants_module.Subscription
+        tenant = tenants_module.Tenant(
+            token='a', chat_id=1, timestamp=1,
+            subscriptions=[Subscription(1), Subscription(2)])
+        bot = FlakyBot()
+        tenants_module.poll_tenant(bot, tenant)
+        assert calls == ['1'], 'API опрашивается один раз на токен.'
+        assert [chat_id for chat_id, _ in bot.sent] == [1, 2]
+        assert tenant.timestamp == 100
+
+    def test_retry_skips_delivered_chats(self, monkeypatch,
+                                         tenants_module):
+        monkeypatch.setattr(
+            tenants_module, 'fetch_update',
+            lambda tenant: (
+                tenants_module.collect_update(tenant, CHANGES), CHANGES))
+        Subscription = tenants_module.Subscription
+        tenant = tenants_module.Tenant(
+            token='a', chat_id=1, timestamp=1,
+            subscriptions=[Subscription(1), Subscription(2)])
+        bot = FlakyBot(broken={2})
+        tenants_module.poll_tenant(bot, tenant)
+        assert tenant.timestamp == 1, (
+            'Ответ фиксируется только после доставки во все чаты.'
+        )
+        bot.broken.clear()
+        tenants_module.poll_tenant(bot, tenant)
+        assert [chat_id for chat_id, _ in bot.sent] == [1, 2], (
+            'При повторе чат, уже получивший сообщение, пропускается.'
+        )
+        assert tenant.timestamp == 100
+        assert tenant.sent == set()
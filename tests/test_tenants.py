@@ -0,0 +1,187 @@
+import json
+
+import pytest
+import requests
+
+import utils
+
+
+class FakeSession:
+    def __init__(self, get):
+        self.get = get
+
+
+@pytest.fixture
+def tenants_module():
+    import tenants
+    return tenants
+
+
+class TestTenants:
+
+    def test_registry_from_file(self, tmp_path, tenants_module):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'token': 'a', 'chat_id': 1},
+            {'token': 'b', 'chat_id': 2, 'name': 'second'},
+        ]))
+        registry = tenants_module.TenantRegistry.from_file(str(path))
+        assert len(registry) == 2
+        assert 'second' in registry
+        assert registry.get('1').headers == {'Authorization': 'OAuth a'}, (
+            'Проверьте, что заголовки строятся из токена пользователя.'
+        )
+
+    def test_registry_rejects_bad_records(self, tmp_path, tenants_module):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([{'token': 'a'}]))
+        with pytest.raises(KeyError):
+            tenants_module.TenantRegistry.from_file(str(path))
+        with pytest.raises(ValueError):
+            tenants_module.TenantRegistry([
+                tenants_module.Tenant(token='a', chat_id=1),
+                tenants_module.Tenant(token='b', chat_id=1),
+            ])
+
+    def test_poll_all_keeps_state_per_tenant(self, monkeypatch,
+                                             random_timestamp,
+                                             homework_module,
+                                             tenants_module):
+        def mock_get(url, headers=None, params=None, **kwargs):
+            response = utils.MockResponseGET(random_timestamp=random_timestamp)
+            if headers['Authorization'] == 'OAuth broken':
+                raise requests.RequestException('Something wrong')
+            data = {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': random_timestamp,
+            }
+            response.json = lambda: data
+            response.content = json.dumps(data).encode()
+            response.headers = {}
+            return response
+
+        monkeypatch.setattr(
+            homework_module, 'get_session', lambda: FakeSession(mock_get))
+        monkeypatch.setattr(tenants_module, 'STREAM_HISTORY_AGE', 0)
+        registry = tenants_module.TenantRegistry([
+            tenants_module.Tenant(token='ok', chat_id=1, timestamp=1),
+            tenants_module.Tenant(token='broken', chat_id=2, timestamp=1),
+        ])
+        bot = utils.RecordingBot()
+        for _ in range(2):
+            for tenant in registry:
+                tenants_module.poll_tenant(bot, tenant)
+        assert registry.get('1').timestamp == random_timestamp
+        assert registry.get('2').timestamp == 1, (
+            'Ошибка одного пользователя не должна менять '
+            'состояние других.'
+        )
+        errors = [text for chat_id, text in bot.sent if chat_id == 2]
+        assert len(errors) == 1, (
+            'Одинаковая ошибка не должна отправляться повторно.'
+        )
+
+    def test_poll_due_skips_tenants_not_due(self, monkeypatch,
+                                            tenants_module):
+        polled = []
+        monkeypatch.setattr(
+            tenants_module, 'poll_tenant',
+            lambda bot, tenant: polled.append(tenant.name))
+        registry = tenants_module.TenantRegistry([
+            tenants_module.Tenant(token='a', chat_id=1),
+            tenants_module.Tenant(token='b', chat_id=2),
+        ])
+        registry.get('2').poll.next_due += 100
+        wakeup = tenants_module.poll_due(utils.RecordingBot(), registry)
+        assert polled == ['1'], (
+            'Опрашиваться должны только пользователи, которым пора.'
+        )
+        assert wakeup <= registry.get('2').poll.next_due
+
+    def test_long_history_is_split_into_messages(self, monkeypatch,
+                                                 homework_module,
+                                                 tenants_module):
+        from telegram.error import BadRequest
+
+        data = {
+            'homeworks': [
+                {'id': index, 'homework_name': f'hw{index}-' + 'x' * 60,
+                 'status': 'approved'}
+                for index in range(60)
+            ],
+            'current_date': 1000198991,
+        }
+        body = json.dumps(data).encode()
+
+        def mock_get(*args, stream=False, **kwargs):
+            response = utils.MockResponseGET(*args, **kwargs)
+            response.status_code = 200
+            response.headers = {}
+            response.iter_content = lambda size: (
+                body[start:start + 512] for start in range(0, len(body), 512))
+            response.close = lambda: None
+            response.content = body
+            response.json = lambda: json.loads(body)
+            return response
+
+        class LimitedBot(utils.RecordingBot):
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                if len(text) > 4096:
+                    raise BadRequest('Message is too long')
+                super().send_message(chat_id, text)
+
+        monkeypatch.setattr(
+            homework_module, 'get_session', lambda: FakeSession(mock_get))
+        tenant = tenants_module.Tenant(token='a', chat_id=1, timestamp=1)
+        bot = LimitedBot()
+        tenants_module.poll_tenant(bot, tenant)
+        assert len(bot.sent) > 1, (
+            'История длиннее 4096 символов должна уходить несколькими '
+            'сообщениями.'
+        )
+        assert sum(text.count('hw') for _, text in bot.sent) == 60
+        assert tenant.timestamp == 1000198991, (
+            'После доставки всех частей ответ должен фиксироваться.'
+        )
+
+    def test_old_timestamp_is_streamed(self, monkeypatch, homework_module,
+                                       tenants_module):
+        data = {
+            'homeworks': [
+                {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'},
+                {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+            ],
+            'current_date': 1000198991,
+        }
+        body = json.dumps(data).encode()
+        requests_made = []
+
+        def mock_get(*args, stream=False, **kwargs):
+            requests_made.append(stream)
+            response = utils.MockResponseGET(*args, **kwargs)
+            response.status_code = 200
+            response.headers = {}
+            response.iter_content = lambda size: (
+                body[start:start + 5] for start in range(0, len(body), 5))
+            response.close = lambda: None
+            response.content = body
+            response.json = lambda: json.loads(body)
+            return response
+
+        monkeypatch.setattr(
+            homework_module, 'get_session', lambda: FakeSession(mock_get))
+        tenant = tenants_module.Tenant(token='a', chat_id=1, timestamp=0)
+        bot = utils.RecordingBot()
+        tenants_module.poll_tenant(bot, tenant)
+        assert requests_made == [True], (
+            'Проверьте, что старая история запрашивается потоком.'
+        )
+        assert len(bot.sent) == 1
+        text = bot.sent[0][1]
+        assert text.index('hw1') < text.index('hw2')
+        assert tenant.timestamp == 1000198991
+        tenants_module.poll_tenant(bot, tenant)
+        assert requests_made == [True, False], (
+            'После первой загрузки истории опрос идёт без потока, '
+            'через кэш ответов.'
+        )
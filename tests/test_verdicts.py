@@ -0,0 +1,63 @@
+import pytest
+
+from verdicts import VerdictCatalog
+
+
+@pytest.fixture
+def catalog():
+    return VerdictCatalog(default_locale='ru').add(
+        'ru', 'Работа "{name}". {verdict}', {'approved': 'Принято {ура}'},
+        'Статус {status}.',
+    ).add(
+        'en', 'Homework "{name}". {verdict}', {'approved': 'Approved'},
+        'Status {status}.',
+    )
+
+
+class TestVerdictCatalog:
+
+    def test_known_status_per_locale(self, catalog):
+        assert catalog.render('hw', 'approved') == (
+            'Работа "hw". Принято {ура}')
+        assert catalog.render('hw', 'approved', 'en') == (
+            'Homework "hw". Approved')
+        assert catalog.render('hw', 'approved', 'de') == (
+            catalog.render('hw', 'approved')), (
+            'Неизвестный язык должен заменяться языком по умолчанию.'
+        )
+
+    def test_unknown_status_falls_back(self, catalog):
+        assert catalog.render('hw', 'lost', 'en') == (
+            'Homework "hw". Status lost.')
+        assert not catalog.knows('lost')
+
+    def test_template_needs_name(self):
+        with pytest.raises(ValueError):
+            VerdictCatalog().add('ru', '{verdict}', {'approved': 'ок'}, '')
+
+
+class TestRenderStatus:
+
+    def test_render_status_matches_parse_status(self, homework_module):
+        for status in homework_module.HOMEWORK_VERDICTS:
+            homework = {'homework_name': 'hw', 'status': status}
+            assert homework_module.render_status(homework) == (
+                homework_module.STATUS_VERDICT.format(
+                    name='hw',
+                    verdict=homework_module.HOMEWORK_VERDICTS[status]))
+
+    def test_unknown_status_does_not_raise(self, homework_module):
+        message = homework_module.render_changes(
+            [{'homework_name': 'hw', 'status': 'on_hold'}])
+        assert 'on_hold' in message, (
+            'Неизвестный статус должен попадать в сообщение с вердиктом '
+            'по умолчанию, а не прерывать цикл.'
+        )
+        with pytest.raises(ValueError):
+            homework_module.parse_status(
+                {'homework_name': 'hw', 'status': 'on_hold'})
+
+    def test_tenant_locale(self, homework_module):
+        message = homework_module.render_changes(
+            [{'homework_name': 'hw', 'status': 'approved'}], 'en')
+        assert message.startswith('Homework "hw"')
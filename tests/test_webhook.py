@@ -0,0 +1,93 @@
+from http import HTTPStatus
+import http.client
+import json
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def webhook_server(monkeypatch):
+    import tenants
+    import webhook
+
+    monkeypatch.setattr(webhook, 'WEBHOOK_SECRET', 'secret')
+    registry = tenants.TenantRegistry([
+        tenants.Tenant(token='a', chat_id=1, name='student', timestamp=1),
+    ])
+    sender = webhook.StubSender()
+    server = webhook.make_server(
+        webhook.PushDispatcher(registry, sender), port=0, host='127.0.0.1')
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+
+    def post(event, secret='secret', length=None):
+        body = json.dumps(event).encode()
+        connection = http.client.HTTPConnection(host, port, timeout=5)
+        try:
+            connection.putrequest('POST', '/events')
+            connection.putheader('X-Webhook-Secret', secret)
+            connection.putheader(
+                'Content-Length', str(len(body)) if length is None else length)
+            connection.endheaders(body)
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            connection.close()
+
+    yield post, sender
+    server.shutdown()
+    server.server_close()
+
+
+class TestWebhook:
+
+    def test_event_is_delivered_once(self, webhook_server, homework_module):
+        post, sender = webhook_server
+        event = {
+            'tenant': 'student',
+            'homework': {'id': 1, 'homework_name': 'hw', 'status': 'approved'},
+        }
+        assert post(event) == (HTTPStatus.ACCEPTED, {'changes': 1})
+        assert post(event) == (HTTPStatus.ACCEPTED, {'changes': 0}), (
+            'Повторное событие не должно приводить к повторному сообщению.'
+        )
+        assert len(sender.messages) == 1
+        chat_id, text = sender.messages[0]
+        assert chat_id == 1
+        assert homework_module.HOMEWORK_VERDICTS['approved'] in text
+
+    def test_bad_events_are_rejected(self, webhook_server):
+        post, sender = webhook_server
+        homeworks = {'homeworks': [{'homework_name': 'hw'}]}
+        assert post(homeworks, secret='wrong')[0] == HTTPStatus.UNAUTHORIZED
+        assert post(homeworks)[0] == HTTPStatus.BAD_REQUEST
+        assert post({'tenant': 'nobody', **homeworks})[0] == (
+            HTTPStatus.NOT_FOUND)
+        assert post([])[0] == HTTPStatus.BAD_REQUEST
+        assert post({'tenant': 'student'})[0] == HTTPStatus.BAD_REQUEST
+        assert post({'homeworks': [1]})[0] == HTTPStatus.BAD_REQUEST, (
+            'Работа не в виде словаря - ошибка запроса, а не сбой сервера.'
+        )
+        assert sender.messages == []
+
+    def test_bad_content_length_is_rejected(self, webhook_server):
+        post, sender = webhook_server
+        status, _ = post({'homeworks': []}, length='abc')
+        assert status == HTTPStatus.BAD_REQUEST
+
+    def test_public_address_requires_secret(self, monkeypatch):
+        import tenants
+        import webhook
+
+        monkeypatch.setattr(webhook, 'WEBHOOK_SECRET', '')
+        dispatcher = webhook.PushDispatcher(
+            tenants.TenantRegistry(), webhook.StubSender())
+        with pytest.raises(ValueError):
+            webhook.make_server(dispatcher, port=0, host='0.0.0.0')
+        server = webhook.make_server(dispatcher, port=0, host='127.0.0.1')
+        server.server_close()
+        assert webhook.WEBHOOK_HOST == '127.0.0.1', (
+            'По умолчанию сервер должен слушать только локальный адрес.'
+        )
@@ -0,0 +1,86 @@
+"""Заранее собранные тексты вердиктов на нескольких языках.
+
+Для каждой пары (язык, статус) шаблон сообщения подставляется
+один раз при сборке каталога и хранится как две строки: до и после
+названия работы. Сообщение получается их склейкой с названием, без
+разбора шаблона на каждом вызове. Для неизвестного статуса вместо
+исключения используется вердикт по умолчанию языка.
+"""
+import os
+
+DEFAULT_LOCALE = os.getenv('DEFAULT_LOCALE', 'ru')
+
+TEMPLATE_ERROR = 'В шаблоне {template!r} должно быть ровно одно поле {{name}}'
+
+TRANSLATIONS = {
+    'en': {
+        'message': 'Homework "{name}" review status changed. {verdict}',
+        'verdicts': {
+            'approved': 'The reviewer liked everything. Hooray!',
+            'reviewing': 'The homework is being reviewed.',
+            'rejected': 'The reviewer left some comments.',
+        },
+        'unknown': 'New status: {status}.',
+    },
+}
+
+_MARK = '\0'
+
+
+def _split(template, verdict):
+    """Части сообщения до и после названия работы."""
+    parts = template.format(name=_MARK, verdict=verdict)
+    if parts.count(_MARK) != 1:
+        raise ValueError(TEMPLATE_ERROR.format(template=template))
+    return tuple(parts.split(_MARK))
+
+
+class VerdictCatalog:
+    """Тексты вердиктов по языкам и статусам."""
+
+    def __init__(self, default_locale=DEFAULT_LOCALE):
+        """Пустой каталог; языки добавляются методом add()."""
+        self.default_locale = default_locale
+        self._tables = {}
+        self._unknown = {}
+
+    def __contains__(self, locale):
+        """Есть ли в каталоге язык."""
+        return locale in self._tables
+
+    def add(self, locale, message, verdicts, unknown):
+        """Сборка шаблонов языка.
+
+        message - шаблон с полями {name} и {verdict}, verdicts - словарь
+        {статус: вердикт}, unknown - вердикт с полем {status} для
+        статусов, которых нет в словаре.
+        """
+        self._tables[locale] = {
+            status: _split(message, verdict)
+            for status, verdict in verdicts.items()
+        }
+        self._unknown[locale] = (message, unknown)
+        return self
+
+    def knows(self, status, locale=None):
+        """Есть ли для статуса собственный вердикт."""
+        return status in self._table(locale)
+
+    def render(self, name, status, locale=None):
+        """Сообщение об изменении статуса работы name.
+
+        Неизвестный язык заменяется языком по умолчанию.
+        """
+        parts = self._table(locale).get(status)
+        if parts is not None:
+            return f'{parts[0]}{name}{parts[1]}'
+        message, unknown = self._unknown.get(
+            locale, self._unknown[self.default_locale])
+        return message.format(
+            name=name, verdict=unknown.format(status=status))
+
+    def _table(self, locale):
+        table = self._tables.get(locale)
+        if table is None:
+            return self._tables[self.default_locale]
+        return table
@@ -0,0 +1,197 @@
+"""Приём изменений статусов по HTTP вместо опроса API.
+
+Сервер принимает POST /events с JSON вида
+{"tenant": "<имя>", "homeworks": [{...}, ...]} или с одной работой
+в поле "homework" и пропускает их через тот же конвейер, что и опрос:
+поиск изменений, parse_status и отправку сообщения. Имя пользователя
+можно не указывать, если он в реестре один. Если задан WEBHOOK_SECRET,
+запрос должен содержать его в заголовке X-Webhook-Secret. По умолчанию
+сервер слушает только локальный адрес; на других адресах без секрета
+он не запускается, иначе любой мог бы писать пользователям от имени
+бота.
+"""
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import threading
+
+import bot_api
+import homework
+import schema
+import tenants
+
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '127.0.0.1')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 0))
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+WEBHOOK_STUB = bool(os.getenv('WEBHOOK_STUB'))
+WEBHOOK_PATH = '/events'
+MAX_BODY = 1024 * 1024
+
+EVENT_ACCEPTED = 'Событие для {name}: изменений {count}'
+EVENT_REJECTED = 'Событие отклонено: {error}'
+SEND_FAILED = 'Сообщение для {name} не отправлено, повторите событие'
+NO_HOMEWORKS = 'В событии нет ключа homeworks или homework.'
+BAD_LENGTH = 'Неверный заголовок Content-Length: {value}'
+SECRET_REQUIRED = ('Для приёма событий на адресе {host} задайте '
+                   'WEBHOOK_SECRET')
+STUB_MESSAGE = 'Заглушка: сообщение в чат {chat_id}: {text}'
+UNKNOWN_TENANT = 'Пользователь {name} не найден'
+WEBHOOK_STARTED = 'Приём событий на http://{host}:{port}' + WEBHOOK_PATH
+
+logger = logging.getLogger(__name__)
+
+
+class StubSender:
+    """Отправитель, который только запоминает и логирует сообщения."""
+
+    def __init__(self):
+        """Отправитель без сообщений."""
+        self.messages = []
+
+    def send_message(self, chat_id, text, **kwargs):
+        """Запоминание сообщения вместо отправки."""
+        self.messages.append((chat_id, text))
+        logger.info(STUB_MESSAGE.format(chat_id=chat_id, text=text))
+
+
+class PushDispatcher:
+    """Передача полученных событий в конвейер уведомлений."""
+
+    def __init__(self, registry, bot):
+        """Диспетчер для пользователей реестра."""
+        self.registry = registry
+        self.bot = bot
+        self._lock = threading.Lock()
+
+    def find_tenant(self, name):
+        """Пользователь по имени; единственный, если имя не задано."""
+        if name is None and len(self.registry) == 1:
+            return next(iter(self.registry))
+        tenant = self.registry.get(name)
+        if tenant is None:
+            raise LookupError(UNKNOWN_TENANT.format(name=name))
+        return tenant
+
+    def dispatch(self, event):
+        """Обработка события; число изменившихся работ."""
+        if not isinstance(event, dict):
+            raise TypeError(homework.TYPE_DICTIONARY_ERROR.format(
+                types=type(event)))
+        tenant = self.find_tenant(event.get('tenant'))
+        if 'homeworks' in event:
+            response = {'homeworks': event['homeworks']}
+        elif 'homework' in event:
+            response = {'homeworks': [event['homework']]}
+        else:
+            raise KeyError(NO_HOMEWORKS)
+        homeworks = homework.check_response(response)
+        for record in homeworks:
+            problem = schema.check_homework(record)
+            if problem is not None:
+                raise ValueError(problem[1])
+        with self._lock:
+            changes = tenant.statuses.diff(homeworks)
+            if not tenants.send_letters(
+                    self.bot, tenant, tenants.render_update(tenant, changes)):
+                raise ConnectionError(SEND_FAILED.format(name=tenant.name))
+            tenants.commit_update(tenant, response)
+            tenants.flush_checkpoints()
+        logger.info(EVENT_ACCEPTED.format(
+            name=tenant.name, count=len(changes)))
+        return len(changes)
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """HTTP-обработчик событий."""
+
+    dispatcher = None
+
+    def do_POST(self):
+        """Приём события."""
+        if self.path.split('?')[0] != WEBHOOK_PATH:
+            self._reply(HTTPStatus.NOT_FOUND, {'error': 'not found'})
+            return
+        secret = self.headers.get('X-Webhook-Secret', '')
+        if WEBHOOK_SECRET and not hmac.compare_digest(
+                secret.encode(), WEBHOOK_SECRET.encode()):
+            self._reply(HTTPStatus.UNAUTHORIZED, {'error': 'unauthorized'})
+            return
+        value = self.headers.get('Content-Length') or '0'
+        if not value.isdigit():
+            self._reject(HTTPStatus.BAD_REQUEST,
+                         ValueError(BAD_LENGTH.format(value=value)))
+            return
+        length = int(value)
+        if length > MAX_BODY:
+            self._reply(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                        {'error': 'too large'})
+            return
+        try:
+            event = json.loads(self.rfile.read(length) or b'null')
+            count = self.dispatcher.dispatch(event)
+        except (ValueError, TypeError, KeyError) as error:
+            self._reject(HTTPStatus.BAD_REQUEST, error)
+        except LookupError as error:
+            self._reject(HTTPStatus.NOT_FOUND, error)
+        except ConnectionError as error:
+            self._reject(HTTPStatus.SERVICE_UNAVAILABLE, error)
+        else:
+            self._reply(HTTPStatus.ACCEPTED, {'changes': count})
+
+    def _reject(self, status, error):
+        logger.warning(EVENT_REJECTED.format(error=error))
+        self._reply(status, {'error': str(error)})
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Журнал запросов - через logging на уровне DEBUG."""
+        logger.debug(format % args)
+
+
+def is_loopback(host):
+    """Доступен ли адрес только с этой машины."""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def make_server(dispatcher, port=None, host=None):
+    """HTTP-сервер событий для диспетчера.
+
+    ValueError, если адрес доступен извне, а секрет не задан.
+    """
+    host = host or WEBHOOK_HOST
+    if not WEBHOOK_SECRET and not is_loopback(host):
+        raise ValueError(SECRET_REQUIRED.format(host=host))
+    handler = type('Handler', (WebhookHandler,), {'dispatcher': dispatcher})
+    return ThreadingHTTPServer(
+        (host, WEBHOOK_PORT if port is None else port),
+        handler,
+    )
+
+
+def main():
+    """Приём событий вместо опроса API."""
+    registry = tenants.load_registry()
+    if WEBHOOK_STUB:
+        bot = StubSender()
+    else:
+        bot = bot_api.make_bot(homework.TELEGRAM_TOKEN)
+    server = make_server(PushDispatcher(registry, bot))
+    logger.info(WEBHOOK_STARTED.format(
+        host=server.server_address[0], port=server.server_address[1]))
+    server.serve_forever()